@@ -1,12 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import sqlite3
-import pandas as pd
+from fastapi.responses import FileResponse, Response
+from src.utils.db import ConnectionPool, read_cache_generation
+from src.utils.response_cache import ResponseCache
+from src.analysis.outcome_tracker import OutcomeTracker
 import subprocess
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from src.core.prediction_agent import PredictionAgent
 from src.utils.filter_companies import TOP_5_NIFTY, INDICES
 
@@ -33,111 +34,205 @@ if not os.path.exists("static"):
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Pooled read-only database connections, opened at startup
+db_pools = {}
+
+@app.on_event("startup")
+def open_db_pools():
+    db_pools["main"] = ConnectionPool("stock_market.db")
+    # Market data attached as "market" so archive metrics can join in SQL
+    db_pools["pred"] = ConnectionPool("predictions.db", attach={"market": "stock_market.db"})
+
+@app.on_event("shutdown")
+def close_db_pools():
+    for pool in db_pools.values():
+        pool.close()
+
+# JSON responses that only change when the pipeline writes (see cache_generation)
+response_cache = ResponseCache()
+
+def _cached_response(request: Request, key, builder):
+    """Serve builder()'s JSON from the response cache, with ETag / 304 support"""
+    with db_pools["pred"].connection() as conn:
+        generation = read_cache_generation(conn)
+    etag, body = response_cache.get_or_build(key, generation, builder)
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _etag_matches(if_none_match, etag):
+    """If-None-Match check: "*" or any listed tag equal to etag (weak comparison, W/ ignored)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    # Our tags are strong; a client may echo them back weak
+    return etag in {tag[2:] if tag.startswith("W/") else tag for tag in candidates}
+
+def _latest_close(main_conn, ticker):
+    """Most recent close for a ticker, or None"""
+    row = main_conn.execute(
+        "SELECT close FROM stock_daily_prices WHERE symbol = ? ORDER BY date DESC LIMIT 1", (ticker,)
+    ).fetchone()
+    return float(row["close"]) if row and row["close"] is not None else None
+
 # NEW: moved all HTML routes to bottom of file for better organization
 
 # ========== UTILITY FUNCTIONS ==========
 @app.get("/api/latest")
-async def get_latest_data():
+def get_latest_data(request: Request):
     """Fetch latest predictions (today) and market data"""
+    return _cached_response(request, "latest", _compute_latest_data)
+
+def _compute_latest_data():
     try:
-        results = []
-        # Main DB for current prices/fundamentals
-        main_conn = sqlite3.connect("stock_market.db")
-        main_conn.row_factory = sqlite3.Row
-        
-        # Pred DB for AI analysis
-        pred_conn = sqlite3.connect("predictions.db")
-        pred_conn.row_factory = sqlite3.Row
-        
-        from datetime import date
-        
-        today = date.today().isoformat()
-        
-        # Process INDICES FIRST, then stocks
-        ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
-        
-        for symbol in ordered_symbols:
-            short_name = symbol.split(' ')[0]
-            is_index = symbol in INDICES
-            
-            # 1. Get MOST RECENT Prediction (not necessarily today)
-            pred_row = pred_conn.execute(
-                "SELECT * FROM prediction_history WHERE symbol = ? ORDER BY prediction_date DESC, id DESC LIMIT 1", 
-                (symbol,)
-            ).fetchone()
+        # Main DB for current prices/fundamentals, Pred DB for AI analysis
+        with db_pools["main"].connection() as main_conn, db_pools["pred"].connection() as pred_conn:
+            return _latest_data(main_conn, pred_conn)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            prediction = {}
-            if pred_row:
-                prediction = {
-                    "direction": pred_row["direction"],
-                    "predicted_percentage_move": pred_row["predicted_move"],
-                    "confidence_score": pred_row["confidence_score"],
-                    "rationale": pred_row["rationale"],
-                    "timestamp": pred_row["created_at"],
-                    "date": pred_row["prediction_date"]
-                }
-            else:
-                prediction = {
-                    "direction": "PENDING",
-                    "predicted_percentage_move": 0,
-                    "confidence_score": 0,
-                    "rationale": "AI analysis pending. Please run pipeline."
-                }
-
-            # 2. Get latest price (Live/End of Day)
-            if is_index:
-                # For indices, use the exact ticker
-                ticker = INDICES[symbol]["ticker"]
-                price_data = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", main_conn)
-            else:
-                # For stocks, use the ticker map
-                ticker = TICKER_MAP.get(symbol, f"{short_name}.NS")
-                price_data = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", main_conn)
-            
-            # 3. Fundamentals (SKIP for indices)
-            if is_index:
-                fund_data = pd.DataFrame()  # Empty for indices
-            else:
-                fund_data = pd.read_sql_query(f"SELECT * FROM stock_fundamentals WHERE symbol LIKE '{short_name}%' ORDER BY date DESC LIMIT 1", main_conn)
-            
-            results.append({
-                "symbol": symbol,
-                "short_name": short_name,
-                "is_index": is_index,
-                "price": price_data.to_dict('records')[0] if not price_data.empty else {},
-                "fundamentals": fund_data.to_dict('records')[0] if not fund_data.empty else {},
-                "prediction": prediction
-            })
-        
-        # Get market context
-        market_context_data = pd.read_sql_query("SELECT * FROM market_context ORDER BY date DESC LIMIT 1", main_conn)
-        market_context = {}
-        if not market_context_data.empty:
-            mc = market_context_data.to_dict('records')[0]
-            market_context = {
-                'sp500_close': mc.get('sp500_close'),
-                'sp500_change': mc.get('sp500_change'),
-                'crude_oil': mc.get('crude_oil'),
-                'usd_inr': mc.get('usd_inr'),
-                'nifty_trend': mc.get('nifty_trend'),
-                'volatility_regime': mc.get('volatility_regime')
+def _latest_rows(conn, table, key_column, keys, order_by):
+    """Latest row per key in one window-function query: {key: row dict}"""
+    if not keys:
+        return {}
+    placeholders = ",".join("?" * len(keys))
+    rows = conn.execute(f"""
+        SELECT * FROM (
+            SELECT t.*, ROW_NUMBER() OVER (PARTITION BY {key_column} ORDER BY {order_by}) AS rn
+            FROM {table} t
+            WHERE {key_column} IN ({placeholders})
+        ) WHERE rn = 1
+    """, list(keys)).fetchall()
+    latest = {}
+    for row in rows:
+        record = dict(row)
+        record.pop("rn")
+        latest[record[key_column]] = record
+    return latest
+
+def _latest_fundamentals(conn, short_names):
+    """Latest stock_fundamentals row per case-insensitive symbol prefix: {short_name: row dict}
+    
+    The prefix is a NOCASE range (name <= symbol < name || U+10FFFF) rather
+    than `LIKE name || '%'`, which SQLite cannot serve from
+    idx_fundamentals_symbol_nocase when the pattern is an expression.
+    """
+    if not short_names:
+        return {}
+    values = ",".join(["(?)"] * len(short_names))
+    rows = conn.execute(f"""
+        WITH wanted(short_name) AS (VALUES {values})
+        SELECT * FROM (
+            SELECT w.short_name AS wanted_name, f.*,
+                   ROW_NUMBER() OVER (PARTITION BY w.short_name ORDER BY f.date DESC) AS rn
+            FROM wanted w
+            JOIN stock_fundamentals f
+              ON f.symbol COLLATE NOCASE >= w.short_name
+             AND f.symbol COLLATE NOCASE < w.short_name || char(1114111)
+        ) WHERE rn = 1
+    """, list(short_names)).fetchall()
+    latest = {}
+    for row in rows:
+        record = dict(row)
+        record.pop("rn")
+        latest[record.pop("wanted_name")] = record
+    return latest
+
+def _last_updated(predictions, prices):
+    """When the served data last changed (not when the cached body was built)
+    
+    Newest prediction's created_at (stored in UTC, shown in local time),
+    else the newest price date.
+    """
+    created = [row["created_at"] for row in predictions.values() if row.get("created_at")]
+    if created:
+        newest = datetime.fromisoformat(max(created)).replace(tzinfo=timezone.utc)
+        return newest.astimezone().strftime("%Y-%m-%d %H:%M:%S")
+    dates = [row["date"] for row in prices.values() if row.get("date")]
+    return max(dates) if dates else None
+
+def _latest_data(main_conn, pred_conn):
+    """Latest prediction, price and fundamentals for every tracked symbol"""
+    results = []
+    
+    # Process INDICES FIRST, then stocks
+    ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
+    tickers = {
+        symbol: INDICES[symbol]["ticker"] if symbol in INDICES else TICKER_MAP.get(symbol, f"{symbol.split(' ')[0]}.NS")
+        for symbol in ordered_symbols
+    }
+    stock_short_names = [symbol.split(' ')[0] for symbol in ordered_symbols if symbol not in INDICES]
+    
+    # One query per table for the whole universe instead of one per symbol
+    predictions = _latest_rows(pred_conn, "prediction_history", "symbol", ordered_symbols,
+                               "prediction_date DESC, id DESC")
+    prices = _latest_rows(main_conn, "stock_daily_prices", "symbol", list(tickers.values()), "date DESC")
+    fundamentals = _latest_fundamentals(main_conn, stock_short_names)
+    
+    for symbol in ordered_symbols:
+        short_name = symbol.split(' ')[0]
+        is_index = symbol in INDICES
+        
+        # 1. MOST RECENT Prediction (not necessarily today)
+        pred_row = predictions.get(symbol)
+        if pred_row:
+            prediction = {
+                "direction": pred_row["direction"],
+                "predicted_percentage_move": pred_row["predicted_move"],
+                "confidence_score": pred_row["confidence_score"],
+                "rationale": pred_row["rationale"],
+                "timestamp": pred_row["created_at"],
+                "date": pred_row["prediction_date"]
+            }
+        else:
+            prediction = {
+                "direction": "PENDING",
+                "predicted_percentage_move": 0,
+                "confidence_score": 0,
+                "rationale": "AI analysis pending. Please run pipeline."
             }
         
-        main_conn.close()
-        pred_conn.close()
-            
-        return {
-            "status": "success",
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "market_context": market_context,
-            "data": results
+        results.append({
+            "symbol": symbol,
+            "short_name": short_name,
+            "is_index": is_index,
+            # 2. Latest price (Live/End of Day)
+            "price": prices.get(tickers[symbol], {}),
+            # 3. Fundamentals (SKIP for indices)
+            "fundamentals": {} if is_index else fundamentals.get(short_name, {}),
+            "prediction": prediction
+        })
+    
+    # Get market context
+    mc = main_conn.execute("SELECT * FROM market_context ORDER BY date DESC LIMIT 1").fetchone()
+    market_context = {}
+    if mc:
+        market_context = {
+            'sp500_close': mc['sp500_close'],
+            'sp500_change': mc['sp500_change'],
+            'crude_oil': mc['crude_oil'],
+            'usd_inr': mc['usd_inr'],
+            'nifty_trend': mc['nifty_trend'],
+            'volatility_regime': mc['volatility_regime']
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        
+    return {
+        "status": "success",
+        "last_updated": _last_updated(predictions, prices),
+        "market_context": market_context,
+        "data": results
+    }
 
 @app.get("/api/history/dates")
-async def get_history_dates(timeframe: str = "DAILY"):
+def get_history_dates(request: Request, timeframe: str = "DAILY"):
     """Get list of dates we have predictions for (filtered by timeframe)"""
+    return _cached_response(request, ("history_dates", timeframe.upper()), lambda: _history_dates(timeframe))
+
+def _history_dates(timeframe):
     try:
         table_map = {
             "DAILY": "daily_predictions",
@@ -146,24 +241,18 @@ async def get_history_dates(timeframe: str = "DAILY"):
         }
         table_name = table_map.get(timeframe.upper(), "daily_predictions")
         
-        conn = sqlite3.connect("predictions.db")
-        cursor = conn.cursor()
-        
-        # Check if table exists first
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        if not cursor.fetchone():
-            conn.close()
-            return {"dates": []}
-
-        cursor.execute(f"SELECT DISTINCT prediction_date FROM {table_name} ORDER BY prediction_date DESC")
-        dates = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return {"dates": dates}
+        with db_pools["pred"].connection() as conn:
+            # Check if table exists first
+            if not conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone():
+                return {"dates": []}
+
+            rows = conn.execute(f"SELECT DISTINCT prediction_date FROM {table_name} ORDER BY prediction_date DESC").fetchall()
+        return {"dates": [row[0] for row in rows]}
     except Exception as e:
         return {"dates": []} # Return empty if DB doesn't exist yet
 
 @app.get("/api/history/{date_str}")
-async def get_history_by_date(date_str: str, timeframe: str = "DAILY"):
+def get_history_by_date(date_str: str, timeframe: str = "DAILY"):
     """Get predictions for a specific date and timeframe"""
     try:
         table_map = {
@@ -173,74 +262,67 @@ async def get_history_by_date(date_str: str, timeframe: str = "DAILY"):
         }
         table_name = table_map.get(timeframe.upper(), "daily_predictions")
 
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        
-        # Check if table exists
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        if not cursor.fetchone():
-            conn.close()
-            return {"date": date_str, "data": []}
-
-        rows = conn.execute(f"SELECT * FROM {table_name} WHERE prediction_date = ?", (date_str,)).fetchall()
-        
-        # Get actual prices for context (using daily close as approx reference)
-        # For weekly/monthly, ideally we'd get that specific period's close, but daily close of that date is a fine reference point
-        main_conn = sqlite3.connect("stock_market.db")
-        main_conn.row_factory = sqlite3.Row
-        
-        results = []
-        for row in rows:
-            symbol = row["symbol"]
-            short_name = symbol.split(' ')[0]
-            is_index = symbol in INDICES
-            ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
-            
-            # Get EOD price for that date (Archive Verification)
-            price_row = main_conn.execute(
-                "SELECT open, close FROM stock_daily_prices WHERE symbol = ? AND date = ?", 
-                (ticker, date_str)
-            ).fetchone()
-
-            market_data = {
-                "open": price_row["open"] if price_row else None,
-                "close": price_row["close"] if price_row else None
-            }
-            
-            # Map fields based on timeframe (normalizing response)
-            prediction_data = {
-                "direction": row["direction"],
-                "confidence_score": row["confidence_score"],
-                "rationale": row["rationale"],
-                "target_date": row["target_date"] if "target_date" in row.keys() else None
-            }
-            
-            # Add specific fields
-            if timeframe == "DAILY":
-                prediction_data["predicted_move"] = row["predicted_move"]
-            elif timeframe == "WEEKLY":
-                 prediction_data["week_high_target"] = row["week_high_target"]
-                 prediction_data["week_low_target"] = row["week_low_target"]
-            elif timeframe == "MONTHLY":
-                 prediction_data["month_high_target"] = row["month_high_target"]
-                 prediction_data["month_low_target"] = row["month_low_target"]
-
-            results.append({
-                "symbol": symbol,
-                "prediction": prediction_data,
-                "market_data": market_data
-            })
-            
-        conn.close()
-        main_conn.close()
-        
-        return {"date": date_str, "data": results}
+        with db_pools["pred"].connection() as conn, db_pools["main"].connection() as main_conn:
+            return _history_for_date(conn, main_conn, table_name, date_str, timeframe)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _history_for_date(conn, main_conn, table_name, date_str, timeframe):
+    """Predictions for one date alongside that day's open/close"""
+    # Check if table exists
+    if not conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone():
+        return {"date": date_str, "data": []}
+
+    rows = conn.execute(f"SELECT * FROM {table_name} WHERE prediction_date = ?", (date_str,)).fetchall()
+    
+    # Get actual prices for context (using daily close as approx reference)
+    # For weekly/monthly, ideally we'd get that specific period's close, but daily close of that date is a fine reference point
+    results = []
+    for row in rows:
+        symbol = row["symbol"]
+        short_name = symbol.split(' ')[0]
+        is_index = symbol in INDICES
+        ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
+        
+        # Get EOD price for that date (Archive Verification)
+        price_row = main_conn.execute(
+            "SELECT open, close FROM stock_daily_prices WHERE symbol = ? AND date = ?", 
+            (ticker, date_str)
+        ).fetchone()
+
+        market_data = {
+            "open": price_row["open"] if price_row else None,
+            "close": price_row["close"] if price_row else None
+        }
+        
+        # Map fields based on timeframe (normalizing response)
+        prediction_data = {
+            "direction": row["direction"],
+            "confidence_score": row["confidence_score"],
+            "rationale": row["rationale"],
+            "target_date": row["target_date"] if "target_date" in row.keys() else None
+        }
+        
+        # Add specific fields
+        if timeframe == "DAILY":
+            prediction_data["predicted_move"] = row["predicted_move"]
+        elif timeframe == "WEEKLY":
+             prediction_data["week_high_target"] = row["week_high_target"]
+             prediction_data["week_low_target"] = row["week_low_target"]
+        elif timeframe == "MONTHLY":
+             prediction_data["month_high_target"] = row["month_high_target"]
+             prediction_data["month_low_target"] = row["month_low_target"]
+
+        results.append({
+            "symbol": symbol,
+            "prediction": prediction_data,
+            "market_data": market_data
+        })
+    
+    return {"date": date_str, "data": results}
+
 @app.get("/api/archive/metrics")
-async def get_archive_metrics(timeframe: str = "DAILY", start_date: str = None, end_date: str = None):
+def get_archive_metrics(timeframe: str = "DAILY", start_date: str = None, end_date: str = None):
     """Calculate performance metrics for archive predictions"""
     try:
         table_map = {
@@ -248,140 +330,99 @@ async def get_archive_metrics(timeframe: str = "DAILY", start_date: str = None,
             "WEEKLY": "weekly_predictions",
             "MONTHLY": "monthly_predictions"
         }
-        table_name = table_map.get(timeframe.upper(), "daily_predictions")
-        
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Check if table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        if not cursor.fetchone():
-            conn.close()
-            return {
-                "overall_accuracy": {"sentiment_accuracy": 0, "price_accuracy": 0, "total_predictions": 0},
-                "top_performers": [],
-                "bottom_performers": [],
-                "confidence_correlation": {}
-            }
-        
-        # Build query with optional date filtering
-        date_filter = ""
-        params = []
-        if start_date and end_date:
-            date_filter = " WHERE prediction_date BETWEEN ? AND ?"
-            params = [start_date, end_date]
-        elif start_date:
-            date_filter = " WHERE prediction_date >= ?"
-            params = [start_date]
-        elif end_date:
-            date_filter = " WHERE prediction_date <= ?"
-            params = [end_date]
-        
-        # Get all predictions with market data
-        query = f"SELECT * FROM {table_name}{date_filter} ORDER BY prediction_date DESC"
-        predictions = cursor.execute(query, params).fetchall()
-        
-        # Get market data
-        main_conn = sqlite3.connect("stock_market.db")
-        main_conn.row_factory = sqlite3.Row
-        
-        total_predictions = 0
-        sentiment_correct = 0
-        price_correct = 0
-        stock_stats = {}
-        confidence_stats = {"high": {"correct": 0, "total": 0}, "medium": {"correct": 0, "total": 0}, "low": {"correct": 0, "total": 0}}
-        
-        for pred in predictions:
-            symbol = pred["symbol"]
-            pred_date = pred["prediction_date"]
-            short_name = symbol.split(' ')[0]
-            is_index = symbol in INDICES
-            
-            # Skip indices (NIFTY 50, SENSEX)
-            if is_index:
-                continue
-            
-            ticker = TICKER_MAP.get(symbol, f"{short_name}.NS")
-            
-            # Get actual market data
-            price_row = main_conn.execute(
-                "SELECT open, close FROM stock_daily_prices WHERE symbol = ? AND date = ?",
-                (ticker, pred_date)
-            ).fetchone()
-            
-            if not price_row or not price_row["close"] or not price_row["open"]:
-                continue
-            
-            total_predictions += 1
-            
-            # Initialize stock stats
-            if symbol not in stock_stats:
-                stock_stats[symbol] = {"correct": 0, "total": 0}
-            stock_stats[symbol]["total"] += 1
-            
-            # Calculate accuracy for DAILY timeframe
-            if timeframe == "DAILY":
-                actual_move = ((price_row["close"] - price_row["open"]) / price_row["open"] * 100)
-                predicted_move = float(pred["predicted_move"]) if pred["predicted_move"] else 0
-                
-                # Sentiment accuracy
-                predicted_direction = "UP" if predicted_move >= 0 else "DOWN"
-                actual_direction = "UP" if actual_move >= 0 else "DOWN"
-                if predicted_direction == actual_direction:
-                    sentiment_correct += 1
-                    stock_stats[symbol]["correct"] += 1
-                
-                # Price accuracy (within 0.5% tolerance)
-                if abs(predicted_move - actual_move) <= 0.5:
-                    price_correct += 1
-            else:
-                # For weekly/monthly, use simple direction check
-                if pred["direction"] == "UP" and price_row["close"] > price_row["open"]:
-                    sentiment_correct += 1
-                    stock_stats[symbol]["correct"] += 1
-                elif pred["direction"] == "DOWN" and price_row["close"] < price_row["open"]:
-                    sentiment_correct += 1
-                    stock_stats[symbol]["correct"] += 1
-            
-            # Confidence correlation
-            conf_score = int(pred["confidence_score"]) if pred["confidence_score"] else 5
-            if conf_score >= 7:
-                conf_level = "high"
-            elif conf_score >= 5:
-                conf_level = "medium"
-            else:
-                conf_level = "low"
-            
-            confidence_stats[conf_level]["total"] += 1
-            if predicted_direction == actual_direction if timeframe == "DAILY" else (pred["direction"] == "UP" and price_row["close"] > price_row["open"]) or (pred["direction"] == "DOWN" and price_row["close"] < price_row["open"]):
-                confidence_stats[conf_level]["correct"] += 1
-        
-        conn.close()
-        main_conn.close()
-        
-        # Calculate percentages
-        sentiment_accuracy = (sentiment_correct / total_predictions * 100) if total_predictions > 0 else 0
-        price_accuracy = (price_correct / total_predictions * 100) if total_predictions > 0 else 0
-        
-        # Calculate confidence correlation
-        confidence_correlation = {
-            "high_confidence_accuracy": (confidence_stats["high"]["correct"] / confidence_stats["high"]["total"] * 100) if confidence_stats["high"]["total"] > 0 else 0,
-            "medium_confidence_accuracy": (confidence_stats["medium"]["correct"] / confidence_stats["medium"]["total"] * 100) if confidence_stats["medium"]["total"] > 0 else 0,
-            "low_confidence_accuracy": (confidence_stats["low"]["correct"] / confidence_stats["low"]["total"] * 100) if confidence_stats["low"]["total"] > 0 else 0
-        }
+        timeframe = timeframe.upper() if timeframe.upper() in table_map else "DAILY"
+        table_name = table_map[timeframe]
         
-        return {
-            "overall_accuracy": {
-                "sentiment_accuracy": round(sentiment_accuracy, 1),
-                "price_accuracy": round(price_accuracy, 1),
-                "total_predictions": total_predictions
-            },
-            "confidence_correlation": confidence_correlation
-        }
+        with db_pools["pred"].connection() as conn:
+            return _archive_metrics(conn, table_name, timeframe, start_date, end_date)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _archive_metrics(conn, table_name, timeframe, start_date, end_date):
+    """Accuracy metrics for archived predictions in the date range
+    
+    Reads (symbol, confidence bucket) groups from the accuracy_rollup table,
+    or scores them against the ATTACHed market database when the rollup is
+    not there yet (same rules, completed bars only, so both agree); the
+    overall, per-symbol and per-bucket figures are rolled up from those few
+    groups.
+    """
+    # Check if table exists
+    if not conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone():
+        return {
+            "overall_accuracy": {"sentiment_accuracy": 0, "price_accuracy": 0, "total_predictions": 0},
+            "top_performers": [],
+            "bottom_performers": [],
+            "confidence_correlation": {}
+        }
+    
+    # Scored outcomes are materialized by the accuracy step; fall back to
+    # scoring on the fly until that rollup exists for this timeframe
+    has_rollup = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='accuracy_rollup'"
+    ).fetchone() and conn.execute(
+        "SELECT 1 FROM accuracy_rollup WHERE timeframe = ? LIMIT 1", (timeframe,)
+    ).fetchone()
+    if has_rollup:
+        groups = OutcomeTracker.summarize(conn, timeframe, start_date, end_date, list(INDICES.keys()))
+    else:
+        groups = OutcomeTracker.summarize_live(conn, timeframe, TICKER_MAP, start_date, end_date, list(INDICES.keys()))
+    
+    total_predictions = sum(g["total"] for g in groups)
+    sentiment_correct = sum(g["correct"] for g in groups)
+    price_correct = sum(g["price_correct"] for g in groups)
+    
+    stock_stats = {}
+    confidence_stats = {"high": {"correct": 0, "total": 0}, "medium": {"correct": 0, "total": 0}, "low": {"correct": 0, "total": 0}}
+    for g in groups:
+        stats = stock_stats.setdefault(g["symbol"], {"correct": 0, "total": 0})
+        stats["correct"] += g["correct"]
+        stats["total"] += g["total"]
+        confidence_stats[g["bucket"]]["correct"] += g["correct"]
+        confidence_stats[g["bucket"]]["total"] += g["total"]
+    
+    # Calculate percentages
+    sentiment_accuracy = (sentiment_correct / total_predictions * 100) if total_predictions > 0 else 0
+    price_accuracy = (price_correct / total_predictions * 100) if total_predictions > 0 else 0
+    
+    # Calculate confidence correlation
+    confidence_correlation = {
+        "high_confidence_accuracy": (confidence_stats["high"]["correct"] / confidence_stats["high"]["total"] * 100) if confidence_stats["high"]["total"] > 0 else 0,
+        "medium_confidence_accuracy": (confidence_stats["medium"]["correct"] / confidence_stats["medium"]["total"] * 100) if confidence_stats["medium"]["total"] > 0 else 0,
+        "low_confidence_accuracy": (confidence_stats["low"]["correct"] / confidence_stats["low"]["total"] * 100) if confidence_stats["low"]["total"] > 0 else 0
+    }
+    
+    # Per-symbol accuracy, best first
+    performers = sorted(
+        (
+            {
+                "symbol": symbol,
+                "accuracy": round(stats["correct"] / stats["total"] * 100, 1),
+                "correct": stats["correct"],
+                "total": stats["total"]
+            }
+            for symbol, stats in stock_stats.items()
+        ),
+        key=lambda p: (-p["accuracy"], -p["total"])
+    )
+    
+    return {
+        "overall_accuracy": {
+            "sentiment_accuracy": round(sentiment_accuracy, 1),
+            "price_accuracy": round(price_accuracy, 1),
+            "total_predictions": total_predictions
+        },
+        "top_performers": performers[:3],
+        "bottom_performers": performers[::-1][:3],
+        "confidence_correlation": confidence_correlation
+    }
+
+@app.get("/api/metrics/db")
+def get_db_metrics():
+    """Connection pool and response cache metrics"""
+    metrics = {name: pool.metrics() for name, pool in db_pools.items()}
+    metrics["response_cache"] = response_cache.stats()
+    return metrics
 
 @app.post("/api/refresh")
 async def refresh_pipeline():
@@ -394,18 +435,17 @@ async def refresh_pipeline():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/accuracy/latest")
-async def get_latest_accuracy():
+def get_latest_accuracy(request: Request):
     """Get latest cumulative accuracy metrics from database"""
+    return _cached_response(request, "accuracy_latest", _latest_accuracy)
+
+def _latest_accuracy():
     try:
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        
-        # Get most recent entry
-        row = conn.execute(
-            "SELECT * FROM daily_accuracy_metrics WHERE timeframe = 'DAILY' ORDER BY date DESC LIMIT 1"
-        ).fetchone()
-        
-        conn.close()
+        with db_pools["pred"].connection() as conn:
+            # Get most recent entry
+            row = conn.execute(
+                "SELECT * FROM daily_accuracy_metrics WHERE timeframe = 'DAILY' ORDER BY date DESC LIMIT 1"
+            ).fetchone()
         
         if row:
             return {
@@ -459,143 +499,137 @@ async def archive_page():
     return FileResponse("static/archive.html")
 
 @app.get("/api/predictions/daily")
-async def get_daily_predictions():
+def get_daily_predictions(request: Request):
     """Fetch latest daily predictions"""
+    return _cached_response(request, "predictions_daily", _daily_predictions)
+
+def _daily_predictions():
     try:
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        main_conn = sqlite3.connect("stock_market.db")
-        
-        results = []
-        ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
-        
-        for symbol in ordered_symbols:
-            # Get daily prediction
-            pred_row = conn.execute(
-                "SELECT * FROM daily_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
-                (symbol,)
-            ).fetchone()
+        with db_pools["pred"].connection() as conn, db_pools["main"].connection() as main_conn:
+            results = []
+            ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
+        
+            for symbol in ordered_symbols:
+                # Get daily prediction
+                pred_row = conn.execute(
+                    "SELECT * FROM daily_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
+                    (symbol,)
+                ).fetchone()
             
-            if pred_row:
-                # Get latest price
-                short_name = symbol.split(' ')[0]
-                is_index = symbol in INDICES
-                ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
-                price_data = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", main_conn)
+                if pred_row:
+                    # Get latest price
+                    short_name = symbol.split(' ')[0]
+                    is_index = symbol in INDICES
+                    ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
+                    current_price = _latest_close(main_conn, ticker)
                 
-                results.append({
-                    "symbol": symbol,
-                    "timeframe": "DAILY",
-                    "current_price": float(price_data['close'].iloc[0]) if not price_data.empty else None,
-                    "prediction": {
-                        "direction": pred_row["direction"],
-                        "confidence_score": pred_row["confidence_score"],
-                        "probability": pred_row["probability"],
-                        "predicted_move": pred_row["predicted_move"],
-                        "target_price_min": pred_row["target_price_min"],
-                        "target_price_max": pred_row["target_price_max"],
-                        "risk_level": pred_row["risk_level"],
-                        "rationale": pred_row["rationale"],
-                        "target_date": pred_row["target_date"]
-                    }
-                })
+                    results.append({
+                        "symbol": symbol,
+                        "timeframe": "DAILY",
+                        "current_price": current_price,
+                        "prediction": {
+                            "direction": pred_row["direction"],
+                            "confidence_score": pred_row["confidence_score"],
+                            "probability": pred_row["probability"],
+                            "predicted_move": pred_row["predicted_move"],
+                            "target_price_min": pred_row["target_price_min"],
+                            "target_price_max": pred_row["target_price_max"],
+                            "risk_level": pred_row["risk_level"],
+                            "rationale": pred_row["rationale"],
+                            "target_date": pred_row["target_date"]
+                        }
+                    })
         
-        conn.close()
-        main_conn.close()
         return {"predictions": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/predictions/weekly")
-async def get_weekly_predictions():
+def get_weekly_predictions(request: Request):
     """Fetch latest weekly predictions"""
+    return _cached_response(request, "predictions_weekly", _weekly_predictions)
+
+def _weekly_predictions():
     try:
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        main_conn = sqlite3.connect("stock_market.db")
-        
-        results = []
-        ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
-        
-        for symbol in ordered_symbols:
-            pred_row = conn.execute(
-                "SELECT * FROM weekly_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
-                (symbol,)
-            ).fetchone()
+        with db_pools["pred"].connection() as conn, db_pools["main"].connection() as main_conn:
+            results = []
+            ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
+        
+            for symbol in ordered_symbols:
+                pred_row = conn.execute(
+                    "SELECT * FROM weekly_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
+                    (symbol,)
+                ).fetchone()
             
-            if pred_row:
-                short_name = symbol.split(' ')[0]
-                is_index = symbol in INDICES
-                ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
-                price_data = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", main_conn)
+                if pred_row:
+                    short_name = symbol.split(' ')[0]
+                    is_index = symbol in INDICES
+                    ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
+                    current_price = _latest_close(main_conn, ticker)
                 
-                results.append({
-                    "symbol": symbol,
-                    "timeframe": "WEEKLY",
-                    "current_price": float(price_data['close'].iloc[0]) if not price_data.empty else None,
-                    "prediction": {
-                        "direction": pred_row["direction"],
-                        "confidence_score": pred_row["confidence_score"],
-                        "probability": pred_row["probability"],
-                        "predicted_move": pred_row["predicted_move"],
-                        "week_high_target": pred_row["week_high_target"],
-                        "week_low_target": pred_row["week_low_target"],
-                        "trend_strength": pred_row["trend_strength"],
-                        "trend_strength": pred_row["trend_strength"],
-                        "rationale": pred_row["rationale"],
-                        "target_date": pred_row["target_date"]
-                    }
-                })
+                    results.append({
+                        "symbol": symbol,
+                        "timeframe": "WEEKLY",
+                        "current_price": current_price,
+                        "prediction": {
+                            "direction": pred_row["direction"],
+                            "confidence_score": pred_row["confidence_score"],
+                            "probability": pred_row["probability"],
+                            "predicted_move": pred_row["predicted_move"],
+                            "week_high_target": pred_row["week_high_target"],
+                            "week_low_target": pred_row["week_low_target"],
+                            "trend_strength": pred_row["trend_strength"],
+                            "trend_strength": pred_row["trend_strength"],
+                            "rationale": pred_row["rationale"],
+                            "target_date": pred_row["target_date"]
+                        }
+                    })
         
-        conn.close()
-        main_conn.close()
         return {"predictions": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/predictions/monthly")
-async def get_monthly_predictions():
+def get_monthly_predictions(request: Request):
     """Fetch latest monthly predictions"""
+    return _cached_response(request, "predictions_monthly", _monthly_predictions)
+
+def _monthly_predictions():
     try:
-        conn = sqlite3.connect("predictions.db")
-        conn.row_factory = sqlite3.Row
-        main_conn = sqlite3.connect("stock_market.db")
-        
-        results = []
-        ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
-        
-        for symbol in ordered_symbols:
-            pred_row = conn.execute(
-                "SELECT * FROM monthly_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
-                (symbol,)
-            ).fetchone()
+        with db_pools["pred"].connection() as conn, db_pools["main"].connection() as main_conn:
+            results = []
+            ordered_symbols = list(INDICES.keys()) + list(TOP_5_NIFTY.keys())
+        
+            for symbol in ordered_symbols:
+                pred_row = conn.execute(
+                    "SELECT * FROM monthly_predictions WHERE symbol = ? ORDER BY prediction_date DESC LIMIT 1",
+                    (symbol,)
+                ).fetchone()
             
-            if pred_row:
-                short_name = symbol.split(' ')[0]
-                is_index = symbol in INDICES
-                ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
-                price_data = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", main_conn)
+                if pred_row:
+                    short_name = symbol.split(' ')[0]
+                    is_index = symbol in INDICES
+                    ticker = INDICES[symbol]["ticker"] if is_index else TICKER_MAP.get(symbol, f"{short_name}.NS")
+                    current_price = _latest_close(main_conn, ticker)
                 
-                results.append({
-                    "symbol": symbol,
-                    "timeframe": "MONTHLY",
-                    "current_price": float(price_data['close'].iloc[0]) if not price_data.empty else None,
-                    "prediction": {
-                        "direction": pred_row["direction"],
-                        "confidence_score": pred_row["confidence_score"],
-                        "probability": pred_row["probability"],
-                        "predicted_move": pred_row["predicted_move"],
-                        "month_high_target": pred_row["month_high_target"],
-                        "month_low_target": pred_row["month_low_target"],
-                        "fundamental_rating": pred_row["fundamental_rating"],
-                        "fundamental_rating": pred_row["fundamental_rating"],
-                        "rationale": pred_row["rationale"],
-                        "target_date": pred_row["target_date"]
-                    }
-                })
+                    results.append({
+                        "symbol": symbol,
+                        "timeframe": "MONTHLY",
+                        "current_price": current_price,
+                        "prediction": {
+                            "direction": pred_row["direction"],
+                            "confidence_score": pred_row["confidence_score"],
+                            "probability": pred_row["probability"],
+                            "predicted_move": pred_row["predicted_move"],
+                            "month_high_target": pred_row["month_high_target"],
+                            "month_low_target": pred_row["month_low_target"],
+                            "fundamental_rating": pred_row["fundamental_rating"],
+                            "fundamental_rating": pred_row["fundamental_rating"],
+                            "rationale": pred_row["rationale"],
+                            "target_date": pred_row["target_date"]
+                        }
+                    })
         
-        conn.close()
-        main_conn.close()
         return {"predictions": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -17,9 +17,14 @@ def fetch_news():
     fetcher.fetch_all()
 
 def fetch_prices():
-    """Fetch daily OHLC prices"""
+    """Fetch daily OHLC prices missing since the last stored date"""
     fetcher = PriceFetcher()
-    fetcher.fetch_today_prices()
+    fetcher.sync_prices()
+
+def calculate_indicators(mode: str = "incremental"):
+    """Calculate technical indicators from stored prices"""
+    fetcher = PriceFetcher()
+    fetcher.calculate_technical_indicators(mode=mode)
 
 def fetch_fundamentals():
     """Fetch fundamental data from Screener.in"""
@@ -82,13 +87,14 @@ Examples:
   python main.py fetch                    # Fetch latest news
   python main.py search "stock market"    # Search news
   python main.py stats                    # Show statistics
+  python main.py indicators --backfill    # Recompute indicators over full history
   python main.py clear                    # Clear database
         """
     )
     
     parser.add_argument(
         'command',
-        choices=['fetch', 'search', 'stats', 'clear', 'prices', 'fundamentals'],
+        choices=['fetch', 'search', 'stats', 'clear', 'prices', 'indicators', 'fundamentals'],
         help='Command to execute'
     )
     
@@ -105,6 +111,12 @@ Examples:
         help='Number of search results (default: 10)'
     )
     
+    parser.add_argument(
+        '--backfill',
+        action='store_true',
+        help='Recompute indicators for every date (indicators command; default: missing dates only)'
+    )
+    
     args = parser.parse_args()
     
     try:
@@ -112,6 +124,8 @@ Examples:
             fetch_news()
         elif args.command == 'prices':
             fetch_prices()
+        elif args.command == 'indicators':
+            calculate_indicators("backfill" if args.backfill else "incremental")
         elif args.command == 'fundamentals':
             fetch_fundamentals()
         elif args.command == 'search':
@@ -1,42 +1,171 @@
-import subprocess
+import argparse
 import sys
-import os
 import time
+from datetime import date
+from src.utils.db import connect
+from src.utils.pipeline import Pipeline, RunState, Stage
 
-def run_step(command, description):
-    print(f"\n{'='*60}")
-    print(f"STEP: {description}")
-    print(f"COMMAND: {command}")
-    print(f"{'='*60}")
-    
+# Stages run in this interpreter; heavy modules are imported inside each stage
+# so one missing client only fails the stages that need it.
+
+def fetch_news(ctx):
+    from src.collectors.news_fetcher import NewsFetcher
+    NewsFetcher(vector_db=ctx.vector_db).fetch_all()
+
+def filter_news(ctx):
+    from src.utils.filter_companies import main as filter_main
+    filter_main(vector_db=ctx.vector_db)
+
+def fetch_market_context(ctx):
+    from src.collectors.market_context_fetcher import MarketContextFetcher
+    MarketContextFetcher().fetch_global_indicators(days=30)
+
+def fetch_prices(ctx):
+    from src.collectors.price_fetcher import PriceFetcher
+    PriceFetcher().sync_prices()
+
+def calculate_indicators(ctx):
+    from src.collectors.price_fetcher import PriceFetcher
+    PriceFetcher().calculate_technical_indicators(mode="incremental")
+
+def fetch_fundamentals(ctx):
+    from src.collectors.screener_fetcher import ScreenerFetcher
+    ScreenerFetcher().fetch_fundamentals()
+
+def prepare_training_data(ctx):
+    from scripts.prepare_training_data import prepare_dataset
+    prepare_dataset(client=ctx.vector_db.client)
+
+def generate_predictions(ctx):
+    # Raises BatchPredictionError if any symbol failed: the stage's fingerprint is
+    # not recorded, so the next run retries instead of reporting "unchanged"
+    from src.core.prediction_agent import run_predictions
+    run_predictions(vector_db=ctx.vector_db)
+
+def calculate_accuracy(ctx):
+    from scripts.calculate_daily_accuracy import calculate_cumulative_accuracy
+    calculate_cumulative_accuracy()
+
+# Stage inputs: unchanged inputs since the last successful run skip the stage
+
+def _table_signature(db_path, table, columns):
+    """Aggregate fingerprint of a table (None if it does not exist yet)"""
+    conn = connect(db_path)
     try:
-        # Using shell=True for windows compatibility and to handle potential path issues
-        result = subprocess.run(command, shell=True, check=True)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\nError in step '{description}': {e}")
-        return False
+        return list(conn.execute(f"SELECT {columns} FROM {table}").fetchone())
+    except Exception:
+        return None
+    finally:
+        conn.close()
+
+def _price_inputs():
+    # SUM(close) catches corrected bars that the sync overlap re-fetches
+    return _table_signature("stock_market.db", "stock_daily_prices", "MAX(date), COUNT(*), SUM(close)")
+
+def _fundamentals_inputs():
+    return _table_signature("stock_market.db", "stock_fundamentals", "MAX(date), COUNT(*)")
+
+def _filter_high_water():
+    """Latest ingested_at the news filter has classified (None before its first run)"""
+    conn = connect("stock_market.db")
+    try:
+        row = conn.execute(
+            "SELECT high_water FROM news_filter_state WHERE collection = ?", ("top10_nifty_news",)
+        ).fetchone()
+        return row[0] if row else None
+    except Exception:
+        return None
+    finally:
+        conn.close()
+
+def _collection_state(ctx, name, newer_than=None):
+    """Article count of a Chroma collection, and whether any article was ingested after `newer_than`
+
+    Both are index lookups, so the check stays cheap as the archive grows.
+    """
+    try:
+        collection = ctx.vector_db.client.get_collection(name)
+    except Exception:
+        return None
+    state = {"count": collection.count()}
+    if newer_than is not None:
+        newer = collection.get(where={"ingested_at": {"$gt": newer_than}}, limit=1, include=[])
+        state["newer"] = bool(newer['ids'])
+    return state
+
+def _filtered_news(ctx):
+    # The filter only writes to its collection when it advances its high-water mark
+    return {"articles": _collection_state(ctx, "top10_nifty_news"), "high_water": _filter_high_water()}
+
+def filter_news_inputs(ctx):
+    from src.utils.config import config
+    return {"articles": _collection_state(ctx, config.COLLECTION_NAME, newer_than=_filter_high_water())}
+
+def indicator_inputs(ctx):
+    return {"prices": _price_inputs()}
+
+def training_data_inputs(ctx):
+    return {
+        "news": _filtered_news(ctx),
+        "prices": _price_inputs(),
+        "fundamentals": _fundamentals_inputs()
+    }
+
+def prediction_inputs(ctx):
+    # One prediction set per day; rerun within the day only when new data arrived
+    return {
+        "date": date.today().isoformat(),
+        "news": _filtered_news(ctx),
+        "prices": _price_inputs(),
+        "fundamentals": _fundamentals_inputs(),
+        "indicators": _table_signature("stock_market.db", "technical_indicators", "MAX(date), COUNT(*)"),
+        "market_context": _table_signature("stock_market.db", "market_context", "MAX(date), COUNT(*)")
+    }
+
+def accuracy_inputs(ctx):
+    return {
+        "prices": _price_inputs(),
+        **{table: _table_signature("predictions.db", table, "MAX(id), COUNT(*)")
+           for table in ("daily_predictions", "weekly_predictions", "monthly_predictions")}
+    }
+
+STAGES = [
+    Stage("news", "Fetching Latest News from RSS", fetch_news),
+    Stage("filter_news", "Filtering News for Top 10 Companies + Indices (Smart Filter)", filter_news,
+          depends_on=["news"], inputs=filter_news_inputs),
+    Stage("market_context", "Fetching Global Market Context (S&P 500, Oil, USD/INR)", fetch_market_context),
+    Stage("prices", "Fetching Daily Stock Prices (Yahoo Finance)", fetch_prices),
+    Stage("indicators", "Calculating Technical Indicators", calculate_indicators,
+          depends_on=["prices"], inputs=indicator_inputs),
+    Stage("fundamentals", "Fetching Corporate Fundamentals (Screener.in)", fetch_fundamentals),
+    Stage("training_data", "Merging Data into Training Dataset", prepare_training_data,
+          depends_on=["filter_news", "prices", "fundamentals"], inputs=training_data_inputs),
+    Stage("predictions", "Generating Enhanced AI Predictions with Technical Indicators", generate_predictions,
+          depends_on=["training_data", "indicators", "market_context"], inputs=prediction_inputs),
+    Stage("accuracy", "Calculating Consolidated Accuracy Metrics", calculate_accuracy,
+          depends_on=["predictions"], inputs=accuracy_inputs),
+]
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the stock prediction pipeline")
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Run every stage even if its inputs are unchanged since the last successful run'
+    )
+    args = parser.parse_args()
+
     print("STARTING STOCK PREDICTION PIPELINE")
     start_time = time.time()
-    
-    steps = [
-        ("python main.py fetch", "Fetching Latest News from RSS"),
-        ("python -m src.utils.filter_companies", "Filtering News for Top 10 Companies + Indices (Smart Filter)"),
-        ("python -m src.collectors.market_context_fetcher", "Fetching Global Market Context (S&P 500, Oil, USD/INR)"),
-        ("python main.py prices", "Fetching Daily Stock Prices (Yahoo Finance)"),
-        ("python main.py fundamentals", "Fetching Corporate Fundamentals (Screener.in)"),
-        ("python scripts/prepare_training_data.py", "Merging Data into Training Dataset"),
-        ("python -m src.core.prediction_agent", "Generating Enhanced AI Predictions with Technical Indicators"),
-        ("python scripts/calculate_daily_accuracy.py", "Calculating Consolidated Accuracy Metrics")
-    ]
-    
-    for cmd, desc in steps:
-        if not run_step(cmd, desc):
-            print(f"\nError in step '{desc}': Pipeline failed")
-            sys.exit(1)
-            
+
+    pipeline = Pipeline(STAGES, run_state=RunState(), force=args.force)
+    reports = pipeline.run()
+
+    failed = [name for name, report in reports.items() if report["status"] not in ("ok", "unchanged")]
+    if failed:
+        print(f"\nError: Pipeline failed ({', '.join(failed)} did not complete)")
+        sys.exit(1)
+
     end_time = time.time()
     duration = end_time - start_time
     print(f"\n{'='*60}")
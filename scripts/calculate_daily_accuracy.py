@@ -9,6 +9,8 @@ if sys.stdout.encoding != 'utf-8':
 
 sys.path.append('.')
 from src.utils.filter_companies import INDICES
+from src.utils.db import bump_cache_generation, connect
+from src.analysis.outcome_tracker import OutcomeTracker
 
 # Ticker mapping
 TICKER_MAP = {
@@ -25,74 +27,34 @@ TICKER_MAP = {
 }
 
 def calculate_cumulative_accuracy():
-    """Calculate cumulative accuracy from ALL historical predictions"""
+    """Calculate cumulative accuracy from ALL historical predictions
     
-    pred_conn = sqlite3.connect("predictions.db")
-    pred_conn.row_factory = sqlite3.Row
+    New predictions are scored into prediction_outcomes/accuracy_rollup first,
+    so only rows not seen before are joined against prices; the cumulative
+    figures are then summed from the rollup.
+    """
+    tracker = OutcomeTracker(TICKER_MAP, exclude_symbols=INDICES.keys())
+    scored = tracker.update()
+    for timeframe, count in scored.items():
+        print(f"   Scored {count} new {timeframe} predictions")
     
-    market_conn = sqlite3.connect("stock_market.db")
-    market_conn.row_factory = sqlite3.Row
+    pred_conn = connect("predictions.db")
+    pred_conn.row_factory = sqlite3.Row
     
-    # Get ALL daily predictions (cumulative)
-    predictions = pred_conn.execute("SELECT * FROM daily_predictions ORDER BY prediction_date").fetchall()
+    # Cumulative DAILY totals per (symbol, confidence bucket), indices excluded
+    groups = OutcomeTracker.summarize(pred_conn, "DAILY", exclude_symbols=list(INDICES.keys()))
     
-    total_predictions = 0
-    sentiment_correct = 0
-    price_correct = 0
+    total_predictions = sum(g["total"] for g in groups)
+    sentiment_correct = sum(g["correct"] for g in groups)
+    price_correct = sum(g["price_correct"] for g in groups)
     confidence_stats = {
         "high": {"correct": 0, "total": 0},
         "medium": {"correct": 0, "total": 0},
         "low": {"correct": 0, "total": 0}
     }
-    
-    for pred in predictions:
-        symbol = pred["symbol"]
-        pred_date = pred["prediction_date"]
-        
-        # Skip indices
-        if symbol in INDICES:
-            continue
-        
-        short_name = symbol.split(' ')[0]
-        ticker = TICKER_MAP.get(symbol, f"{short_name}.NS")
-        
-        # Get actual market data
-        price_row = market_conn.execute(
-            "SELECT open, close FROM stock_daily_prices WHERE symbol = ? AND date = ?",
-            (ticker, pred_date)
-        ).fetchone()
-        
-        if not price_row or not price_row["close"] or not price_row["open"]:
-            continue
-        
-        total_predictions += 1
-        
-        # Calculate accuracy
-        actual_move = ((price_row["close"] - price_row["open"]) / price_row["open"] * 100)
-        predicted_move = float(pred["predicted_move"]) if pred["predicted_move"] else 0
-        
-        # Sentiment accuracy
-        predicted_direction = "UP" if predicted_move >= 0 else "DOWN"
-        actual_direction = "UP" if actual_move >= 0 else "DOWN"
-        if predicted_direction == actual_direction:
-            sentiment_correct += 1
-        
-        # Price accuracy (within 0.5% tolerance)
-        if abs(predicted_move - actual_move) <= 0.5:
-            price_correct += 1
-        
-        # Confidence correlation
-        conf_score = int(pred["confidence_score"]) if pred["confidence_score"] else 5
-        if conf_score >= 7:
-            conf_level = "high"
-        elif conf_score >= 5:
-            conf_level = "medium"
-        else:
-            conf_level = "low"
-        
-        confidence_stats[conf_level]["total"] += 1
-        if predicted_direction == actual_direction:
-            confidence_stats[conf_level]["correct"] += 1
+    for g in groups:
+        confidence_stats[g["bucket"]]["total"] += g["total"]
+        confidence_stats[g["bucket"]]["correct"] += g["correct"]
     
     # Calculate percentages
     sentiment_accuracy = (sentiment_correct / total_predictions * 100) if total_predictions > 0 else 0
@@ -115,6 +77,7 @@ def calculate_cumulative_accuracy():
               total_predictions, round(high_conf_acc, 1), round(medium_conf_acc, 1), round(low_conf_acc, 1)))
         
         pred_conn.commit()
+        bump_cache_generation()
         
         print(f"✅ Cumulative Accuracy Updated for {today}")
         print(f"   Sentiment: {sentiment_accuracy:.1f}%")
@@ -128,7 +91,6 @@ def calculate_cumulative_accuracy():
         print(f"❌ Error storing metrics: {e}")
     
     pred_conn.close()
-    market_conn.close()
 
 if __name__ == "__main__":
     calculate_cumulative_accuracy()
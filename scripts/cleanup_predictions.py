@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from datetime import date
 from src.utils.config import config
+from src.utils.db import bump_cache_generation
 
 def cleanup_future_predictions():
     conn = sqlite3.connect('predictions.db')
@@ -75,6 +76,7 @@ def cleanup_future_predictions():
         
         deleted = cursor.rowcount
         conn.commit()
+        bump_cache_generation()
         
         print(f"✅ Deleted {deleted} future predictions")
     else:
@@ -1,4 +1,3 @@
-import sqlite3
 import pandas as pd
 import sys
 import os
@@ -7,12 +6,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.core.vector_db import VectorDB
+from src.utils.db import connect
 
-def prepare_dataset(db_path="stock_market.db", output_file="training_data.csv"):
+def prepare_dataset(db_path="stock_market.db", output_file="training_data.csv", client=None):
     print("Preparing training dataset...")
     
     # 1. Load Prices
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     prices_df = pd.read_sql_query("SELECT * FROM stock_daily_prices", conn)
     
     # 2. Load Fundamentals
@@ -23,7 +23,7 @@ def prepare_dataset(db_path="stock_market.db", output_file="training_data.csv"):
     from chromadb.config import Settings
     from src.utils.config import config
     
-    client = chromadb.PersistentClient(
+    client = client or chromadb.PersistentClient(
         path=config.CHROMA_DB_PATH,
         settings=Settings(anonymized_telemetry=False)
     )
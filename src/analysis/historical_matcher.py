@@ -4,33 +4,95 @@ Finds similar past scenarios and analyzes outcomes
 """
 import pandas as pd
 import numpy as np
-import sqlite3
-from datetime import datetime, timedelta
+from src.utils.db import connect
+from datetime import date, datetime, timedelta
+from src.analysis.scenario_index import ScenarioIndex, get_scenario_index
+from src.utils.config import config
 
 class HistoricalMatcher:
     """Match current conditions to historical scenarios"""
     
-    def __init__(self, db_path="stock_market.db"):
+    def __init__(self, db_path="stock_market.db", universe=None):
         self.db_path = db_path
+        # Search neighbours across every symbol instead of the symbol's own history
+        self.universe = config.SCENARIO_UNIVERSE if universe is None else universe
     
-    def find_similar_scenarios(self, symbol, current_indicators, lookback_days=365):
-        """Find historical days with similar technical indicators"""
+    def _load_history(self, symbol, lookback_days):
+        """Load prices + indicators for a symbol in one query, with next-day returns
+        
+        Next-day open/close come from the following price row (a shifted column),
+        so no per-day lookups are needed. is_candidate marks the days that are
+        old enough to have a known outcome.
+        """
+        query = f"""
+        SELECT sdp.date, sdp.open, sdp.close,
+               ti.rsi, ti.macd, ti.macd_signal, ti.macd_histogram,
+               ti.bb_upper, ti.bb_middle, ti.bb_lower, ti.volume_ratio,
+               (ti.symbol IS NOT NULL AND sdp.date < date('now', '-1 days')) AS is_candidate
+        FROM stock_daily_prices sdp
+        LEFT JOIN technical_indicators ti ON ti.symbol = sdp.symbol AND ti.date = sdp.date
+        WHERE sdp.symbol = ?
+        AND sdp.date >= date('now', '-{lookback_days} days')
+        ORDER BY sdp.date ASC
+        """
+        conn = connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=(symbol,))
+        conn.close()
+        
+        next_open = df['open'].shift(-1)
+        next_close = df['close'].shift(-1)
+        df['next_return'] = ((next_close - next_open) / next_open * 100).where(next_open > 0)
+        return df
+    
+    def find_similar_scenarios(self, symbol, current_indicators, lookback_days=365, market_context=None, k=None):
+        """Find the k historical days nearest to today in indicator space
+        
+        Uses the persisted ScenarioIndex (RSI, MACD histogram, BB position,
+        volume ratio and market regime) and falls back to the RSI/MACD window
+        match when no index rows are available.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            rsi_current = current_indicators.get('rsi') or current_indicators.get('db_rsi')
+            if not rsi_current:
+                return None
             
-            # Get historical technical indicators
-            query = f"""
-            SELECT ti.*, sdp.close, sdp.open
-            FROM technical_indicators ti
-            JOIN stock_daily_prices sdp ON ti.symbol = sdp.symbol AND ti.date = sdp.date
-            WHERE ti.symbol = ? 
-            AND ti.date >= date('now', '-{lookback_days} days')
-            AND ti.date < date('now', '-1 days')
-            ORDER BY ti.date DESC
-            """
+            index = get_scenario_index(self.db_path, None if self.universe else symbol)
+            if len(index) == 0:
+                return self._find_by_threshold(symbol, current_indicators, lookback_days)
             
-            df = pd.read_sql_query(query, conn, params=(symbol,))
-            conn.close()
+            since = (date.today() - timedelta(days=lookback_days)).isoformat()
+            vector = ScenarioIndex.query_vector(current_indicators, market_context)
+            rows, distances = index.nearest(vector, k or config.SCENARIO_TOP_K, since=since)
+            if len(rows) == 0:
+                return self._find_by_threshold(symbol, current_indicators, lookback_days)
+            
+            outcomes = self._analyze_weighted_outcomes(index.returns[rows], distances)
+            
+            return {
+                'total_matches': len(rows),
+                'outcomes': outcomes,
+                'confidence_boost': self._calculate_confidence_boost(outcomes),
+                'method': 'knn',
+                'neighbors': [
+                    {
+                        'symbol': str(index.symbols[r]),
+                        'date': str(index.dates[r]),
+                        'distance': round(float(d), 3),
+                        'next_day_return': round(float(index.returns[r]), 2)
+                    }
+                    for r, d in zip(rows, distances)
+                ]
+            }
+        
+        except Exception as e:
+            print(f"Error in historical matching: {e}")
+            return None
+    
+    def _find_by_threshold(self, symbol, current_indicators, lookback_days=365):
+        """Find historical days within an RSI ±10 window with the same MACD direction"""
+        try:
+            df = self._load_history(symbol, lookback_days)
+            df = df[df['is_candidate'] == 1]
             
             if df.empty:
                 return None
@@ -38,33 +100,28 @@ class HistoricalMatcher:
             # Define similarity criteria
             rsi_current = current_indicators.get('rsi') or current_indicators.get('db_rsi')
             macd_current = current_indicators.get('macd')
-            bb_position_current = current_indicators.get('bb_position', 50)  # % position in BB
             
             if not rsi_current:
                 return None
             
-            # Find similar days
-            similar_days = []
-            
-            for idx, row in df.iterrows():
-                # RSI similarity (within ±10)
-                rsi_match = abs(row['rsi'] - rsi_current) <= 10 if pd.notna(row['rsi']) else False
-                
-                # MACD signal similarity
-                macd_match = True
-                if macd_current and pd.notna(row['macd']) and pd.notna(row['macd_signal']):
-                    current_macd_signal = 'BULLISH' if macd_current > current_indicators.get('macd_signal', 0) else 'BEARISH'
-                    hist_macd_signal = 'BULLISH' if row['macd'] > row['macd_signal'] else 'BEARISH'
-                    macd_match = (current_macd_signal == hist_macd_signal)
-                
-                if rsi_match and macd_match:
-                    similar_days.append(row)
-            
-            if not similar_days:
+            # RSI similarity (within ±10); NaN RSI never matches
+            rsi_match = (df['rsi'] - rsi_current).abs() <= 10
+            
+            # MACD signal similarity (days without MACD data are not penalised)
+            macd_match = pd.Series(True, index=df.index)
+            if macd_current:
+                current_bullish = macd_current > (current_indicators.get('macd_signal') or 0)
+                has_macd = df['macd'].notna() & df['macd_signal'].notna()
+                hist_bullish = df['macd'] > df['macd_signal']
+                macd_match = ~has_macd | (hist_bullish == current_bullish)
+            
+            similar_days = df[rsi_match & macd_match]
+            
+            if similar_days.empty:
                 return None
             
             # Analyze outcomes
-            outcomes = self._analyze_outcomes(similar_days, symbol)
+            outcomes = self._analyze_outcomes(similar_days['next_return'])
             
             return {
                 'total_matches': len(similar_days),
@@ -76,64 +133,55 @@ class HistoricalMatcher:
             print(f"Error in historical matching: {e}")
             return None
     
-    def _analyze_outcomes(self, similar_days, symbol):
-        """Analyze what happened after similar scenarios"""
-        conn = sqlite3.connect(self.db_path)
-        
-        up_count = 0
-        down_count = 0
-        neutral_count = 0
-        total_return = 0
-        returns = []
-        
-        for day in similar_days:
-            # Get next day's performance
-            next_day_query = f"""
-            SELECT open, close 
-            FROM stock_daily_prices 
-            WHERE symbol = ? 
-            AND date > ?
-            ORDER BY date ASC
-            LIMIT 1
-            """
-            
-            next_day = pd.read_sql_query(next_day_query, conn, params=(symbol, day['date']))
-            
-            if not next_day.empty and pd.notna(next_day['open'].iloc[0]) and pd.notna(next_day['close'].iloc[0]):
-                next_open = next_day['open'].iloc[0]
-                next_close = next_day['close'].iloc[0]
-                
-                if next_open > 0:
-                    day_return = ((next_close - next_open) / next_open) * 100
-                    returns.append(day_return)
-                    total_return += day_return
-                    
-                    if day_return > 0.2:
-                        up_count += 1
-                    elif day_return < -0.2:
-                        down_count += 1
-                    else:
-                        neutral_count += 1
-        
-        conn.close()
+    def _analyze_outcomes(self, next_day_returns):
+        """Analyze what happened the day after similar scenarios"""
+        returns = pd.Series(next_day_returns, dtype=float).dropna().to_numpy()
         
         total_scenarios = len(returns)
         
         if total_scenarios == 0:
             return None
         
+        up_count = int((returns > 0.2).sum())
+        down_count = int((returns < -0.2).sum())
+        neutral_count = total_scenarios - up_count - down_count
+        
         return {
-            'up_probability': up_count / total_scenarios if total_scenarios > 0 else 0,
-            'down_probability': down_count / total_scenarios if total_scenarios > 0 else 0,
-            'neutral_probability': neutral_count / total_scenarios if total_scenarios > 0 else 0,
-            'average_return': total_return / total_scenarios if total_scenarios > 0 else 0,
-            'median_return': np.median(returns) if returns else 0,
-            'std_deviation': np.std(returns) if returns else 0,
-            'best_case': max(returns) if returns else 0,
-            'worst_case': min(returns) if returns else 0,
-            'win_rate': (up_count / total_scenarios * 100) if total_scenarios > 0 else 0
+            'up_probability': up_count / total_scenarios,
+            'down_probability': down_count / total_scenarios,
+            'neutral_probability': neutral_count / total_scenarios,
+            'average_return': float(returns.mean()),
+            'median_return': float(np.median(returns)),
+            'std_deviation': float(np.std(returns)),
+            'best_case': float(returns.max()),
+            'worst_case': float(returns.min()),
+            'win_rate': up_count / total_scenarios * 100
         }
     
+    def _analyze_weighted_outcomes(self, next_day_returns, distances):
+        """Outcome statistics for nearest neighbours, weighted by inverse distance"""
+        outcomes = self._analyze_outcomes(next_day_returns)
+        if not outcomes:
+            return None
+        
+        returns = np.asarray(next_day_returns, dtype=float)
+        weights = 1.0 / (np.asarray(distances, dtype=float) + 1e-6)
+        weights = weights / weights.sum()
+        
+        up_probability = float(weights[returns > 0.2].sum())
+        down_probability = float(weights[returns < -0.2].sum())
+        
+        outcomes.update({
+            'up_probability': up_probability,
+            'down_probability': down_probability,
+            'neutral_probability': max(0.0, 1.0 - up_probability - down_probability),
+            'average_return': float((weights * returns).sum()),
+            'win_rate': up_probability * 100,
+            'unweighted_average_return': outcomes['average_return'],
+            'mean_distance': float(np.mean(distances))
+        })
+        return outcomes
+    
     def _calculate_confidence_boost(self, outcomes):
         """Calculate confidence adjustment based on historical success rate"""
         if not outcomes:
@@ -159,7 +207,7 @@ class HistoricalMatcher:
     def get_regime_specific_performance(self, symbol, market_regime, lookback_days=180):
         """Get stock performance in specific market regimes"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             
             # Get historical data with market context
             query = f"""
@@ -184,23 +232,20 @@ class HistoricalMatcher:
                 return None
             
             # Calculate returns in this regime
-            returns = []
-            for idx, row in regime_data.iterrows():
-                if pd.notna(row['open']) and pd.notna(row['close']) and row['open'] > 0:
-                    day_return = ((row['close'] - row['open']) / row['open']) * 100
-                    returns.append(day_return)
+            valid = regime_data['open'].notna() & regime_data['close'].notna() & (regime_data['open'] > 0)
+            returns = ((regime_data['close'] - regime_data['open']) / regime_data['open'] * 100)[valid].to_numpy()
             
-            if not returns:
+            if len(returns) == 0:
                 return None
             
             return {
                 'regime': market_regime,
                 'days_in_regime': len(returns),
-                'average_return': np.mean(returns),
-                'volatility': np.std(returns),
-                'up_days': sum(1 for r in returns if r > 0),
-                'down_days': sum(1 for r in returns if r < 0),
-                'success_rate': (sum(1 for r in returns if r > 0) / len(returns) * 100) if returns else 0
+                'average_return': float(np.mean(returns)),
+                'volatility': float(np.std(returns)),
+                'up_days': int((returns > 0).sum()),
+                'down_days': int((returns < 0).sum()),
+                'success_rate': float((returns > 0).sum() / len(returns) * 100)
             }
             
         except Exception as e:
@@ -0,0 +1,253 @@
+"""
+Streaming Technical Indicators
+Carries each symbol's EMA/RSI/Bollinger/volume state between runs so that
+appending a bar updates every indicator in O(1) instead of recomputing the
+whole window. Values match TechnicalIndicators.calculate_all.
+"""
+import hashlib
+import json
+import math
+from collections import deque
+from src.utils.config import config
+from src.utils.db import connect
+
+
+class IndicatorState:
+    """Running indicator state for one symbol"""
+
+    RSI_PERIOD = 14
+    MACD_FAST = 12
+    MACD_SLOW = 26
+    MACD_SIGNAL = 9
+    BB_PERIOD = 20
+    BB_STD = 2
+    VOLUME_PERIOD = 20
+
+    def __init__(self):
+        self.bars = 0
+        self.last_date = None
+        self.last_close = None
+        self.ema_fast = None
+        self.ema_slow = None
+        self.macd_signal = None
+        # The stored RSI is the simple-average variant, so carry the gain/loss window
+        self.gains = deque(maxlen=self.RSI_PERIOD)
+        self.losses = deque(maxlen=self.RSI_PERIOD)
+        self.closes = deque(maxlen=self.BB_PERIOD)
+        self.volumes = deque(maxlen=self.VOLUME_PERIOD)
+
+    @staticmethod
+    def _ema(previous, value, span):
+        # pandas ewm(span=..., adjust=False): seeded with the first value
+        if previous is None:
+            return value
+        alpha = 2.0 / (span + 1)
+        return alpha * value + (1 - alpha) * previous
+
+    def update(self, date, close, volume):
+        """Append one bar and return its indicator row (None where still warming up)"""
+        close = float(close)
+        volume = float(volume) if volume is not None else 0.0
+
+        if self.last_close is not None:
+            delta = close - self.last_close
+            self.gains.append(max(delta, 0.0))
+            self.losses.append(max(-delta, 0.0))
+        self.closes.append(close)
+        self.volumes.append(volume)
+
+        self.ema_fast = self._ema(self.ema_fast, close, self.MACD_FAST)
+        self.ema_slow = self._ema(self.ema_slow, close, self.MACD_SLOW)
+        macd = self.ema_fast - self.ema_slow
+        self.macd_signal = self._ema(self.macd_signal, macd, self.MACD_SIGNAL)
+
+        self.bars += 1
+        self.last_date = date
+        self.last_close = close
+
+        row = {'date': date}
+        row.update(self._rsi())
+        row.update(self._macd(macd))
+        row.update(self._bollinger())
+        row.update(self._volume())
+        return row
+
+    def _rsi(self):
+        if len(self.gains) < self.RSI_PERIOD:
+            return {'rsi': None}
+        avg_gain = sum(self.gains) / self.RSI_PERIOD
+        avg_loss = sum(self.losses) / self.RSI_PERIOD
+        if avg_loss == 0:
+            return {'rsi': 100.0 if avg_gain > 0 else None}
+        return {'rsi': 100 - (100 / (1 + avg_gain / avg_loss))}
+
+    def _macd(self, macd):
+        if self.bars < self.MACD_SLOW + self.MACD_SIGNAL:
+            return {'macd': None, 'macd_signal': None, 'macd_histogram': None}
+        return {'macd': macd, 'macd_signal': self.macd_signal, 'macd_histogram': macd - self.macd_signal}
+
+    def _bollinger(self):
+        if len(self.closes) < self.BB_PERIOD:
+            return {'bb_upper': None, 'bb_middle': None, 'bb_lower': None}
+        middle = sum(self.closes) / self.BB_PERIOD
+        # Sample standard deviation, as pandas rolling().std()
+        variance = sum((c - middle) ** 2 for c in self.closes) / (self.BB_PERIOD - 1)
+        width = math.sqrt(variance) * self.BB_STD
+        return {'bb_upper': middle + width, 'bb_middle': middle, 'bb_lower': middle - width}
+
+    def _volume(self):
+        if len(self.volumes) < self.VOLUME_PERIOD:
+            return {'volume_ma': None, 'volume_ratio': None}
+        volume_ma = sum(self.volumes) / self.VOLUME_PERIOD
+        ratio = self.volumes[-1] / volume_ma if volume_ma > 0 else None
+        return {'volume_ma': volume_ma, 'volume_ratio': ratio}
+
+    def to_json(self):
+        return json.dumps({
+            'bars': self.bars,
+            'last_date': self.last_date,
+            'last_close': self.last_close,
+            'ema_fast': self.ema_fast,
+            'ema_slow': self.ema_slow,
+            'macd_signal': self.macd_signal,
+            'gains': list(self.gains),
+            'losses': list(self.losses),
+            'closes': list(self.closes),
+            'volumes': list(self.volumes)
+        })
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        state = cls()
+        state.bars = data['bars']
+        state.last_date = data['last_date']
+        state.last_close = data['last_close']
+        state.ema_fast = data['ema_fast']
+        state.ema_slow = data['ema_slow']
+        state.macd_signal = data['macd_signal']
+        state.gains.extend(data['gains'])
+        state.losses.extend(data['losses'])
+        state.closes.extend(data['closes'])
+        state.volumes.extend(data['volumes'])
+        return state
+
+
+class IndicatorEngine:
+    """Persists IndicatorState per symbol and appends new price bars to technical_indicators"""
+
+    COLUMNS = ['rsi', 'macd', 'macd_signal', 'macd_histogram',
+               'bb_upper', 'bb_middle', 'bb_lower', 'volume_ma', 'volume_ratio']
+
+    def __init__(self, db_path="stock_market.db"):
+        self.db_path = db_path
+        self._init_db()
+
+    def _init_db(self):
+        conn = connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                symbol TEXT PRIMARY KEY,
+                last_date TEXT,
+                state TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                window_hash TEXT
+            )
+        ''')
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(indicator_state)")}
+        if "window_hash" not in columns:
+            # States saved without a fingerprint are reseeded once
+            conn.execute("ALTER TABLE indicator_state ADD COLUMN window_hash TEXT")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _window_hash(conn, symbol, last_date):
+        """Fingerprint of the bars the price sync may rewrite: PRICE_SYNC_OVERLAP_DAYS up to last_date"""
+        rows = conn.execute(f'''
+            SELECT date, close, volume FROM stock_daily_prices
+            WHERE symbol = ? AND date > date(?, '-{int(config.PRICE_SYNC_OVERLAP_DAYS)} days') AND date <= ?
+              AND close IS NOT NULL
+            ORDER BY date
+        ''', (symbol, last_date, last_date)).fetchall()
+        return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+    def _load_state(self, conn, symbol):
+        """(state, stale): state is None if missing or the price history under it has changed"""
+        row = conn.execute("SELECT state, window_hash FROM indicator_state WHERE symbol = ?", (symbol,)).fetchone()
+        if not row:
+            return None, False
+
+        state = IndicatorState.from_json(row[0])
+        count = conn.execute(
+            "SELECT COUNT(*) FROM stock_daily_prices WHERE symbol = ? AND date <= ? AND close IS NOT NULL",
+            (symbol, state.last_date)
+        ).fetchone()[0]
+
+        # Back-filled bars (count) or bars re-synced with new values (any close
+        # or volume in the overlap window) invalidate the carried-over averages
+        if count != state.bars or row[1] != self._window_hash(conn, symbol, state.last_date):
+            return None, True
+        return state, False
+
+    def update_symbol(self, conn, symbol):
+        """Append every bar newer than the stored state; returns (rows written, reseeded)"""
+        state, stale = self._load_state(conn, symbol)
+        seeding = state is None
+        existing = set()
+        if seeding:
+            state = IndicatorState()
+            if not stale:
+                # First run: keep rows an earlier batch pass already wrote
+                existing = {r[0] for r in conn.execute(
+                    "SELECT date FROM technical_indicators WHERE symbol = ?", (symbol,)
+                )}
+            bars = conn.execute(
+                "SELECT date, close, volume FROM stock_daily_prices WHERE symbol = ? ORDER BY date",
+                (symbol,)
+            ).fetchall()
+        else:
+            bars = conn.execute(
+                "SELECT date, close, volume FROM stock_daily_prices WHERE symbol = ? AND date > ? ORDER BY date",
+                (symbol, state.last_date)
+            ).fetchall()
+
+        rows = []
+        for date, close, volume in bars:
+            if close is None:
+                continue
+            row = state.update(date, close, volume)
+            if date in existing or all(row[c] is None for c in self.COLUMNS):
+                continue
+            rows.append((symbol, date, *[row[c] for c in self.COLUMNS]))
+
+        if rows:
+            conn.executemany('''
+                INSERT OR REPLACE INTO technical_indicators
+                (symbol, date, rsi, macd, macd_signal, macd_histogram,
+                 bb_upper, bb_middle, bb_lower, volume_ma, volume_ratio)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        if state.bars:
+            conn.execute('''
+                INSERT OR REPLACE INTO indicator_state (symbol, last_date, state, updated_at, window_hash)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?)
+            ''', (symbol, state.last_date, state.to_json(), self._window_hash(conn, symbol, state.last_date)))
+        conn.commit()
+        return rows, seeding
+
+    def update_all(self, symbols):
+        """Stream new bars for every symbol; returns total rows written"""
+        conn = connect(self.db_path)
+        total = 0
+        for symbol in symbols:
+            rows, seeding = self.update_symbol(conn, symbol)
+            total += len(rows)
+            if rows:
+                action = "seeded" if seeding else "appended"
+                print(f"  ✓ {symbol}: {action} {len(rows)} rows ({rows[0][1]} → {rows[-1][1]})")
+            else:
+                print(f"  ✓ {symbol}: up to date")
+        conn.close()
+        return total
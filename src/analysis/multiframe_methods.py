@@ -11,6 +11,7 @@ def predict_daily(self, symbol, save=False):
     """
     import json
     from datetime import datetime, timedelta, date
+    from src.utils.db import bump_cache_generation
     
     print(f"\n📅 Generating DAILY prediction for {symbol}...")
     data = self._get_latest_data(symbol)
@@ -133,6 +134,7 @@ Focus strictly on the NEXT SINGLE TRADING DAY.
             
             conn.commit()
             conn.close()
+            bump_cache_generation()
             print(f"   💾 Saved to daily_predictions")
         
         return prediction
@@ -149,6 +151,7 @@ def predict_weekly(self, symbol, save=False):
     """
     import json
     from datetime import datetime, timedelta, date
+    from src.utils.db import bump_cache_generation
     
     print(f"\n📊 Generating WEEKLY prediction for {symbol}...")
     data = self._get_latest_data(symbol)
@@ -261,6 +264,7 @@ Provide ONLY the JSON response. Focus on SWING TRADING signals for the WEEK.
             
             conn.commit()
             conn.close()
+            bump_cache_generation()
             print(f"   💾 Saved to weekly_predictions")
         
         return prediction
@@ -277,6 +281,7 @@ def predict_monthly(self, symbol, save=False):
     """
     import json
     from datetime import datetime, timedelta, date
+    from src.utils.db import bump_cache_generation
     
     print(f"\n📈 Generating MONTHLY prediction for {symbol}...")
     data = self._get_latest_data(symbol)
@@ -390,6 +395,7 @@ Provide ONLY the JSON response. Focus on FUNDAMENTAL and LONG-TERM signals.
             
             conn.commit()
             conn.close()
+            bump_cache_generation()
             print(f"   💾 Saved to monthly_predictions")
         
         return prediction
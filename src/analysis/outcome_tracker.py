@@ -0,0 +1,347 @@
+"""
+Prediction Outcome Tracker
+Scores predictions once their day's bar is complete into a prediction_outcomes
+fact table and keeps accuracy_rollup aggregates (date, timeframe, symbol,
+confidence bucket) up to date incrementally. Outcomes whose prediction was
+replaced or deleted, or whose recent bar was corrected, are backed out and
+rescored.
+"""
+from src.utils.config import config
+from src.utils.db import bump_cache_generation, connect
+
+# Timeframe -> (predictions table, column the table is unique on with symbol)
+PREDICTION_TABLES = {
+    "DAILY": ("daily_predictions", "prediction_date"),
+    "WEEKLY": ("weekly_predictions", "prediction_week"),
+    "MONTHLY": ("monthly_predictions", "prediction_month")
+}
+
+# Direction/price hit rules per timeframe (same rules as the archive metrics):
+# DAILY compares the predicted move's sign with the open->close move and counts
+# a price hit within 0.5%; WEEKLY/MONTHLY check the stated direction.
+HIT_RULES = {
+    "DAILY": ("(predicted_move >= 0) = (actual_move >= 0)",
+              "ABS(predicted_move - actual_move) <= 0.5"),
+    "WEEKLY": ("(direction = 'UP' AND close > open) OR (direction = 'DOWN' AND close < open)", "0"),
+    "MONTHLY": ("(direction = 'UP' AND close > open) OR (direction = 'DOWN' AND close < open)", "0"),
+}
+
+
+class OutcomeTracker:
+    """Maintain prediction_outcomes and accuracy_rollup in predictions.db"""
+
+    def __init__(self, ticker_map, exclude_symbols=(), pred_db_path="predictions.db", main_db_path="stock_market.db"):
+        self.ticker_map = dict(ticker_map)
+        self.exclude_symbols = list(exclude_symbols)
+        self.pred_db_path = pred_db_path
+        self.main_db_path = main_db_path
+        self._init_db()
+
+    def _init_db(self):
+        conn = connect(self.pred_db_path)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(prediction_outcomes)")}
+        if columns and not {"period", "ticker"} <= columns:
+            # Earlier layout keyed on prediction_date; both tables are derived, rebuild them
+            conn.execute("DROP TABLE prediction_outcomes")
+            conn.execute("DROP TABLE IF EXISTS accuracy_rollup")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS prediction_outcomes (
+                timeframe TEXT,
+                prediction_id INTEGER,
+                symbol TEXT,
+                period TEXT,
+                prediction_date TEXT,
+                ticker TEXT,
+                direction TEXT,
+                predicted_move REAL,
+                confidence_bucket TEXT,
+                open REAL,
+                close REAL,
+                actual_move REAL,
+                direction_hit INTEGER,
+                price_hit INTEGER,
+                magnitude_error REAL,
+                scored_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (timeframe, prediction_id),
+                UNIQUE (timeframe, symbol, period)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS accuracy_rollup (
+                date TEXT,
+                timeframe TEXT,
+                symbol TEXT,
+                confidence_bucket TEXT,
+                total INTEGER,
+                direction_hits INTEGER,
+                price_hits INTEGER,
+                magnitude_error_sum REAL,
+                PRIMARY KEY (date, timeframe, symbol, confidence_bucket)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rollup_timeframe_date ON accuracy_rollup(timeframe, date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outcomes_timeframe_date ON prediction_outcomes(timeframe, prediction_date)")
+        # (symbol, period) keys written to a predictions table since the last
+        # update(), filled by triggers (see _watch_predictions)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS prediction_changes (
+                timeframe TEXT,
+                symbol TEXT,
+                period TEXT,
+                PRIMARY KEY (timeframe, symbol, period)
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+        conn.close()
+
+    def update(self, timeframes=("DAILY", "WEEKLY", "MONTHLY")):
+        """Retract stale outcomes, then score every completed prediction without one; returns {timeframe: rows}"""
+        conn = connect(self.pred_db_path)
+        conn.execute("ATTACH DATABASE ? AS market", (self.main_db_path,))
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        scored = {}
+        try:
+            for timeframe in timeframes:
+                table, period_column = PREDICTION_TABLES[timeframe]
+                if table not in tables:
+                    continue
+                with conn:
+                    full_scan = self._watch_predictions(conn, timeframe, table, period_column)
+                    self._retract_stale(conn, timeframe, table, full_scan)
+                    scored[timeframe] = self._score_new(conn, timeframe, table, period_column)
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.new_outcomes")
+            conn.execute("DROP TABLE IF EXISTS temp.stale_outcomes")
+            conn.close()
+        bump_cache_generation(self.pred_db_path)
+        return scored
+
+    @staticmethod
+    def _watch_predictions(conn, timeframe, table, period_column):
+        """Install the triggers that log written (symbol, period) keys; True if they were just created
+
+        INSERT OR REPLACE only fires delete triggers with recursive_triggers on,
+        so the insert trigger is what catches a replaced prediction. Rows
+        written before the triggers existed are unknown, so the caller scans
+        everything once.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{table}_changed_insert",)
+        ).fetchone()
+        if exists:
+            return False
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "OLD"), ("DELETE", "OLD")):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_changed_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT OR IGNORE INTO prediction_changes (timeframe, symbol, period)
+                    VALUES ('{timeframe}', {row}.symbol, {row}.{period_column});
+                END
+            """)
+        return True
+
+    def _retract_stale(self, conn, timeframe, table, full_scan=False):
+        """Back out outcomes that no longer match a prediction row or its price bar
+
+        - the prediction was deleted, replaced (INSERT OR REPLACE on the
+          table's (symbol, period) key gives the new row a new id) or updated:
+          only keys logged in prediction_changes are looked at, unless the
+          change triggers were only just installed;
+        - the bar changed: prices are re-synced PRICE_SYNC_OVERLAP_DAYS back
+          from the last stored bar, so only that window is compared.
+        """
+        if full_scan:
+            changed = f"""
+                SELECT o.rowid AS outcome_rowid FROM prediction_outcomes o
+                LEFT JOIN {table} p ON p.id = o.prediction_id
+                WHERE o.timeframe = ? AND p.id IS NULL
+            """
+        else:
+            # Any logged key gets rescored; an unchanged prediction scores the same
+            changed = """
+                SELECT o.rowid AS outcome_rowid FROM prediction_changes c
+                JOIN prediction_outcomes o
+                  ON o.timeframe = c.timeframe AND o.symbol = c.symbol AND o.period = c.period
+                WHERE c.timeframe = ?
+            """
+
+        conn.execute("DROP TABLE IF EXISTS temp.stale_outcomes")
+        conn.execute(f"""
+            CREATE TEMP TABLE stale_outcomes AS
+            {changed}
+            UNION
+            SELECT o.rowid FROM prediction_outcomes o
+            WHERE o.timeframe = ?
+              AND o.prediction_date >= date(
+                      (SELECT MAX(prediction_date) FROM prediction_outcomes WHERE timeframe = ?),
+                      '-{int(config.PRICE_SYNC_OVERLAP_DAYS)} days')
+              AND NOT EXISTS (
+                  SELECT 1 FROM market.stock_daily_prices s
+                  WHERE s.symbol = o.ticker AND s.date = o.prediction_date
+                    AND s.open = o.open AND s.close = o.close
+              )
+        """, (timeframe, timeframe, timeframe))
+        conn.execute("DELETE FROM prediction_changes WHERE timeframe = ?", (timeframe,))
+
+        stale = "FROM prediction_outcomes o WHERE o.rowid IN (SELECT outcome_rowid FROM temp.stale_outcomes)"
+        self._add_to_rollup(conn, f"""
+            SELECT o.prediction_date, o.timeframe, o.symbol, o.confidence_bucket,
+                   -COUNT(*), -SUM(o.direction_hit), -SUM(o.price_hit), -SUM(o.magnitude_error)
+            {stale}
+            GROUP BY o.prediction_date, o.timeframe, o.symbol, o.confidence_bucket
+        """)
+        conn.execute("DELETE FROM prediction_outcomes WHERE rowid IN (SELECT outcome_rowid FROM temp.stale_outcomes)")
+        conn.execute("DELETE FROM accuracy_rollup WHERE total = 0")
+
+    @staticmethod
+    def _scored_sql(timeframe, ticker_map, exclude_symbols=(), conditions=""):
+        """(sql, params): one scored row per prediction whose day's bar is complete
+
+        Shared by update() and summarize_live() so both count the same
+        predictions: today's bar may still be intraday, so it is never scored.
+        `conditions` are extra AND clauses on p (prediction) / s (bar); their
+        parameters go after the returned ones.
+        """
+        table, period_column = PREDICTION_TABLES[timeframe]
+        hit_expr, price_hit_expr = HIT_RULES[timeframe]
+        ticker_values = ",".join(["(?, ?)"] * len(ticker_map)) or "(NULL, NULL)"
+        ticker_params = [v for pair in dict(ticker_map).items() for v in pair]
+        exclude_clause = ""
+        if exclude_symbols:
+            exclude_clause = f"AND p.symbol NOT IN ({','.join('?' * len(exclude_symbols))})"
+
+        sql = f"""
+            WITH ticker_map(symbol, ticker) AS (VALUES {ticker_values}),
+            priced AS (
+                SELECT p.id AS prediction_id,
+                       p.symbol,
+                       p.{period_column} AS period,
+                       p.prediction_date,
+                       s.symbol AS ticker,
+                       p.direction,
+                       COALESCE(CAST(p.predicted_move AS REAL), 0) AS predicted_move,
+                       COALESCE(NULLIF(CAST(p.confidence_score AS INTEGER), 0), 5) AS confidence,
+                       s.open,
+                       s.close,
+                       (s.close - s.open) * 100.0 / s.open AS actual_move
+                FROM {table} p
+                LEFT JOIN ticker_map m ON m.symbol = p.symbol
+                JOIN market.stock_daily_prices s
+                  ON s.symbol = COALESCE(m.ticker, substr(p.symbol, 1, instr(p.symbol || ' ', ' ') - 1) || '.NS')
+                 AND s.date = p.prediction_date
+                WHERE s.open AND s.close
+                  AND s.date < date('now', 'localtime')
+                  {exclude_clause}
+                  {conditions}
+            )
+            SELECT prediction_id, symbol, period, prediction_date, ticker, direction, predicted_move,
+                   CASE WHEN confidence >= 7 THEN 'high' WHEN confidence >= 5 THEN 'medium' ELSE 'low' END AS confidence_bucket,
+                   open, close, actual_move,
+                   CASE WHEN {hit_expr} THEN 1 ELSE 0 END AS direction_hit,
+                   CASE WHEN {price_hit_expr} THEN 1 ELSE 0 END AS price_hit,
+                   ABS(predicted_move - actual_move) AS magnitude_error
+            FROM priced
+        """
+        return sql, ticker_params + list(exclude_symbols)
+
+    def _score_new(self, conn, timeframe, table, period_column):
+        # Newly scorable predictions only (anti-join on the outcome key)
+        sql, params = self._scored_sql(timeframe, self.ticker_map, self.exclude_symbols, """
+            AND NOT EXISTS (
+                SELECT 1 FROM prediction_outcomes o
+                WHERE o.timeframe = ? AND o.prediction_id = p.id
+            )
+        """)
+        conn.execute("DROP TABLE IF EXISTS temp.new_outcomes")
+        conn.execute(f"CREATE TEMP TABLE new_outcomes AS SELECT ? AS timeframe, scored.* FROM ({sql}) scored",
+                     [timeframe] + params + [timeframe])
+
+        count = conn.execute("SELECT COUNT(*) FROM temp.new_outcomes").fetchone()[0]
+        if not count:
+            return 0
+
+        # Record the new facts and fold them into the rollup
+        conn.execute("""
+            INSERT INTO prediction_outcomes
+            (timeframe, prediction_id, symbol, period, prediction_date, ticker, direction, predicted_move,
+             confidence_bucket, open, close, actual_move, direction_hit, price_hit, magnitude_error)
+            SELECT timeframe, prediction_id, symbol, period, prediction_date, ticker, direction, predicted_move,
+                   confidence_bucket, open, close, actual_move, direction_hit, price_hit, magnitude_error
+            FROM temp.new_outcomes
+        """)
+        self._add_to_rollup(conn, """
+            SELECT prediction_date, timeframe, symbol, confidence_bucket,
+                   COUNT(*), SUM(direction_hit), SUM(price_hit), SUM(magnitude_error)
+            FROM temp.new_outcomes
+            GROUP BY prediction_date, timeframe, symbol, confidence_bucket
+        """)
+        return count
+
+    @staticmethod
+    def _add_to_rollup(conn, select_sql):
+        conn.execute(f"""
+            INSERT INTO accuracy_rollup
+            (date, timeframe, symbol, confidence_bucket, total, direction_hits, price_hits, magnitude_error_sum)
+            {select_sql}
+            ON CONFLICT (date, timeframe, symbol, confidence_bucket) DO UPDATE SET
+                total = total + excluded.total,
+                direction_hits = direction_hits + excluded.direction_hits,
+                price_hits = price_hits + excluded.price_hits,
+                magnitude_error_sum = magnitude_error_sum + excluded.magnitude_error_sum
+        """)
+
+    @classmethod
+    def summarize_live(cls, conn, timeframe, ticker_map, start_date=None, end_date=None, exclude_symbols=()):
+        """summarize()'s groups scored at query time from the predictions table (needs `market` attached)
+
+        For readers that cannot wait for the rollup (or may not write); counts
+        exactly the predictions update() would score.
+        """
+        conditions = ""
+        params = []
+        if start_date:
+            conditions += " AND p.prediction_date >= ?"
+            params.append(start_date)
+        if end_date:
+            conditions += " AND p.prediction_date <= ?"
+            params.append(end_date)
+
+        sql, sql_params = cls._scored_sql(timeframe, ticker_map, exclude_symbols, conditions)
+        return conn.execute(f"""
+            SELECT symbol,
+                   confidence_bucket AS bucket,
+                   COUNT(*) AS total,
+                   SUM(direction_hit) AS correct,
+                   SUM(price_hit) AS price_correct
+            FROM ({sql})
+            GROUP BY symbol, confidence_bucket
+        """, sql_params + params).fetchall()
+
+    @staticmethod
+    def summarize(conn, timeframe="DAILY", start_date=None, end_date=None, exclude_symbols=()):
+        """Rollup groups per (symbol, bucket) for a date range: rows of symbol, bucket, total, correct, price_correct"""
+        where = ["timeframe = ?"]
+        params = [timeframe]
+        if start_date:
+            where.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("date <= ?")
+            params.append(end_date)
+        if exclude_symbols:
+            where.append(f"symbol NOT IN ({','.join('?' * len(exclude_symbols))})")
+            params.extend(exclude_symbols)
+
+        return conn.execute(f"""
+            SELECT symbol,
+                   confidence_bucket AS bucket,
+                   SUM(total) AS total,
+                   SUM(direction_hits) AS correct,
+                   SUM(price_hits) AS price_correct
+            FROM accuracy_rollup
+            WHERE {' AND '.join(where)}
+            GROUP BY symbol, confidence_bucket
+            HAVING SUM(total) > 0
+        """, params).fetchall()
@@ -0,0 +1,213 @@
+"""
+Scenario Index
+Normalized multi-feature indicator space of historical days with known
+next-day outcomes, searched with brute-force NumPy k-nearest-neighbours.
+"""
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from src.utils.config import config
+from src.utils.db import connect
+
+# Encodings for the categorical market regime columns in market_context
+TREND_CODES = {"BULL": 1.0, "SIDEWAYS": 0.0, "NEUTRAL": 0.0, "BEAR": -1.0}
+VOLATILITY_CODES = {"LOW": -1.0, "MEDIUM": 0.0, "HIGH": 1.0}
+
+
+class ScenarioIndex:
+    """Feature matrix + outcomes for one symbol (or the whole universe)"""
+
+    # macd_hist_pct is the MACD histogram as % of price, comparable across symbols
+    FEATURES = ["rsi", "macd_hist_pct", "bb_position", "volume_ratio", "nifty_trend", "volatility_regime"]
+
+    def __init__(self, symbols, dates, features, returns, signature):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.dates = np.asarray(dates, dtype=str)
+        self.returns = np.asarray(returns, dtype=float)
+        self.signature = signature
+        self.features = list(self.FEATURES)
+
+        features = np.asarray(features, dtype=float)
+        self.mean = np.nanmean(features, axis=0) if len(features) else np.zeros(len(self.FEATURES))
+        self.std = np.nanstd(features, axis=0) if len(features) else np.ones(len(self.FEATURES))
+        self.mean = np.nan_to_num(self.mean)
+        self.std = np.where(np.nan_to_num(self.std) > 0, np.nan_to_num(self.std), 1.0)
+
+        # Standardize; missing history values sit at the feature mean
+        self.matrix = np.nan_to_num((features - self.mean) / self.std)
+
+    def __len__(self):
+        return len(self.returns)
+
+    def is_current(self, signature):
+        """Built from these indicator rows, in the current feature space"""
+        return (
+            self.signature == signature
+            and self.features == self.FEATURES
+            and self.mean.shape == self.std.shape == (len(self.FEATURES),)
+            and self.matrix.ndim == 2 and self.matrix.shape[1] == len(self.FEATURES)
+        )
+
+    @staticmethod
+    def signature_for(conn, symbol=None):
+        """Cheap fingerprint of the indicator rows an index was built from"""
+        if symbol:
+            row = conn.execute("SELECT MAX(date), COUNT(*) FROM technical_indicators WHERE symbol = ?", (symbol,)).fetchone()
+        else:
+            row = conn.execute("SELECT MAX(date), COUNT(*) FROM technical_indicators").fetchone()
+        return f"{row[0]}|{row[1]}"
+
+    @classmethod
+    def build(cls, db_path, symbol=None):
+        """Build an index for one symbol, or for every symbol when symbol is None"""
+        conn = connect(db_path)
+        where = "WHERE ti.symbol = ?" if symbol else ""
+        params = (symbol,) if symbol else ()
+
+        features_df = pd.read_sql_query(f"""
+            SELECT ti.symbol, ti.date, ti.rsi, ti.macd_histogram, ti.bb_upper, ti.bb_lower,
+                   ti.volume_ratio, sdp.close, mc.nifty_trend, mc.volatility_regime
+            FROM technical_indicators ti
+            JOIN stock_daily_prices sdp ON ti.symbol = sdp.symbol AND ti.date = sdp.date
+            LEFT JOIN market_context mc ON mc.date = ti.date
+            {where}
+        """, conn, params=params)
+
+        prices_df = pd.read_sql_query(f"""
+            SELECT symbol, date, open, close FROM stock_daily_prices
+            {"WHERE symbol = ?" if symbol else ""}
+            ORDER BY symbol, date
+        """, conn, params=params)
+
+        signature = cls.signature_for(conn, symbol)
+        conn.close()
+
+        # Next trading day's open->close return, per symbol
+        grouped = prices_df.groupby('symbol')
+        next_open = grouped['open'].shift(-1)
+        next_close = grouped['close'].shift(-1)
+        prices_df['next_return'] = ((next_close - next_open) / next_open * 100).where(next_open > 0)
+
+        df = features_df.merge(prices_df[['symbol', 'date', 'next_return']], on=['symbol', 'date'], how='inner')
+        df = df[df['next_return'].notna() & df['rsi'].notna()]
+
+        matrix = cls.feature_frame(df).to_numpy()
+        return cls(df['symbol'].to_numpy(), df['date'].to_numpy(), matrix, df['next_return'].to_numpy(), signature)
+
+    @classmethod
+    def feature_frame(cls, df):
+        """Map raw indicator columns to the index feature space"""
+        band_width = (df['bb_upper'] - df['bb_lower']).where(lambda w: w > 0)
+        return pd.DataFrame({
+            "rsi": df['rsi'],
+            "macd_hist_pct": df['macd_histogram'] / df['close'].where(df['close'] > 0) * 100,
+            "bb_position": (df['close'] - df['bb_lower']) / band_width * 100,
+            "volume_ratio": df['volume_ratio'],
+            "nifty_trend": df['nifty_trend'].map(TREND_CODES),
+            "volatility_regime": df['volatility_regime'].map(VOLATILITY_CODES)
+        }, columns=cls.FEATURES).astype(float)
+
+    @classmethod
+    def query_vector(cls, indicators, market_context=None):
+        """Current-day feature vector (NaN for anything unknown)"""
+        market_context = market_context or {}
+        close = indicators.get('close')
+        macd_hist = indicators.get('macd_histogram')
+        values = {
+            "rsi": indicators.get('rsi') or indicators.get('db_rsi'),
+            "macd_hist_pct": (macd_hist / close * 100) if macd_hist is not None and close else None,
+            "bb_position": indicators.get('bb_position'),
+            "volume_ratio": indicators.get('volume_ratio'),
+            "nifty_trend": TREND_CODES.get(market_context.get('nifty_trend')),
+            "volatility_regime": VOLATILITY_CODES.get(market_context.get('volatility_regime'))
+        }
+        return np.array([np.nan if values[f] is None else float(values[f]) for f in cls.FEATURES])
+
+    def nearest(self, vector, k, since=None):
+        """Top-k nearest historical days (indices, distances), closest first
+
+        Distance is Euclidean in standardized space over the features known
+        for the current day; `since` (ISO date) limits the search window.
+        """
+        candidates = np.arange(len(self))
+        if since is not None:
+            candidates = candidates[self.dates >= since]
+        if len(candidates) == 0:
+            return candidates, np.array([])
+
+        known = ~np.isnan(vector)
+        q = (vector[known] - self.mean[known]) / self.std[known]
+        diff = self.matrix[candidates][:, known] - q
+        distances = np.sqrt((diff * diff).sum(axis=1))
+
+        k = min(k, len(candidates))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return candidates[top], distances[top]
+
+    def save(self, path):
+        """Write to a temp file in the same directory, then atomically replace path"""
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f, symbols=self.symbols, dates=self.dates, matrix=self.matrix,
+                    returns=self.returns, mean=self.mean, std=self.std, signature=np.array(self.signature),
+                    features=np.array(self.features)
+                )
+            os.replace(tmp_path, path)
+        finally:
+            # Only left behind if writing failed
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        index = cls.__new__(cls)
+        index.symbols = data['symbols']
+        index.dates = data['dates']
+        index.matrix = data['matrix']
+        index.returns = data['returns']
+        index.mean = data['mean']
+        index.std = data['std']
+        index.signature = str(data['signature'])
+        # Files saved before feature names were stored never match
+        index.features = [str(f) for f in data['features']] if 'features' in data.files else []
+        return index
+
+
+_indexes = {}
+# Guards _path_locks only; builds hold their path's lock so other symbols proceed
+_lock = threading.Lock()
+_path_locks = {}
+
+
+def get_scenario_index(db_path, symbol=None):
+    """Load (or build and persist) the index for a symbol / the universe, rebuilding when stale"""
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol) if symbol else "_universe"
+    path = os.path.join(config.SCENARIO_INDEX_DIR, f"{name}.npz")
+
+    conn = connect(db_path)
+    signature = ScenarioIndex.signature_for(conn, symbol)
+    conn.close()
+
+    with _lock:
+        path_lock = _path_locks.setdefault(path, threading.Lock())
+
+    with path_lock:
+        index = _indexes.get(path)
+        if index is None and os.path.exists(path):
+            try:
+                index = ScenarioIndex.load(path)
+            except Exception as e:
+                print(f"Error loading scenario index {path}: {e}")
+        if index is None or not index.is_current(signature):
+            index = ScenarioIndex.build(db_path, symbol)
+            os.makedirs(config.SCENARIO_INDEX_DIR, exist_ok=True)
+            index.save(path)
+        _indexes[path] = index
+        return index
@@ -88,7 +88,70 @@ class TechnicalIndicators:
         volume_ratio = current_volume / avg_volume if avg_volume > 0 else None
         
         return (avg_volume if not pd.isna(avg_volume) else None,
-                volume_ratio if volume_ratio and not pd.isna(volume_ratio) else None)
+                volume_ratio if volume_ratio is not None and not pd.isna(volume_ratio) else None)
+    
+    # Full-series variants: one vectorized pass over a symbol's whole history.
+    # Each value equals what the scalar method above returns for the prices up
+    # to and including that row (NaN until enough history exists).
+    
+    @staticmethod
+    def rsi_series(prices, period=14):
+        """RSI for every row"""
+        delta = prices.diff()
+        avg_gains = delta.where(delta > 0, 0).rolling(window=period).mean()
+        avg_losses = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        rs = avg_gains / avg_losses
+        rsi = 100 - (100 / (1 + rs))
+        # The first diff is NaN (filled as 0 above); need `period` real changes
+        return rsi.where(pd.Series(np.arange(len(prices)) >= period, index=prices.index))
+    
+    @staticmethod
+    def macd_series(prices, fast=12, slow=26, signal=9):
+        """MACD line, signal line and histogram for every row"""
+        macd_line = prices.ewm(span=fast, adjust=False).mean() - prices.ewm(span=slow, adjust=False).mean()
+        signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+        histogram = macd_line - signal_line
+        
+        # Match calculate_macd's minimum history requirement
+        warm = pd.Series(np.arange(len(prices)) >= slow + signal - 1, index=prices.index)
+        return macd_line.where(warm), signal_line.where(warm), histogram.where(warm)
+    
+    @staticmethod
+    def bollinger_series(prices, period=20, num_std=2):
+        """Upper, middle and lower Bollinger Bands for every row"""
+        middle_band = prices.rolling(window=period).mean()
+        std_dev = prices.rolling(window=period).std()
+        return middle_band + (std_dev * num_std), middle_band, middle_band - (std_dev * num_std)
+    
+    @staticmethod
+    def volume_series(volumes, period=20):
+        """Volume moving average and volume ratio for every row"""
+        volume_ma = volumes.rolling(window=period).mean()
+        volume_ratio = (volumes / volume_ma).where(volume_ma > 0)
+        return volume_ma, volume_ratio
+    
+    @classmethod
+    def calculate_all(cls, df):
+        """All stored indicators for a chronologically sorted date/close/volume frame"""
+        prices = df['close'].astype(float)
+        volumes = df['volume'].astype(float)
+        
+        macd, macd_signal, macd_hist = cls.macd_series(prices)
+        bb_upper, bb_middle, bb_lower = cls.bollinger_series(prices)
+        volume_ma, volume_ratio = cls.volume_series(volumes)
+        
+        return pd.DataFrame({
+            'date': df['date'],
+            'rsi': cls.rsi_series(prices),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_histogram': macd_hist,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'volume_ma': volume_ma,
+            'volume_ratio': volume_ratio
+        })
     
     @staticmethod
     def get_rsi_signal(rsi):
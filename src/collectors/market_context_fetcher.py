@@ -5,7 +5,7 @@ Fetches global market indicators: S&P 500, Crude Oil, USD/INR
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-import sqlite3
+from src.utils.db import bump_cache_generation, connect
 import numpy as np
 
 class MarketContextFetcher:
@@ -14,7 +14,7 @@ class MarketContextFetcher:
         self._init_db()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS market_context (
@@ -101,7 +101,7 @@ class MarketContextFetcher:
     
     def _save_market_context(self, sp500_data, oil_data, inr_data, nifty_data):
         """Save market context to database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Combine all data by date
@@ -135,6 +135,7 @@ class MarketContextFetcher:
         
         conn.commit()
         conn.close()
+        bump_cache_generation()
         
         # Print latest context
         if len(dates) > 0:
@@ -149,7 +150,7 @@ class MarketContextFetcher:
     
     def get_latest_context(self):
         """Get the most recent market context"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM market_context 
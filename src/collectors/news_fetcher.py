@@ -1,17 +1,63 @@
 import feedparser
 import requests
+from src.utils.db import connect
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from src.utils.config import config
-from src.core.vector_db import VectorDB
+from src.core.vector_db import PartialIngestError, VectorDB
 
 class NewsFetcher:
     """Fetch news from RSS feeds and store in vector database"""
     
-    def __init__(self):
-        self.db = VectorDB()
+    def __init__(self, db_path="stock_market.db", vector_db=None):
+        self.db = vector_db or VectorDB()
         self.feeds = config.ALL_FEEDS
+        self.state_db_path = db_path
+        self._init_db()
+        
+        # Pooled HTTP client shared by all feed downloads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.feeds), pool_maxsize=config.FEED_FETCH_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def _init_db(self):
+        """Per-feed ETag/Last-Modified validators for conditional GETs"""
+        conn = connect(self.state_db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feed_fetch_state (
+                feed_name TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                last_status INTEGER,
+                last_fetched TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+    
+    def _load_feed_state(self) -> Dict[str, Dict]:
+        conn = connect(self.state_db_path)
+        rows = conn.execute("SELECT feed_name, url, etag, last_modified FROM feed_fetch_state").fetchall()
+        conn.close()
+        # Validators only apply while the feed URL is unchanged
+        return {name: {"url": url, "etag": etag, "last_modified": modified} for name, url, etag, modified in rows}
+    
+    def _save_feed_state(self, feed_name: str, feed_url: str, result: Dict):
+        conn = connect(self.state_db_path)
+        conn.execute('''
+            INSERT OR REPLACE INTO feed_fetch_state (feed_name, url, etag, last_modified, last_status, last_fetched)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (feed_name, feed_url, result.get('etag'), result.get('last_modified'),
+              result.get('status'), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        conn.commit()
+        conn.close()
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
@@ -52,87 +98,160 @@ class NewsFetcher:
         # Fallback to current time
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    def fetch_feed(self, feed_name: str, feed_url: str) -> int:
-        """Fetch articles from a single RSS feed"""
-        print(f"\nFetching from {feed_name}...")
-        print(f"URL: {feed_url}")
+    def _download_feed(self, feed_name: str, feed_url: str, state: Dict = None) -> Dict:
+        """Conditionally download and parse one feed (runs in a worker thread)"""
+        headers = {'User-Agent': 'Mozilla/5.0 (compatible; TheResearcher/1.0)'}
+        if state and state.get('url') == feed_url:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
         
+        start = time.perf_counter()
+        result = {"feed_name": feed_name, "status": None, "feed": None, "bytes": 0,
+                  "etag": None, "last_modified": None, "error": None}
         try:
-            # Parse RSS feed
-            feed = feedparser.parse(feed_url)
-            
-            if not feed.entries:
-                print(f"  Warning: No entries found in feed")
-                return 0
-            
-            added_count = 0
-            
-            # Process each entry
-            for entry in feed.entries[:config.MAX_ARTICLES_PER_FEED]:
-                try:
-                    # Extract article data
-                    title = self._clean_text(entry.get('title', ''))
-                    description = self._clean_text(
-                        entry.get('description', '') or 
-                        entry.get('summary', '')
-                    )
-                    url = entry.get('link', '')
-                    published_date = self._parse_date(entry)
-                    
-                    # Skip if missing essential data
-                    if not title or not url:
-                        continue
-                    
-                    # Determine source
-                    if 'moneycontrol' in feed_name:
-                        source = 'MoneyControl'
-                    elif 'economic_times' in feed_name:
-                        source = 'Economic Times'
-                    else:
-                        source = feed_name
-                    
-                    # Extract category from feed name
-                    category = feed_name.split('_')[-1] if '_' in feed_name else ''
-                    
-                    # Add to database
-                    if self.db.add_article(
-                        title=title,
-                        description=description,
-                        url=url,
-                        source=source,
-                        published_date=published_date,
-                        category=category
-                    ):
-                        added_count += 1
+            response = self.session.get(feed_url, headers=headers, timeout=config.FEED_TIMEOUT_SECONDS)
+            result["status"] = response.status_code
+            result["bytes"] = len(response.content)
+            result["etag"] = response.headers.get('ETag')
+            result["last_modified"] = response.headers.get('Last-Modified')
+            if response.status_code == 200:
+                result["feed"] = feedparser.parse(response.content)
+            elif response.status_code == 304:
+                # A 304 need not repeat the validators: keep the ones we sent
+                result["etag"] = result["etag"] or headers.get('If-None-Match')
+                result["last_modified"] = result["last_modified"] or headers.get('If-Modified-Since')
+            else:
+                result["error"] = f"HTTP {response.status_code}"
+        except Exception as e:
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - start
+        return result
+    
+    def _ingest_feed(self, feed_name: str, feed) -> Tuple[int, bool]:
+        """Store the entries of a parsed feed; returns (new articles, whether every entry was stored)"""
+        if not feed.entries:
+            print(f"  Warning: No entries found in feed")
+            return 0, True
+        
+        articles = []
+        complete = True
+        
+        # Process each entry
+        for entry in feed.entries[:config.MAX_ARTICLES_PER_FEED]:
+            try:
+                # Extract article data
+                title = self._clean_text(entry.get('title', ''))
+                description = self._clean_text(
+                    entry.get('description', '') or 
+                    entry.get('summary', '')
+                )
+                url = entry.get('link', '')
+                published_date = self._parse_date(entry)
                 
-                except Exception as e:
-                    print(f"  Error processing entry: {e}")
+                # Skip if missing essential data
+                if not title or not url:
                     continue
+                
+                # Determine source
+                if 'moneycontrol' in feed_name:
+                    source = 'MoneyControl'
+                elif 'economic_times' in feed_name:
+                    source = 'Economic Times'
+                else:
+                    source = feed_name
+                
+                # Extract category from feed name
+                category = feed_name.split('_')[-1] if '_' in feed_name else ''
+                
+                articles.append({
+                    "title": title,
+                    "description": description,
+                    "url": url,
+                    "source": source,
+                    "published_date": published_date,
+                    "category": category
+                })
             
-            print(f"  Added {added_count} new articles from {feed_name}")
-            return added_count
+            except Exception as e:
+                print(f"  Error processing entry: {e}")
+                complete = False
+                continue
+        
+        # Add to database in bulk (only new articles are embedded)
+        try:
+            return self.db.add_articles(articles), complete
+        except PartialIngestError as e:
+            print(f"  Error storing articles: {e}")
+            return e.added, False
+    
+    def _process_download(self, feed_url: str, result: Dict) -> int:
+        """Ingest a finished download and remember its validators"""
+        feed_name = result["feed_name"]
+        print(f"\nFetching from {feed_name}...")
+        print(f"URL: {feed_url}")
+        
+        if result["error"]:
+            print(f"  Error fetching feed: {result['error']}")
+            return 0
+        
+        if result["status"] == 304:
+            print(f"  Not modified since last fetch - skipped")
+            self._save_feed_state(feed_name, feed_url, result)
+            return 0
         
+        try:
+            added_count, complete = self._ingest_feed(feed_name, result["feed"])
         except Exception as e:
             print(f"  Error fetching feed: {e}")
             return 0
+        
+        # Only remember validators once every entry is safely stored; otherwise
+        # the next fetch must download the feed again to pick up the rest
+        if complete:
+            self._save_feed_state(feed_name, feed_url, result)
+        else:
+            print(f"  Some entries were not stored - will refetch {feed_name} in full")
+        print(f"  Added {added_count} new articles from {feed_name}")
+        return added_count
+    
+    def fetch_feed(self, feed_name: str, feed_url: str) -> int:
+        """Fetch articles from a single RSS feed"""
+        state = self._load_feed_state().get(feed_name)
+        return self._process_download(feed_url, self._download_feed(feed_name, feed_url, state))
     
     def fetch_all(self) -> Dict[str, int]:
-        """Fetch from all configured RSS feeds"""
+        """Fetch from all configured RSS feeds concurrently"""
         print("=" * 60)
         print("FETCHING NEWS FROM RSS FEEDS")
         print("=" * 60)
         
         results = {}
+        report = []
         total_added = 0
+        states = self._load_feed_state()
         
-        for feed_name, feed_url in self.feeds.items():
-            added = self.fetch_feed(feed_name, feed_url)
-            results[feed_name] = added
-            total_added += added
+        # Downloads run in parallel; ingestion stays on this thread as each one finishes
+        with ThreadPoolExecutor(max_workers=config.FEED_FETCH_WORKERS, thread_name_prefix="feed") as pool:
+            futures = {
+                pool.submit(self._download_feed, feed_name, feed_url, states.get(feed_name)): feed_url
+                for feed_name, feed_url in self.feeds.items()
+            }
+            for future in as_completed(futures):
+                download = future.result()
+                added = self._process_download(futures[future], download)
+                results[download["feed_name"]] = added
+                report.append((download, added))
+                total_added += added
         
         print("\n" + "=" * 60)
         print(f"SUMMARY: Added {total_added} new articles")
         print("=" * 60)
+        for download, added in sorted(report, key=lambda r: r[0]["seconds"], reverse=True):
+            status = download["error"] or ("304 not modified" if download["status"] == 304 else f"{download['status']}")
+            print(f"  {download['feed_name']:30} {download['seconds']:5.2f}s  {download['bytes'] / 1024:7.1f} KB  "
+                  f"{status:18} +{added}")
         
         return results
 
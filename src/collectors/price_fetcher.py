@@ -1,9 +1,11 @@
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-import sqlite3
+from src.utils.db import bump_cache_generation, connect
 import os
 from src.analysis.technical_indicators import TechnicalIndicators
+from src.analysis.indicator_state import IndicatorEngine
+from src.utils.config import config
 
 # Top 10 Nifty Stocks + Indices
 STOCKS = [
@@ -30,7 +32,7 @@ class PriceFetcher:
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS stock_daily_prices (
@@ -62,9 +64,81 @@ class PriceFetcher:
                 PRIMARY KEY (symbol, date)
             )
         ''')
+        
+        # Per-symbol sync watermark for incremental price downloads
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_sync_state (
+                symbol TEXT PRIMARY KEY,
+                last_date TEXT,
+                rows_fetched INTEGER,
+                last_synced TEXT
+            )
+        ''')
         conn.commit()
         conn.close()
 
+    def sync_prices(self, overlap_days=None, initial_days=None):
+        """Fetch only bars after each symbol's last stored date (plus a small overlap)
+        
+        Symbols sharing a start date are downloaded together, so a normal daily
+        run is a single request covering just the new bars; missed days heal
+        automatically because the range always starts from the stored data.
+        """
+        overlap_days = config.PRICE_SYNC_OVERLAP_DAYS if overlap_days is None else overlap_days
+        initial_days = config.PRICE_SYNC_INITIAL_DAYS if initial_days is None else initial_days
+        
+        conn = connect(self.db_path)
+        placeholders = ",".join("?" * len(STOCKS))
+        last_dates = dict(conn.execute(
+            f"SELECT symbol, MAX(date) FROM stock_daily_prices WHERE symbol IN ({placeholders}) GROUP BY symbol",
+            STOCKS
+        ).fetchall())
+        conn.close()
+        
+        today = datetime.now().date()
+        groups = {}
+        for symbol in STOCKS:
+            last = last_dates.get(symbol)
+            if last:
+                start = datetime.strptime(last, '%Y-%m-%d').date() - timedelta(days=overlap_days)
+            else:
+                start = today - timedelta(days=initial_days)
+            groups.setdefault(start.isoformat(), []).append(symbol)
+        
+        end = (today + timedelta(days=1)).isoformat()
+        print(f"\nSyncing prices for {len(STOCKS)} items in {len(groups)} request(s)...")
+        
+        total = 0
+        for start, symbols in sorted(groups.items()):
+            prices = self._download_prices(symbols, start=start, end=end)
+            total += self._save_many(prices)
+            self._save_sync_state(symbols, prices, last_dates)
+            
+            for symbol in symbols:
+                count = int((prices['symbol'] == symbol).sum()) if not prices.empty else 0
+                print(f"  {symbol}: {count} bars since {start}")
+        
+        print(f"✓ Price sync complete ({total} rows written)")
+        return total
+
+    def _save_sync_state(self, symbols, prices, last_dates):
+        """Record the newest stored date per symbol after a sync"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for symbol in symbols:
+            fetched = prices[prices['symbol'] == symbol] if not prices.empty else prices
+            newest = fetched['date'].max() if not fetched.empty else None
+            last_date = max(filter(None, [newest, last_dates.get(symbol)]), default=None)
+            rows.append((symbol, last_date, len(fetched), now))
+        
+        conn = connect(self.db_path)
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO price_sync_state (symbol, last_date, rows_fetched, last_synced)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+        conn.close()
+
     def fetch_today_prices(self):
         print(f"\nFetching prices for {len(STOCKS)} items (stocks + indices)...")
         for symbol in STOCKS:
@@ -87,22 +161,76 @@ class PriceFetcher:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
+        prices = self._download_prices(
+            STOCKS,
+            start=start_date.strftime('%Y-%m-%d'),
+            end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        )
+        saved = self._save_many(prices)
+        
         for symbol in STOCKS:
-            try:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(start=start_date.strftime('%Y-%m-%d'), end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
-                if not data.empty:
-                    count = 0
-                    for index, row in data.iterrows():
-                        date_str = index.strftime('%Y-%m-%d')
-                        self._save_to_db(symbol, date_str, row['Open'], row['High'], row['Low'], row['Close'], int(row['Volume']))
-                        count += 1
-                    print(f"  {symbol}: Saved {count} rows")
-            except Exception as e:
-                print(f"  ❌ Error fetching {symbol}: {e}")
+            count = int((prices['symbol'] == symbol).sum()) if not prices.empty else 0
+            print(f"  {symbol}: Saved {count} rows")
+        print(f"✓ Saved {saved} price rows in one transaction")
+
+    def _download_prices(self, symbols, **kwargs):
+        """Download OHLCV for every symbol in one multi-ticker request, as long-format rows"""
+        columns = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']
+        try:
+            # auto_adjust matches Ticker.history(), which the daily fetch uses
+            data = yf.download(list(symbols), group_by='ticker', auto_adjust=True,
+                               threads=True, progress=False, **kwargs)
+        except Exception as e:
+            print(f"  ❌ Error downloading prices: {e}")
+            return pd.DataFrame(columns=columns)
+        
+        if data is None or data.empty:
+            return pd.DataFrame(columns=columns)
+        
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([[symbols[0]], data.columns])
+        
+        frames = []
+        for symbol in data.columns.get_level_values(0).unique():
+            frame = data[symbol].dropna(subset=['Close'])
+            if frame.empty:
+                print(f"  No data found for {symbol}")
+                continue
+            frames.append(pd.DataFrame({
+                'symbol': symbol,
+                'date': frame.index.strftime('%Y-%m-%d'),
+                'open': frame['Open'].to_numpy(),
+                'high': frame['High'].to_numpy(),
+                'low': frame['Low'].to_numpy(),
+                'close': frame['Close'].to_numpy(),
+                'volume': frame['Volume'].fillna(0).astype('int64').to_numpy()
+            }))
+        
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def _save_many(self, prices):
+        """Upsert long-format price rows with executemany in a single transaction"""
+        if prices.empty:
+            return 0
+        
+        rows = [
+            (symbol, date, float(o), float(h), float(l), float(c), int(v))
+            for symbol, date, o, h, l, c, v in prices.itertuples(index=False, name=None)
+        ]
+        conn = connect(self.db_path)
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO stock_daily_prices (symbol, date, open, high, low, close, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        conn.close()
+        bump_cache_generation()
+        return len(rows)
 
     def _save_to_db(self, symbol, date, open_p, high, low, close_p, volume):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
             INSERT OR REPLACE INTO stock_daily_prices (symbol, date, open, high, low, close, volume)
@@ -110,16 +238,35 @@ class PriceFetcher:
         ''', (symbol, date, open_p, high, low, close_p, volume))
         conn.commit()
         conn.close()
+        bump_cache_generation()
+
+    INDICATOR_COLUMNS = ['rsi', 'macd', 'macd_signal', 'macd_histogram',
+                         'bb_upper', 'bb_middle', 'bb_lower', 'volume_ma', 'volume_ratio']
 
-    def calculate_technical_indicators(self):
-        """Calculate and store technical indicators for all stocks"""
+    def calculate_technical_indicators(self, mode="latest"):
+        """Calculate and store technical indicators for all stocks
+        
+        mode="latest"       - one row for the latest date, from the last 60 days
+        mode="incremental"  - append new bars using the carried-over streaming state
+        mode="backfill"     - full-history series, (re)writing every date
+        """
+        if mode not in ("latest", "incremental", "backfill"):
+            raise ValueError(f"Unknown indicator mode: {mode}")
+        if mode == "incremental":
+            print("\nUpdating technical indicators (new bars only)...")
+            total = IndicatorEngine(self.db_path).update_all(STOCKS)
+            print(f"✓ Technical indicators saved ({total} rows)")
+            return total
+        if mode == "backfill":
+            return self._calculate_indicator_history()
+        
         print("\nCalculating technical indicators...")
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         
         for symbol in STOCKS:
             # Get last 60 days of price data for calculations
-            query = f"SELECT date, close, volume FROM stock_daily_prices WHERE symbol = '{symbol}' ORDER BY date DESC LIMIT 60"
-            df = pd.read_sql_query(query, conn)
+            query = "SELECT date, close, volume FROM stock_daily_prices WHERE symbol = ? ORDER BY date DESC LIMIT 60"
+            df = pd.read_sql_query(query, conn, params=(symbol,))
             
             if len(df) < 20:  # Need minimum data
                 print(f"  ⚠ {symbol}: Insufficient data for indicators")
@@ -140,32 +287,68 @@ class PriceFetcher:
             vol_ma, vol_ratio = TechnicalIndicators.calculate_volume_indicators(volumes)
             
             # Save to database
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO technical_indicators 
-                (symbol, date, rsi, macd, macd_signal, macd_histogram, 
-                 bb_upper, bb_middle, bb_lower, volume_ma, volume_ratio)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (symbol, latest_date, rsi, macd, macd_signal, macd_hist,
-                  bb_upper, bb_middle, bb_lower, vol_ma, vol_ratio))
+            self._upsert_indicators(conn, [(symbol, latest_date, rsi, macd, macd_signal, macd_hist,
+                                            bb_upper, bb_middle, bb_lower, vol_ma, vol_ratio)])
             
             # Show indicator status
             rsi_sig = TechnicalIndicators.get_rsi_signal(rsi)
             macd_sig = TechnicalIndicators.get_macd_signal(macd, macd_signal)
             bb_pos = TechnicalIndicators.get_bb_position(latest_price, bb_upper, bb_middle, bb_lower)
             
-            print(f"  ✓ {symbol}: RSI={rsi:.1f if rsi else 'N/A'} ({rsi_sig}), "
-                  f"MACD={macd_sig}, BB Position={bb_pos:.0f if bb_pos else 'N/A'}%")
+            rsi_str = f"{rsi:.1f}" if rsi is not None else "N/A"
+            bb_str = f"{bb_pos:.0f}%" if bb_pos is not None else "N/A"
+            print(f"  ✓ {symbol}: RSI={rsi_str} ({rsi_sig}), MACD={macd_sig}, BB Position={bb_str}")
         
         conn.commit()
         conn.close()
         print("✓ Technical indicators calculated and saved")
 
+    def _calculate_indicator_history(self):
+        """Compute indicator series over each symbol's full price history in one pass"""
+        print("\nCalculating technical indicators (full history)...")
+        conn = connect(self.db_path)
+        total = 0
+        
+        for symbol in STOCKS:
+            df = pd.read_sql_query(
+                "SELECT date, close, volume FROM stock_daily_prices WHERE symbol = ? ORDER BY date",
+                conn, params=(symbol,)
+            )
+            if len(df) < 20:
+                print(f"  ⚠ {symbol}: Insufficient data for indicators")
+                continue
+            
+            frame = TechnicalIndicators.calculate_all(df)
+            # Skip warm-up rows where nothing could be computed yet
+            frame = frame.dropna(subset=self.INDICATOR_COLUMNS, how='all')
+            if frame.empty:
+                continue
+            
+            # NaN -> NULL
+            values = frame[['date'] + self.INDICATOR_COLUMNS]
+            values = values.astype(object).where(values.notna(), None)
+            rows = [(symbol, *row) for row in values.itertuples(index=False, name=None)]
+            self._upsert_indicators(conn, rows)
+            conn.commit()
+            
+            total += len(rows)
+            print(f"  ✓ {symbol}: {len(rows)} rows ({rows[0][1]} → {rows[-1][1]})")
+        
+        conn.close()
+        print(f"✓ Technical indicators saved ({total} rows)")
+        return total
+
+    def _upsert_indicators(self, conn, rows):
+        conn.executemany('''
+            INSERT OR REPLACE INTO technical_indicators 
+            (symbol, date, rsi, macd, macd_signal, macd_histogram, 
+             bb_upper, bb_middle, bb_lower, volume_ma, volume_ratio)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
 if __name__ == "__main__":
     fetcher = PriceFetcher()
-    # Fetch last 30 days to start with
-    fetcher.fetch_historical_prices(days=30)
-    # Then ensure today is captured
-    fetcher.fetch_today_prices()
-    # Calculate technical indicators
-    fetcher.calculate_technical_indicators()
+    # Fetch everything after the last stored bar (full window on first run)
+    fetcher.sync_prices()
+    # Calculate technical indicators for any dates not yet covered
+    fetcher.calculate_technical_indicators(mode="incremental")
@@ -1,8 +1,8 @@
 import requests
 from bs4 import BeautifulSoup
-import sqlite3
+from src.utils.db import bump_cache_generation, connect
 from datetime import datetime
-import time
+from src.utils.rate_limiter import get_rate_limiter
 
 # Mapping for Screener.in (stripping .NS if present)
 SCREENER_SYMBOLS = ["RELIANCE", "TCS", "HDFCBANK", "INFY", "ICICIBANK"]
@@ -10,10 +10,11 @@ SCREENER_SYMBOLS = ["RELIANCE", "TCS", "HDFCBANK", "INFY", "ICICIBANK"]
 class ScreenerFetcher:
     def __init__(self, db_path="stock_market.db"):
         self.db_path = db_path
+        self.limiter = get_rate_limiter("screener")
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS stock_fundamentals (
@@ -42,10 +43,17 @@ class ScreenerFetcher:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
+        def get_page(url):
+            response = requests.get(url, headers=headers)
+            if response.status_code == 429:
+                response.raise_for_status()
+            return response
+
         for symbol in SCREENER_SYMBOLS:
             try:
                 url = f"https://www.screener.in/company/{symbol}/"
-                response = requests.get(url, headers=headers)
+                # Rate limiter keeps us polite without a fixed sleep per request
+                response = self.limiter.call(get_page, url)
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'html.parser')
                     ratios = self._parse_ratios(soup)
@@ -56,9 +64,6 @@ class ScreenerFetcher:
                         print(f"  Could not parse ratios for {symbol}")
                 else:
                     print(f"  Failed to fetch {symbol}: Status {response.status_code}")
-                
-                # Small delay to be polite
-                time.sleep(1)
             except Exception as e:
                 print(f"  Error fetching {symbol}: {e}")
 
@@ -79,7 +84,7 @@ class ScreenerFetcher:
         return ratios
 
     def _save_to_db(self, symbol, date, ratios):
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Helper to safely convert to float
@@ -111,6 +116,7 @@ class ScreenerFetcher:
         ))
         conn.commit()
         conn.close()
+        bump_cache_generation()
 
 if __name__ == "__main__":
     fetcher = ScreenerFetcher()
@@ -0,0 +1,123 @@
+"""
+Concurrent Batch Prediction Runner
+Runs daily/weekly/monthly predictions for many symbols in parallel
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List
+from src.utils.config import config
+from src.utils.rate_limiter import print_rate_limit_report
+
+
+class BatchPredictionError(RuntimeError):
+    """Some symbol/timeframe produced no prediction; the other symbols still ran"""
+
+    def __init__(self, reports: List[Dict]):
+        self.reports = reports
+        # symbol -> {timeframe: error}
+        self.failed = {r["symbol"]: r["errors"] for r in reports if not r["ok"]}
+        details = "; ".join(
+            f"{symbol} ({', '.join(f'{tf}: {err}' for tf, err in errors.items())})"
+            for symbol, errors in sorted(self.failed.items())
+        )
+        super().__init__(f"{len(self.failed)}/{len(reports)} symbols failed: {details}")
+
+
+class BatchPredictionRunner:
+    """Run PredictionAgent across a symbol universe under a concurrency cap"""
+
+    def __init__(self, agent, max_workers: int = None):
+        self.agent = agent
+        self.max_workers = max(1, max_workers or config.PREDICTION_CONCURRENCY)
+
+    def _run_symbol(self, symbol: str, timeframes: List[str]) -> Dict:
+        """Run every requested timeframe for one symbol (executed in a worker thread).
+
+        Each predict_* call opens its own predictions.db connection and commits
+        a single transaction, so one symbol's writes never share state with another's.
+        """
+        start = time.perf_counter()
+        results = {}
+        timings = {}
+        errors = {}
+
+        for timeframe in timeframes:
+            predict = getattr(self.agent, f"predict_{timeframe.lower()}")
+            step_start = time.perf_counter()
+            try:
+                results[timeframe] = predict(symbol, save=True)
+                if results[timeframe] is None:
+                    # predict_* log their own errors and return None
+                    errors[timeframe] = "no prediction returned"
+            except Exception as e:
+                print(f"   ❌ {symbol} {timeframe} failed: {e}")
+                results[timeframe] = None
+                errors[timeframe] = str(e) or e.__class__.__name__
+            timings[timeframe] = time.perf_counter() - step_start
+
+        return {
+            "symbol": symbol,
+            "results": results,
+            "timings": timings,
+            "latency": time.perf_counter() - start,
+            "errors": errors,
+            "ok": not errors
+        }
+
+    def run(self, symbols: Iterable[str], timeframes: Iterable[str] = ("DAILY",),
+            raise_on_failure: bool = True) -> List[Dict]:
+        """Predict all symbols concurrently and print a per-symbol latency report
+
+        Every symbol runs even if others fail; afterwards BatchPredictionError
+        lists the failures (or, with raise_on_failure=False, check each
+        report's "ok" / "errors").
+        """
+        symbols = list(symbols)
+        timeframes = [t.upper() for t in timeframes]
+        workers = min(self.max_workers, len(symbols)) or 1
+
+        print(f"\n🚀 Running {', '.join(timeframes)} predictions for {len(symbols)} symbols "
+              f"({workers} concurrent workers)...")
+
+        start = time.perf_counter()
+        reports = []
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict") as pool:
+            futures = {pool.submit(self._run_symbol, symbol, timeframes): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    report = future.result()
+                except Exception as e:
+                    print(f"   ❌ {symbol} failed: {e}")
+                    report = {"symbol": symbol, "results": {}, "timings": {}, "latency": 0.0,
+                              "errors": {"*": str(e) or e.__class__.__name__}, "ok": False}
+                reports.append(report)
+
+        self._print_report(reports, time.perf_counter() - start)
+        if raise_on_failure and not all(r["ok"] for r in reports):
+            raise BatchPredictionError(reports)
+        return reports
+
+    def _print_report(self, reports: List[Dict], wall_time: float):
+        """Print per-symbol latency, slowest first"""
+        print(f"\n{'='*60}")
+        print("PER-SYMBOL LATENCY")
+        print(f"{'='*60}")
+
+        for report in sorted(reports, key=lambda r: r["latency"], reverse=True):
+            status = "✅" if report["ok"] else "❌"
+            steps = ", ".join(f"{tf} {secs:.1f}s" for tf, secs in report["timings"].items())
+            print(f"  {status} {report['symbol']:20} {report['latency']:6.1f}s  ({steps})")
+
+        total_latency = sum(r["latency"] for r in reports)
+        succeeded = sum(1 for r in reports if r["ok"])
+        print(f"\n  Succeeded: {succeeded}/{len(reports)}")
+        print(f"  Wall time: {wall_time:.1f}s (sequential equivalent: {total_latency:.1f}s)")
+
+        context_cache = getattr(self.agent, "context_cache", None)
+        if context_cache is not None:
+            stats = context_cache.stats()
+            print(f"  Context cache: {stats['hits']} hits / {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate)")
+        print_rate_limit_report()
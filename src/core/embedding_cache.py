@@ -0,0 +1,107 @@
+"""
+Persistent Embedding Cache
+SQLite-backed, size-bounded LRU cache of embeddings keyed by (model, text hash)
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List
+from src.utils.config import config
+
+
+class EmbeddingCache:
+    """On-disk LRU cache so deterministic query strings are embedded only once"""
+
+    def __init__(self, path: str = None, model: str = None, max_entries: int = None):
+        self.path = path or config.EMBEDDING_CACHE_PATH
+        self.model = model or config.JINA_MODEL
+        self.max_entries = max_entries if max_entries is not None else config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT,
+                    text_hash TEXT,
+                    embedding BLOB,
+                    last_used REAL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            # Other models' rows are never read (model is part of the key) and age out via LRU eviction
+            self._conn.commit()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Return {text: embedding} for every text already cached"""
+        if not texts:
+            return {}
+
+        hashes = {self._hash(t): t for t in texts}
+        found = {}
+        with self._lock:
+            keys = list(hashes)
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, embedding FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model, *chunk]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[hashes[text_hash]] = array('f', blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model, self._hash(t)) for t in found]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, embeddings: Dict[str, List[float]]):
+        """Store embeddings and evict least-recently-used rows beyond max_entries"""
+        if not embeddings:
+            return
+
+        now = time.time()
+        rows = [(self.model, self._hash(text), array('f', vector).tobytes(), now)
+                for text, vector in embeddings.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, embedding, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if self.max_entries and count > self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM embeddings WHERE rowid IN (
+                        SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {'model': self.model, 'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
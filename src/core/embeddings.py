@@ -0,0 +1,175 @@
+"""
+Embedding Providers
+Pluggable text-embedding backends for VectorDB: the remote Jina AI API or a
+local sentence-transformers model run on CPU in batches. Chosen with
+EMBEDDING_PROVIDER in config.
+"""
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import requests
+from src.utils.config import config
+from src.utils.rate_limiter import get_rate_limiter, estimate_tokens
+
+
+class EmbeddingProvider(ABC):
+    """Interface: turn texts into vectors, in input order"""
+
+    # Identifies the vector space (embedding cache key, dimension checks)
+    model_id: str = ""
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """One vector per text, in input order"""
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Vector size if known without embedding anything"""
+        return None
+
+    def describe(self) -> str:
+        return self.model_id
+
+
+class JinaEmbeddingProvider(EmbeddingProvider):
+    """Jina AI embeddings API, one rate-limited request per batch (with retry)"""
+
+    def __init__(self):
+        self.model_id = config.JINA_MODEL
+        self.limiter = get_rate_limiter("jina")
+
+        # Check Jina API key
+        if not config.JINA_API_KEY:
+            print("WARNING: JINA_API_KEY not set. Embeddings will not work.")
+            print("   Get your free API key at: https://jina.ai/")
+
+    def describe(self) -> str:
+        return f"Jina AI API: {config.JINA_MODEL}"
+
+    def _get_retry_session(self, retries=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504]):
+        """Create a requests session with retry logic"""
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        retry = Retry(
+            total=retries,
+            read=retries,
+            connect=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in one Jina AI request (with retry)"""
+        if not config.JINA_API_KEY:
+            raise ValueError("JINA_API_KEY not configured")
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {config.JINA_API_KEY}"
+        }
+
+        data = {
+            "model": config.JINA_MODEL,
+            "input": texts
+        }
+
+        def post():
+            session = self._get_retry_session()
+            response = session.post(
+                config.JINA_API_URL,
+                headers=headers,
+                json=data,
+                timeout=30
+            )
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            result = self.limiter.call(post, tokens=sum(estimate_tokens(t) for t in texts))
+            # Jina returns one item per input, tagged with its input index
+            items = sorted(result['data'], key=lambda item: item.get('index', 0))
+            return [item['embedding'] for item in items]
+        except Exception as e:
+            print(f"Error generating embedding (after retries): {e}")
+            raise
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """sentence-transformers model on the local CPU, batched across a small thread pool
+
+    The default model is the open-weights release of the Jina model the API
+    serves (same 768 dimensions), so existing collections stay searchable.
+    """
+
+    def __init__(self, model_name: str = None, device: str = None, batch_size: int = None, workers: int = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=local requires sentence-transformers: pip install sentence-transformers"
+            )
+
+        self.model_name = model_name or config.LOCAL_EMBEDDING_MODEL
+        self.model_id = f"local:{self.model_name}"
+        self.batch_size = max(1, batch_size or config.EMBEDDING_BATCH_SIZE)
+        self.workers = max(1, workers or config.LOCAL_EMBEDDING_WORKERS)
+        self.model = SentenceTransformer(
+            self.model_name,
+            device=device or config.LOCAL_EMBEDDING_DEVICE,
+            trust_remote_code=True
+        )
+        # Torch releases the GIL inside encode, so batches overlap on multi-core CPUs
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed")
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.model.get_sentence_embedding_dimension()
+
+    def describe(self) -> str:
+        return f"local model: {self.model_name} ({self.workers} workers)"
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= self.batch_size:
+            return self._encode(texts)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        embeddings = []
+        for vectors in self._pool.map(self._encode, batches):
+            embeddings.extend(vectors)
+        return embeddings
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Process-wide provider selected by config.EMBEDDING_PROVIDER (jina | local)"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            name = config.EMBEDDING_PROVIDER
+            if name == "jina":
+                _provider = JinaEmbeddingProvider()
+            elif name == "local":
+                _provider = LocalEmbeddingProvider()
+            else:
+                raise ValueError(f"Unknown EMBEDDING_PROVIDER '{name}' (expected 'jina' or 'local')")
+        return _provider
@@ -1,12 +1,15 @@
 import google.generativeai as genai
 import os
 import pandas as pd
-import sqlite3
+from src.utils.db import bump_cache_generation, connect
 from dotenv import load_dotenv
 from src.core.vector_db import VectorDB
+from src.utils.memo import Memo
 from src.utils.filter_companies import TOP_5_NIFTY
 from src.analysis.pattern_recognition import PatternRecognition
 from src.analysis.historical_matcher import HistoricalMatcher
+from src.analysis.technical_indicators import TechnicalIndicators
+from src.utils.rate_limiter import get_rate_limiter, estimate_tokens
 import json
 from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
@@ -14,7 +17,7 @@ from dateutil.relativedelta import relativedelta
 load_dotenv()
 
 class PredictionAgent:
-    def __init__(self):
+    def __init__(self, vector_db=None):
         # Configure Gemini
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -26,13 +29,17 @@ class PredictionAgent:
         model_name = "models/gemini-3-pro"
         print(f"Using model: {model_name}")
         self.model = genai.GenerativeModel(model_name)
+        self.gemini_limiter = get_rate_limiter("gemini")
         
         # Load data components
         self.main_db_path = "stock_market.db"
         self.pred_db_path = "predictions.db"
-        self.vector_db = VectorDB()
+        self.vector_db = vector_db or VectorDB()
         self.training_data_file = "training_data.csv"
         
+        # Run-scoped cache: daily/weekly/monthly prompts share one context per symbol
+        self.context_cache = Memo()
+        
         # Mapping Display Name -> YFinance Ticker in DB
         self.ticker_map = {
             # Original 5 stocks
@@ -72,7 +79,7 @@ class PredictionAgent:
         self._init_db()
 
     def _init_db(self):
-        conn = sqlite3.connect(self.pred_db_path)
+        conn = connect(self.pred_db_path)
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS prediction_history (
@@ -92,6 +99,14 @@ class PredictionAgent:
         conn.commit()
         conn.close()
 
+    def _generate_content(self, prompt):
+        """Call Gemini within the shared requests/tokens-per-minute budget"""
+        # Budget covers the prompt plus a typical JSON answer
+        return self.gemini_limiter.call(
+            self.model.generate_content, prompt,
+            tokens=estimate_tokens(prompt) + 1024
+        )
+
     def _calculate_technical_indicators(self, df):
         """Calculate basic technical indicators for algorithmic analysis"""
         if df.empty or len(df) < 14:
@@ -123,29 +138,16 @@ class PredictionAgent:
             "rsi_signal": rsi_signal
         }
 
-    def _get_social_momentum(self, symbol):
-        """Simulate social media momentum by searching for retail-specific sentiment in the news database"""
-        queries = [
+    def _social_momentum_queries(self, symbol):
+        """Vector-search queries used to gauge retail/social sentiment"""
+        return [
             f"{symbol} retail investor sentiment reddit twitter",
             f"{symbol} social media buzz viral news",
             f"{symbol} retail frenzy stock market"
         ]
-        results = []
-        for q in queries:
-            search_res = self.vector_db.search(q, n_results=2)
-            results.extend(search_res)
-        
-        # Filter duplicates and return top 3
-        unique_results = []
-        seen = set()
-        for res in results:
-            if res['title'] not in seen:
-                unique_results.append(res)
-                seen.add(res['title'])
-        return unique_results[:3]
-    
-    def _get_sector_sentiment(self, symbol):
-        """Get sector-wise sentiment by analyzing news for the entire sector"""
+
+    def _sector_query(self, symbol):
+        """Sector name and vector-search query for sector-wide sentiment"""
         sector = self.sector_map.get(symbol, "GENERAL")
         
         # Define sector keywords for news search
@@ -160,41 +162,89 @@ class PredictionAgent:
         }
         
         keywords = sector_keywords.get(sector, f"{sector} sector India")
+        return sector, f"{keywords} outlook trend"
+
+    def _search_context_news(self, symbol):
+        """Run every vector search needed for a symbol's context as one batch
+        
+        Returns {group: [results per query]} so the per-source helpers can be
+        fed without issuing their own searches.
+        """
+        groups = {
+            'news': [(f"{symbol} latest business news", 15)],
+            'social': [(q, 2) for q in self._social_momentum_queries(symbol)],
+            'sector': [(self._sector_query(symbol)[1], 5)],
+            'mutual_fund': [(f"{symbol} mutual fund holdings SIP investment institutional", 5)],
+            'quarterly': [(f"{symbol} quarterly results Q1 Q2 Q3 Q4 earnings profit revenue YoY", 8)]
+        }
+        flat = [(group, query, n) for group, items in groups.items() for query, n in items]
+        
+        results = self.vector_db.search_many([q for _, q, _ in flat], [n for _, _, n in flat])
+        
+        grouped = {group: [] for group in groups}
+        for (group, _, _), res in zip(flat, results):
+            grouped[group].append(res)
+        return grouped
+
+    def _get_social_momentum(self, symbol, search_results=None):
+        """Simulate social media momentum by searching for retail-specific sentiment in the news database"""
+        if search_results is None:
+            search_results = [self.vector_db.search(q, n_results=2) for q in self._social_momentum_queries(symbol)]
+        results = []
+        for search_res in search_results:
+            results.extend(search_res)
+        
+        # Filter duplicates and return top 3
+        unique_results = []
+        seen = set()
+        for res in results:
+            if res['title'] not in seen:
+                unique_results.append(res)
+                seen.add(res['title'])
+        return unique_results[:3]
+    
+    def _get_sector_sentiment(self, symbol, sector_news=None):
+        """Get sector-wise sentiment by analyzing news for the entire sector"""
+        sector, query = self._sector_query(symbol)
         
         # Search for sector news
-        sector_news = self.vector_db.search(f"{keywords} outlook trend", n_results=5)
+        if sector_news is None:
+            sector_news = self.vector_db.search(query, n_results=5)
         
         return {
             "sector": sector,
             "news_items": [f"- {n.get('title', '')}: {n.get('description', '')[:100]}..." for n in sector_news[:5]]
         }
     
-    def _get_mutual_fund_data(self, symbol):
+    def _get_mutual_fund_data(self, symbol, mf_news=None):
         """Get mutual fund related data - holdings and activity trends"""
         # Search for mutual fund news related to this stock
-        mf_news = self.vector_db.search(
-            f"{symbol} mutual fund holdings SIP investment institutional", 
-            n_results=5
-        )
+        if mf_news is None:
+            mf_news = self.vector_db.search(
+                f"{symbol} mutual fund holdings SIP investment institutional", 
+                n_results=5
+            )
         
         return {
             "mf_news_items": [f"- {n.get('title', '')}: {n.get('description', '')[:100]}..." for n in mf_news[:5]]
         }
     
-    def _get_quarterly_results(self, symbol):
+    def _get_quarterly_results(self, symbol, earnings_news=None):
         """Get last 4 quarters earnings data and analysis"""
         # Search for quarterly results news
-        earnings_news = self.vector_db.search(
-            f"{symbol} quarterly results Q1 Q2 Q3 Q4 earnings profit revenue YoY", 
-            n_results=8
-        )
+        if earnings_news is None:
+            earnings_news = self.vector_db.search(
+                f"{symbol} quarterly results Q1 Q2 Q3 Q4 earnings profit revenue YoY", 
+                n_results=8
+            )
         
         # Try to get fundamentals from database
-        conn = sqlite3.connect(self.main_db_path)
+        conn = connect(self.main_db_path)
         try:
+            # Bound prefix pattern: LIKE can use idx_fundamentals_symbol_nocase
             fundamentals_df = pd.read_sql_query(
-                f"SELECT * FROM stock_fundamentals WHERE symbol LIKE '%{symbol}%' ORDER BY date DESC LIMIT 4", 
-                conn
+                "SELECT * FROM stock_fundamentals WHERE symbol LIKE ? ORDER BY date DESC LIMIT 4", 
+                conn, params=(f"{symbol}%",)
             )
         except:
             fundamentals_df = pd.DataFrame()
@@ -214,7 +264,7 @@ class PredictionAgent:
         current_month = today.month
         current_day = today.day
         
-        conn = sqlite3.connect(self.main_db_path)
+        conn = connect(self.main_db_path)
         
         seasonal_data = []
         
@@ -338,15 +388,19 @@ class PredictionAgent:
         """Find similar historical scenarios and analyze outcomes"""
         try:
             matcher = HistoricalMatcher(self.main_db_path)
+            # Price/indicator tables are keyed by ticker (e.g. TCS.NS), not display name
+            ticker = self.ticker_map.get(symbol, symbol)
             
-            # Find similar scenarios
-            similar = matcher.find_similar_scenarios(symbol, technical_indicators, lookback_days=365)
+            # Find the nearest historical scenarios
+            similar = matcher.find_similar_scenarios(
+                ticker, technical_indicators, lookback_days=365, market_context=market_context
+            )
             
             # Get regime-specific performance
             regime = market_context.get('nifty_trend', 'UNKNOWN')
             regime_perf = None
             if regime != 'UNKNOWN':
-                regime_perf = matcher.get_regime_specific_performance(symbol, regime, lookback_days=180)
+                regime_perf = matcher.get_regime_specific_performance(ticker, regime, lookback_days=180)
             
             return {
                 'similar_scenarios': similar,
@@ -397,6 +451,10 @@ class PredictionAgent:
             output.append(f"- Average Outcome: {outcomes.get('average_return', 0):+.2f}%")
             output.append(f"- UP: {outcomes.get('up_probability', 0):.0%} | DOWN: {outcomes.get('down_probability', 0):.0%} | NEUTRAL: {outcomes.get('neutral_probability', 0):.0%}")
             output.append(f"- Best case: {outcomes.get('best_case', 0):+.2f}% | Worst case: {outcomes.get('worst_case', 0):+.2f}%")
+            neighbors = similar.get('neighbors') or []
+            if neighbors:
+                closest = ", ".join(f"{n['date']} ({n['next_day_return']:+.2f}%)" for n in neighbors[:3])
+                output.append(f"- Closest matches: {closest}")
         
         # Regime performance
         regime_perf = hist_data.get('regime_performance')
@@ -410,16 +468,21 @@ class PredictionAgent:
 
 
     def _get_latest_data(self, symbol):
+        """Aggregated context for a symbol, built once per (symbol, as-of date) per run"""
+        key = (symbol, date.today().isoformat())
+        return self.context_cache.get_or_build(key, lambda: self._build_latest_data(symbol))
+
+    def _build_latest_data(self, symbol):
         """Aggregate latest news, prices, and fundamentals for a symbol"""
         # Determine ticker or fallback to symbol pattern
         ticker = self.ticker_map.get(symbol, symbol)
         
         # 1. Prices (Extended to 200 days for better technical indicators and pattern recognition)
-        conn = sqlite3.connect(self.main_db_path)
+        conn = connect(self.main_db_path)
         all_prices_df = pd.read_sql_query(f"SELECT * FROM stock_daily_prices WHERE symbol = '{ticker}' OR symbol LIKE '{ticker}%' ORDER BY date DESC LIMIT 200", conn)
         
         # 2. Fundamentals
-        fundamentals_df = pd.read_sql_query(f"SELECT * FROM stock_fundamentals WHERE symbol LIKE '{symbol}%' ORDER BY date DESC LIMIT 1", conn)
+        fundamentals_df = pd.read_sql_query("SELECT * FROM stock_fundamentals WHERE symbol LIKE ? ORDER BY date DESC LIMIT 1", conn, params=(f"{symbol}%",))
         
         # 3. **NEW**: Advanced Technical Indicators from DB
         technical_df = pd.read_sql_query(f"SELECT * FROM technical_indicators WHERE symbol = '{ticker}' ORDER BY date DESC LIMIT 1", conn)
@@ -429,10 +492,12 @@ class PredictionAgent:
         conn.close()
         
         # 5. News (Extended to 15 articles for better BTST sentiment analysis)
-        news_results = self.vector_db.search(f"{symbol} latest business news", n_results=15)
+        # All vector searches for this symbol share one embedding request and one query
+        searches = self._search_context_news(symbol)
+        news_results = searches['news'][0]
         
         # 6. Social Media Momentum
-        social_results = self._get_social_momentum(symbol)
+        social_results = self._get_social_momentum(symbol, searches['social'])
         
         # 7. Basic Technical Indicators (Legacy - will be enhanced with DB data)
         technical_indicators = self._calculate_technical_indicators(all_prices_df)
@@ -451,6 +516,17 @@ class PredictionAgent:
                 'volume_ratio': tech_data.get('volume_ratio')
             })
         
+        # Latest close and Bollinger position feed the historical scenario index
+        if not all_prices_df.empty:
+            close = float(all_prices_df['close'].iloc[0])
+            technical_indicators['close'] = close
+            technical_indicators['bb_position'] = TechnicalIndicators.get_bb_position(
+                close,
+                technical_indicators.get('bb_upper'),
+                technical_indicators.get('bb_middle'),
+                technical_indicators.get('bb_lower')
+            )
+        
         # 9. Market context data
         market_data = {}
         if not market_context.empty:
@@ -473,13 +549,13 @@ class PredictionAgent:
                 historical_examples = relevant[['title', 'return_label']].to_string(index=False)
 
         # 11. NEW: Sector-wise sentiment
-        sector_sentiment = self._get_sector_sentiment(symbol)
+        sector_sentiment = self._get_sector_sentiment(symbol, searches['sector'][0])
         
         # 12. NEW: Mutual Fund data
-        mf_data = self._get_mutual_fund_data(symbol)
+        mf_data = self._get_mutual_fund_data(symbol, searches['mutual_fund'][0])
         
         # 13. NEW: Quarterly results (last 4 quarters)
-        quarterly_results = self._get_quarterly_results(symbol)
+        quarterly_results = self._get_quarterly_results(symbol, searches['quarterly'][0])
         
         # 14. NEW: Historical seasonality (same period last 2 years)
         seasonality = self._get_historical_seasonality(symbol)
@@ -605,7 +681,7 @@ class PredictionAgent:
         
         try:
             # Parse enhanced probabilistic prediction
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt)
             text = response.text
             start = text.find('{')
             end = text.rfind('}') + 1
@@ -648,7 +724,7 @@ class PredictionAgent:
 
     def _save_prediction(self, symbol, prediction, raw_json, open_price, close_price):
         try:
-            conn = sqlite3.connect(self.pred_db_path)
+            conn = connect(self.pred_db_path)
             cursor = conn.cursor()
             
             # Use current local time for next trading day calculation
@@ -687,6 +763,7 @@ class PredictionAgent:
             ))
             conn.commit()
             conn.close()
+            bump_cache_generation()
             print(f"   [Saved to DB] Prediction for {symbol} (Target: {target_date}) stored.")
         except Exception as e:
             print(f"Error saving prediction to DB: {e}")
@@ -864,7 +941,7 @@ TARGET DATE: {self._calculate_target_date('DAILY')}
         
         # Get AI prediction
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt)
             raw_text = response.text.strip()
             
             # Clean and parse JSON
@@ -961,7 +1038,7 @@ TARGET DATE: {self._calculate_target_date('DAILY')}
             
             # Save to database if requested
             if save:
-                conn = sqlite3.connect(self.pred_db_path)
+                conn = connect(self.pred_db_path, timeout=30)
                 cursor = conn.cursor()
                 
                 today = date.today()
@@ -993,6 +1070,7 @@ TARGET DATE: {self._calculate_target_date('DAILY')}
                 
                 conn.commit()
                 conn.close()
+                bump_cache_generation()
                 print(f"   💾 Saved to daily_predictions")
             
             return prediction
@@ -1117,7 +1195,7 @@ TARGET DATE: {self._calculate_target_date('WEEKLY')}
 """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt)
             raw_text = response.text.strip()
             
             if "```json" in raw_text:
@@ -1133,7 +1211,7 @@ TARGET DATE: {self._calculate_target_date('WEEKLY')}
             print(f"   ✅ Weekly Prediction: {prediction['direction']} (Confidence: {prediction['confidence_score']}/10)")
             
             if save:
-                conn = sqlite3.connect(self.pred_db_path)
+                conn = connect(self.pred_db_path, timeout=30)
                 cursor = conn.cursor()
                 
                 today = date.today()
@@ -1162,6 +1240,7 @@ TARGET DATE: {self._calculate_target_date('WEEKLY')}
                 
                 conn.commit()
                 conn.close()
+                bump_cache_generation()
                 print(f"   💾 Saved to weekly_predictions")
             
             return prediction
@@ -1285,7 +1364,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
 """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt)
             raw_text = response.text.strip()
             
             # Clean and parse JSON
@@ -1302,7 +1381,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
             print(f"   ✅ Monthly Prediction: {prediction['direction']} (Confidence: {prediction['confidence_score']}/10)")
             
             if save:
-                conn = sqlite3.connect(self.pred_db_path)
+                conn = connect(self.pred_db_path, timeout=30)
                 cursor = conn.cursor()
                 
                 today = date.today()
@@ -1331,6 +1410,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
                 
                 conn.commit()
                 conn.close()
+                bump_cache_generation()
                 print(f"   💾 Saved to monthly_predictions")
             
             return prediction
@@ -1350,8 +1430,8 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
             today = date.today().isoformat()
             
             # Connect to both databases
-            conn_pred = sqlite3.connect(self.pred_db_path)
-            conn_stock = sqlite3.connect(self.main_db_path)
+            conn_pred = connect(self.pred_db_path)
+            conn_stock = connect(self.main_db_path)
             
             # Find symbols we have predictions for TODAY
             cursor = conn_pred.execute("SELECT id, symbol FROM prediction_history WHERE prediction_date = ? AND close_price IS NULL", (today,))
@@ -1377,6 +1457,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
             conn_pred.commit()
             conn_pred.close()
             conn_stock.close()
+            bump_cache_generation()
             print("Historical verification complete.")
             
         except Exception as e:
@@ -1389,7 +1470,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
         print(f"{'-'*40}")
         
         try:
-            conn = sqlite3.connect(self.pred_db_path)
+            conn = connect(self.pred_db_path)
             cursor = conn.cursor()
             
             # Find all predictions with verified outcomes that haven't been evaluated
@@ -1456,6 +1537,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
             
             conn.commit()
             conn.close()
+            bump_cache_generation()
             print("✅ Evaluation complete!")
             
         except Exception as e:
@@ -1513,7 +1595,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
     def get_confidence_adjustment(self, symbol):
         """Get the current confidence adjustment for a symbol based on past performance"""
         try:
-            conn = sqlite3.connect(self.pred_db_path)
+            conn = connect(self.pred_db_path)
             cursor = conn.cursor()
             
             # Get most recent performance record
@@ -1615,7 +1697,7 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
     def _get_strategy_instruction(self, symbol):
         """Get dynamic instructions based on what signals work best for this stock"""
         try:
-            conn = sqlite3.connect(self.pred_db_path)
+            conn = connect(self.pred_db_path)
             cursor = conn.cursor()
             
             cursor.execute("SELECT indicator, accuracy, total_count FROM signal_performance WHERE symbol = ? AND total_count > 5", (symbol,))
@@ -1636,12 +1718,13 @@ TARGET DATE: {self._calculate_target_date('MONTHLY')}
         except:
             return "Standard strategy applies."
 
-if __name__ == "__main__":
+def run_predictions(vector_db=None):
+    """Update outcomes, learn from them, then predict every symbol for today's timeframes"""
     from src.utils.filter_companies import TOP_5_NIFTY, INDICES
     from datetime import date
     import calendar
     
-    agent = PredictionAgent()
+    agent = PredictionAgent(vector_db=vector_db)
     
     # STEP 1: Update previous predictions with actual results
     agent.update_historical_outcomes()
@@ -1651,7 +1734,7 @@ if __name__ == "__main__":
     
     # STEP 3: Generate new predictions for next trading day
     print("\nGenerating new MULTI-TIMEFRAME predictions...")
-    import time
+    from src.core.batch_runner import BatchPredictionRunner
     
     # Check today's date for weekly/monthly triggers
     today = date.today()
@@ -1662,29 +1745,24 @@ if __name__ == "__main__":
     print(f"   Weekly predictions: {'✅ ENABLED (Friday)' if is_friday else '❌ DISABLED (Only runs on Fridays)'}")
     print(f"   Monthly predictions: {'✅ ENABLED (Last day of month)' if is_last_day_of_month else '❌ DISABLED (Only runs on last day of month)'}")
     
-    # Process all stocks
+    # 1. Daily (ALWAYS), 2. Weekly (ONLY ON FRIDAYS), 3. Monthly (ONLY ON LAST DAY OF MONTH)
+    timeframes = ['DAILY']
+    if is_friday:
+        timeframes.append('WEEKLY')
+    if is_last_day_of_month:
+        timeframes.append('MONTHLY')
+    
+    # Process all stocks concurrently; raises BatchPredictionError if any symbol failed
     all_symbols = {**TOP_5_NIFTY, **INDICES}
-    for symbol in all_symbols.keys():
-        print(f"\n{'='*40}")
-        print(f"PROCESSING: {symbol}")
-        print(f"{'='*40}")
-        
-        # 1. Daily Prediction (ALWAYS RUN)
-        agent.predict_daily(symbol, save=True)
-        time.sleep(3) # Rate limit safe
-        
-        # 2. Weekly Prediction (ONLY ON FRIDAYS)
-        if is_friday:
-            agent.predict_weekly(symbol, save=True)
-            time.sleep(3)
-        else:
-            print(f"   ⏭️  Skipping weekly prediction (not Friday)")
-        
-        # 3. Monthly Prediction (ONLY ON LAST DAY OF MONTH)
-        if is_last_day_of_month:
-            agent.predict_monthly(symbol, save=True)
-            time.sleep(3)
-        else:
-            print(f"   ⏭️  Skipping monthly prediction (not last day of month)")
+    BatchPredictionRunner(agent).run(all_symbols.keys(), timeframes)
     
     print(f"\nBatch process completed for {len(all_symbols)} items.")
+
+if __name__ == "__main__":
+    import sys
+    from src.core.batch_runner import BatchPredictionError
+    try:
+        run_predictions()
+    except BatchPredictionError as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
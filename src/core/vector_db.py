@@ -1,27 +1,37 @@
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import hashlib
-import requests
+import time
 from src.utils.config import config
+from src.core.embedding_cache import EmbeddingCache
+from src.core.embeddings import get_embedding_provider
+
+
+class PartialIngestError(RuntimeError):
+    """Some embedding batches failed; the articles embedded before them were stored"""
+    
+    def __init__(self, added: int, failed_ids: List[str], cause: Exception):
+        self.added = added
+        self.failed_ids = failed_ids
+        super().__init__(f"{len(failed_ids)} article(s) not stored ({added} stored): {cause}")
+
 
 class VectorDB:
     """Vector database for storing and searching news articles"""
     
     def __init__(self):
-        """Initialize ChromaDB and Jina AI API"""
+        """Initialize ChromaDB and the embedding provider"""
         # Initialize ChromaDB
         self.client = chromadb.PersistentClient(
             path=config.CHROMA_DB_PATH,
             settings=Settings(anonymized_telemetry=False)
         )
         
-        # Check Jina API key
-        if not config.JINA_API_KEY:
-            print("WARNING: JINA_API_KEY not set. Embeddings will not work.")
-            print("   Get your free API key at: https://jina.ai/")
-        else:
-            print(f"Using Jina AI API: {config.JINA_MODEL}")
+        # Jina API or local model (EMBEDDING_PROVIDER); cached vectors are keyed by its model id
+        self.embedding_provider = get_embedding_provider()
+        self.embedding_cache = EmbeddingCache(model=self.embedding_provider.model_id) if config.EMBEDDING_CACHE_ENABLED else None
+        print(f"Using embeddings from {self.embedding_provider.describe()}")
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
@@ -29,58 +39,64 @@ class VectorDB:
             metadata={"description": "Economic news articles with embeddings"}
         )
         print(f"Connected to collection: {config.COLLECTION_NAME}")
+        
+        # Stored vector dimension, looked up on first use
+        self._dimension = None
+        if self.embedding_provider.dimension is not None:
+            self._check_dimension(self.embedding_provider.dimension)
     
     def _generate_id(self, url: str) -> str:
         """Generate unique ID from URL"""
         return hashlib.md5(url.encode()).hexdigest()
     
-    def _get_retry_session(self, retries=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504]):
-        """Create a requests session with retry logic"""
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-        
-        session = requests.Session()
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=status_forcelist,
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        return session
-
-    def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding using Jina AI API (with retry)"""
-        if not config.JINA_API_KEY:
-            raise ValueError("JINA_API_KEY not configured")
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {config.JINA_API_KEY}"
-        }
+    def _generate_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+        """Generate embedding with the configured provider"""
+        return self._generate_embeddings([text], use_cache=use_cache)[0]
+    
+    def _generate_embeddings(self, texts: List[str], use_cache: bool = True) -> List[List[float]]:
+        """Generate embeddings for several texts, serving repeats from the on-disk cache
         
-        data = {
-            "model": config.JINA_MODEL,
-            "input": [text]
-        }
+        use_cache=False skips the cache entirely (one-off texts such as article
+        bodies would only evict the reusable query embeddings).
+        """
+        if not use_cache or self.embedding_cache is None:
+            return self._request_embeddings(texts)
         
-        try:
-            session = self._get_retry_session()
-            response = session.post(
-                config.JINA_API_URL,
-                headers=headers,
-                json=data,
-                timeout=30
+        cached = self.embedding_cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in cached))
+        if missing:
+            fresh = dict(zip(missing, self._request_embeddings(missing)))
+            self.embedding_cache.put_many(fresh)
+            cached.update(fresh)
+        
+        return [cached[t] for t in texts]
+    
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the configured provider, checking the collection's dimension"""
+        embeddings = self.embedding_provider.embed(texts)
+        if embeddings:
+            self._check_dimension(len(embeddings[0]))
+        return embeddings
+    
+    def _collection_dimension(self) -> Optional[int]:
+        """Dimension of the vectors already stored (None for an empty collection)"""
+        sample = self.collection.get(limit=1, include=['embeddings'])
+        embeddings = sample.get('embeddings')
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return len(embeddings[0])
+    
+    def _check_dimension(self, dimension: int):
+        if self._dimension is None:
+            self._dimension = self._collection_dimension()
+            if self._dimension is None:
+                return
+        if dimension != self._dimension:
+            raise ValueError(
+                f"Embedding provider {self.embedding_provider.describe()} returns {dimension}-dim vectors "
+                f"but collection '{config.COLLECTION_NAME}' holds {self._dimension}-dim vectors; "
+                f"use a compatible model or re-embed the collection"
             )
-            response.raise_for_status()
-            result = response.json()
-            return result['data'][0]['embedding']
-        except Exception as e:
-            print(f"Error generating embedding (after retries): {e}")
-            raise
     
     def article_exists(self, url: str) -> bool:
         """Check if article already exists in database"""
@@ -101,70 +117,129 @@ class VectorDB:
         category: str = ""
     ) -> bool:
         """Add article to vector database"""
+        return self.add_articles([{
+            "title": title,
+            "description": description,
+            "url": url,
+            "source": source,
+            "published_date": published_date,
+            "category": category
+        }]) > 0
+    
+    def add_articles(self, articles: List[Dict], batch_size: int = None) -> int:
+        """Add many articles: one existence check, batched embeddings, one insert
         
-        # Check if already exists
-        if self.article_exists(url):
-            print(f"  Skipping duplicate: {title[:60]}...")
-            return False
+        Each article is a dict with title, description, url, source,
+        published_date and optional category. Returns the number added; if a
+        later embedding batch fails, the earlier ones are still stored and
+        PartialIngestError is raised with the ids that were not.
+        """
+        batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
         
-        # Generate ID
-        article_id = self._generate_id(url)
+        # Generate IDs (dropping repeats within this batch)
+        unique = {}
+        for article in articles:
+            unique.setdefault(self._generate_id(article['url']), article)
+        if not unique:
+            return 0
+        
+        # Check which already exist with a single lookup
+        existing = set(self.collection.get(ids=list(unique), include=[])['ids'])
+        new_items = [(article_id, a) for article_id, a in unique.items() if article_id not in existing]
+        
+        skipped = len(articles) - len(new_items)
+        if skipped:
+            print(f"  Skipping {skipped} duplicate(s)")
+        if not new_items:
+            return 0
         
         # Combine title and description for embedding
-        text_to_embed = f"{title}\n\n{description}"
+        texts = [f"{a['title']}\n\n{a['description']}" for _, a in new_items]
         
-        # Generate embedding
-        embedding = self._generate_embedding(text_to_embed)
+        # Generate embeddings for new texts only, in batches
+        embeddings = []
+        failure = None
+        try:
+            for i in range(0, len(texts), batch_size):
+                embeddings.extend(self._generate_embeddings(texts[i:i + batch_size], use_cache=False))
+        except Exception as e:
+            print(f"  Error embedding articles: {e}")
+            if not embeddings:
+                raise
+            # Store the batches that were embedded before the failure, then report the rest
+            failure = PartialIngestError(len(embeddings), [article_id for article_id, _ in new_items[len(embeddings):]], e)
+            new_items = new_items[:len(embeddings)]
+            texts = texts[:len(embeddings)]
         
-        # Prepare metadata
-        metadata = {
-            "title": title,
-            "source": source,
-            "url": url,
-            "published_date": published_date,
-            "category": category
-        }
+        # Prepare metadata (ingested_at lets downstream filters process only new articles)
+        ingested_at = time.time()
+        metadatas = [{
+            "title": a['title'],
+            "source": a['source'],
+            "url": a['url'],
+            "published_date": a['published_date'],
+            "category": a.get('category', ''),
+            "ingested_at": ingested_at
+        } for _, a in new_items]
         
-        # Add to collection
+        # Add to collection in one call
         self.collection.add(
-            ids=[article_id],
-            embeddings=[embedding],
-            documents=[text_to_embed],
-            metadatas=[metadata]
+            ids=[article_id for article_id, _ in new_items],
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas
         )
         
-        print(f"  Added: {title[:60]}...")
-        return True
+        for _, a in new_items:
+            print(f"  Added: {a['title'][:60]}...")
+        if failure:
+            raise failure
+        return len(new_items)
     
     def search(self, query: str, n_results: int = 10) -> List[Dict]:
         """Search for articles semantically similar to query"""
+        return self.search_many([query], n_results)[0]
+    
+    def search_many(self, queries: List[str], n_results: Union[int, List[int]] = 10) -> List[List[Dict]]:
+        """Search several queries with one embedding request and one collection query
+        
+        n_results may be a single count or one count per query; results are
+        returned in the same order as queries.
+        """
+        if not queries:
+            return []
         
-        # Generate query embedding
-        query_embedding = self._generate_embedding(query)
+        counts = n_results if isinstance(n_results, list) else [n_results] * len(queries)
         
-        # Search
+        # Generate all query embeddings in a single round-trip
+        query_embeddings = self._generate_embeddings(queries)
+        
+        # Search (Chroma takes one n_results, so fetch the largest and trim per query)
         results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
+            query_embeddings=query_embeddings,
+            n_results=max(counts)
         )
         
         # Format results
-        articles = []
-        if results['ids'] and len(results['ids'][0]) > 0:
-            for i in range(len(results['ids'][0])):
-                article = {
-                    'id': results['ids'][0][i],
-                    'title': results['metadatas'][0][i]['title'],
-                    'source': results['metadatas'][0][i]['source'],
-                    'url': results['metadatas'][0][i]['url'],
-                    'published_date': results['metadatas'][0][i]['published_date'],
-                    'category': results['metadatas'][0][i].get('category', ''),
-                    'distance': results['distances'][0][i] if 'distances' in results else None,
-                    'snippet': results['documents'][0][i][:200] + "..."
-                }
-                articles.append(article)
-        
-        return articles
+        all_articles = []
+        for q, count in enumerate(counts):
+            articles = []
+            if results['ids'] and len(results['ids'][q]) > 0:
+                for i in range(min(count, len(results['ids'][q]))):
+                    article = {
+                        'id': results['ids'][q][i],
+                        'title': results['metadatas'][q][i]['title'],
+                        'source': results['metadatas'][q][i]['source'],
+                        'url': results['metadatas'][q][i]['url'],
+                        'published_date': results['metadatas'][q][i]['published_date'],
+                        'category': results['metadatas'][q][i].get('category', ''),
+                        'distance': results['distances'][q][i] if 'distances' in results else None,
+                        'snippet': results['documents'][q][i][:200] + "..."
+                    }
+                    articles.append(article)
+            all_articles.append(articles)
+        
+        return all_articles
     
     def get_stats(self) -> Dict:
         """Get database statistics"""
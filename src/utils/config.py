@@ -18,6 +18,21 @@ class Config:
     JINA_API_URL = os.getenv("JINA_API_URL", "https://api.jina.ai/v1/embeddings")
     JINA_MODEL = os.getenv("JINA_MODEL", "jina-embeddings-v2-base-en")
     
+    # Embedding Provider: "jina" (remote API) or "local" (sentence-transformers on CPU).
+    # The local default is the open-weights Jina v2 model, matching the collection's 768 dimensions.
+    EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "jina").lower()
+    LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "jinaai/jina-embeddings-v2-base-en")
+    LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+    LOCAL_EMBEDDING_WORKERS = int(os.getenv("LOCAL_EMBEDDING_WORKERS", "2"))
+    
+    # Embedding Cache (keyed by model; one LRU bound shared by every model's entries)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(PROJECT_ROOT, "embedding_cache.db"))
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+    
+    # Texts per embedding request during bulk ingestion
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    
     # RSS Feeds - Economic Times
     ECONOMIC_TIMES_FEEDS = {
         "top_stories": os.getenv("ET_TOP_STORIES", "https://economictimes.indiatimes.com/rssfeedstopstories.cms"),
@@ -48,5 +63,44 @@ class Config:
     # Fetching Settings
     MAX_ARTICLES_PER_FEED = int(os.getenv("MAX_ARTICLES_PER_FEED", "50"))
     FETCH_INTERVAL_MINUTES = int(os.getenv("FETCH_INTERVAL_MINUTES", "30"))
+    FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", "8"))
+    FEED_TIMEOUT_SECONDS = int(os.getenv("FEED_TIMEOUT_SECONDS", "20"))
+    
+    # SQLite tuning (see src/utils/db.py)
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+    
+    # API read connection pool
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", "256"))
+    
+    # Price Sync (re-fetch a few days before the last stored bar to pick up corrections)
+    PRICE_SYNC_OVERLAP_DAYS = int(os.getenv("PRICE_SYNC_OVERLAP_DAYS", "5"))
+    PRICE_SYNC_INITIAL_DAYS = int(os.getenv("PRICE_SYNC_INITIAL_DAYS", "365"))
+    
+    # News Filter (re-scan this far behind the high-water mark for articles committed late)
+    NEWS_FILTER_OVERLAP_SECONDS = float(os.getenv("NEWS_FILTER_OVERLAP_SECONDS", "600"))
+    
+    # Pipeline (independent stages of run_pipeline.py run concurrently)
+    PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+    
+    # Prediction Settings
+    PREDICTION_CONCURRENCY = int(os.getenv("PREDICTION_CONCURRENCY", "4"))
+    
+    # Historical Scenario Index (k-nearest-neighbour matching)
+    SCENARIO_INDEX_DIR = os.getenv("SCENARIO_INDEX_DIR", os.path.join(PROJECT_ROOT, "scenario_index"))
+    SCENARIO_TOP_K = int(os.getenv("SCENARIO_TOP_K", "20"))
+    SCENARIO_UNIVERSE = os.getenv("SCENARIO_UNIVERSE", "false").lower() == "true"
+    
+    # Provider Rate Limits (requests/minute, tokens/minute; 0 = unlimited)
+    GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
+    GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+    JINA_RPM = int(os.getenv("JINA_RPM", "500"))
+    JINA_TPM = int(os.getenv("JINA_TPM", "1000000"))
+    SCREENER_RPM = int(os.getenv("SCREENER_RPM", "60"))
+    # Requests a cold start may send back to back (scraping: evenly spaced)
+    SCREENER_BURST = int(os.getenv("SCREENER_BURST", "1"))
 
 config = Config()
@@ -0,0 +1,282 @@
+"""
+SQLite Connection Helper
+Opens stock_market.db / predictions.db with WAL and tuned pragmas, applies
+versioned index migrations the first time each database is opened, and pools
+read-only connections for the API.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.config import config
+
+# Database file name -> ordered (version, description, [(table, statement), ...]).
+# A migration is recorded only once every table it touches exists (table=None
+# means no dependency), so databases created later by another component still
+# get their indexes.
+MIGRATIONS = {
+    "stock_market.db": [
+        (1, "fundamentals symbol-prefix index", [
+            # NOCASE so prefix lookups (`symbol LIKE ?` with a bound 'TCS%', or a NOCASE range)
+            # can use the index; LIKE is case-insensitive
+            ("stock_fundamentals",
+             "CREATE INDEX IF NOT EXISTS idx_fundamentals_symbol_nocase ON stock_fundamentals(symbol COLLATE NOCASE, date)"),
+        ]),
+    ],
+    "predictions.db": [
+        (1, "prediction lookup indexes", [
+            ("prediction_history",
+             "CREATE INDEX IF NOT EXISTS idx_history_symbol_date ON prediction_history(symbol, prediction_date)"),
+            ("prediction_history",
+             "CREATE INDEX IF NOT EXISTS idx_history_date ON prediction_history(prediction_date)"),
+            ("daily_predictions",
+             "CREATE INDEX IF NOT EXISTS idx_daily_prediction_date ON daily_predictions(prediction_date)"),
+            ("weekly_predictions",
+             "CREATE INDEX IF NOT EXISTS idx_weekly_prediction_date ON weekly_predictions(prediction_date)"),
+            ("monthly_predictions",
+             "CREATE INDEX IF NOT EXISTS idx_monthly_prediction_date ON monthly_predictions(prediction_date)"),
+        ]),
+        (2, "API response cache generation counter", [
+            (None, """CREATE TABLE IF NOT EXISTS cache_generation (
+                          id INTEGER PRIMARY KEY CHECK (id = 1),
+                          generation INTEGER NOT NULL,
+                          updated_at TEXT
+                      )"""),
+            (None, "INSERT OR IGNORE INTO cache_generation (id, generation, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)"),
+        ]),
+    ],
+}
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def apply_pragmas(conn, readonly=False):
+    """Per-connection performance settings"""
+    if not readonly:
+        # Persistent: readers no longer block behind the pipeline's writers
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(config.SQLITE_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def connect(db_path, timeout=30, readonly=False, **kwargs):
+    """Open a tuned SQLite connection (read-only connections skip migrations)"""
+    if readonly:
+        uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+        migrate(conn, db_path)
+    return apply_pragmas(conn, readonly=readonly)
+
+
+def migrate(conn, db_path):
+    """Apply pending index migrations for this database file (once per process)"""
+    key = os.path.abspath(db_path)
+    name = os.path.basename(db_path)
+    if key in _migrated or name not in MIGRATIONS:
+        return
+
+    with _migrate_lock:
+        if key in _migrated:
+            return
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        pending = False
+        for version, description, statements in MIGRATIONS[name]:
+            if version in applied:
+                continue
+            if any(table is not None and table not in tables for table, _ in statements):
+                pending = True
+                continue
+            for _, statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            print(f"   ✓ {name}: applied migration {version} ({description})")
+        conn.commit()
+
+        # Retry next time if some tables have not been created yet
+        if not pending:
+            _migrated.add(key)
+
+
+def bump_cache_generation(db_path="predictions.db"):
+    """Invalidate cached API responses; called by every writer of data the API serves
+
+    Returns the new generation, or None if the counter could not be updated
+    (the writer's own data is already committed, so this never raises).
+    """
+    try:
+        conn = connect(db_path)
+        try:
+            with conn:
+                conn.execute("""
+                    UPDATE cache_generation SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = 1
+                """)
+            return read_cache_generation(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: could not bump API cache generation: {e}")
+        return None
+
+
+def read_cache_generation(conn):
+    """Current cache generation (0 if the counter does not exist yet)"""
+    try:
+        row = conn.execute("SELECT generation FROM cache_generation WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+class ConnectionPool:
+    """Thread-safe pool of read-only connections to one database
+
+    Connections are opened lazily up to `size`, shared across request threads
+    (check_same_thread=False, one borrower at a time) and keep their prepared
+    statement cache between requests. Migrations run once through a writable
+    connection when the pool is created; pooled connections are opened with
+    mode=ro.
+    """
+
+    def __init__(self, db_path, size=None, timeout=None, attach=None):
+        self.db_path = db_path
+        # {alias: path} of databases to ATTACH on every connection
+        self.attach = attach or {}
+        self.size = max(1, size or config.DB_POOL_SIZE)
+        self.timeout = timeout if timeout is not None else config.DB_POOL_TIMEOUT_SECONDS
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.created = 0
+        self.in_use = 0
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        # Creates missing files, enables WAL and applies migrations before any read-only open
+        for path in (self.db_path, *self.attach.values()):
+            connect(path).close()
+
+    def _open(self):
+        conn = connect(
+            self.db_path,
+            readonly=True,
+            check_same_thread=False,
+            cached_statements=config.DB_CACHED_STATEMENTS
+        )
+        conn.row_factory = sqlite3.Row
+        for alias, path in self.attach.items():
+            # The main connection was opened as a URI, so ATTACH accepts one too
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{os.path.abspath(path)}?mode=ro",))
+        # Belt and braces: mode=ro already rejects writes
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def acquire(self):
+        """Borrow a connection, opening a new one while under the pool size"""
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+                can_open = self.created < self.size
+                if can_open:
+                    self.created += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self.created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise TimeoutError(f"No free connection for {self.db_path} after {self.timeout}s")
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.in_use += 1
+            self.acquisitions += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    def release(self, conn):
+        """Return a borrowed connection (closing it if the pool has been shut down)"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self.in_use -= 1
+            closed = self._closed
+            if closed:
+                self.created -= 1
+        if closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self.created -= 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'database': os.path.basename(self.db_path),
+                'size': self.size,
+                'open_connections': self.created,
+                'in_use': self.in_use,
+                'idle': self.created - self.in_use,
+                'acquisitions': self.acquisitions,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3)
+            }
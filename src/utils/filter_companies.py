@@ -3,10 +3,12 @@ Filter news for top 5 Nifty companies
 Creates a separate collection with only relevant company news
 """
 
+from datetime import datetime
+import numpy as np
 from src.core.vector_db import VectorDB
 from src.utils.config import config
-import chromadb
-from chromadb.config import Settings
+from src.utils.db import connect
+from src.utils.keyword_matcher import KeywordMatcher
 
 # Top 10 Nifty companies with semantic search queries
 TOP_5_NIFTY = {
@@ -128,159 +130,280 @@ INDICES = {
 class CompanyNewsFilter:
     """Filter and store news for specific companies"""
     
-    def __init__(self):
+    FILTERED_COLLECTION = "top10_nifty_news"
+    PAGE_SIZE = 1000
+    SEMANTIC_TOP_K = 5  # Most relevant articles kept per semantic query
+    SEMANTIC_THRESHOLD = 0.40
+    
+    def __init__(self, main_db=None, state_db_path="stock_market.db"):
         # Connect to main database
-        self.main_db = VectorDB()
+        self.main_db = main_db or VectorDB()
         
-        # Create filtered collection
-        self.client = chromadb.PersistentClient(
-            path=config.CHROMA_DB_PATH,
-            settings=Settings(anonymized_telemetry=False)
+        # One automaton over every entity's keywords (stocks + indices)
+        self.keyword_matcher = KeywordMatcher(
+            {company: data['keywords'] for company, data in {**TOP_5_NIFTY, **INDICES}.items()}
         )
+        # Single-company automata for is_company_relevant, built once per keyword list
+        self._keyword_matchers = {}
+        self.state_db_path = state_db_path
+        self._init_db()
+        
+        # Filtered collection lives in the same Chroma store as the main database
+        self.client = self.main_db.client
         
-        # Delete old filtered collection if exists
+        # Superseded by top10_nifty_news
         try:
             self.client.delete_collection("top5_nifty_news")
         except:
             pass
-        try:
-            self.client.delete_collection("top10_nifty_news")
-        except:
-            pass
         
-        # Create new filtered collection
-        self.filtered_collection = self.client.create_collection(
-            name="top10_nifty_news",
+        # Keep the filtered collection between runs; only new articles are classified
+        self.filtered_collection = self.client.get_or_create_collection(
+            name=self.FILTERED_COLLECTION,
             metadata={"description": "News filtered for top 10 Nifty companies + indices"}
         )
         
-        print("✓ Created filtered collection: top10_nifty_news")
+        print(f"✓ Using filtered collection: {self.FILTERED_COLLECTION}")
+    
+    def _init_db(self):
+        """High-water mark (max ingested_at already classified) per filtered collection"""
+        conn = connect(self.state_db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS news_filter_state (
+                collection TEXT PRIMARY KEY,
+                high_water REAL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        conn.close()
+    
+    def _get_high_water(self):
+        conn = connect(self.state_db_path)
+        row = conn.execute(
+            "SELECT high_water FROM news_filter_state WHERE collection = ?", (self.FILTERED_COLLECTION,)
+        ).fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    def _set_high_water(self, high_water):
+        conn = connect(self.state_db_path)
+        conn.execute('''
+            INSERT OR REPLACE INTO news_filter_state (collection, high_water, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (self.FILTERED_COLLECTION, high_water))
+        conn.commit()
+        conn.close()
+    
+    def _new_articles(self, where):
+        """Page through main-collection articles matching `where` (None = all)"""
+        offset = 0
+        while True:
+            page = self.main_db.collection.get(
+                where=where,
+                limit=self.PAGE_SIZE,
+                offset=offset,
+                include=['documents', 'metadatas', 'embeddings']
+            )
+            if not page['ids']:
+                break
+            yield page
+            offset += len(page['ids'])
+    
+    def _without_filtered(self, page):
+        """Drop articles already in the filtered collection (classified by an earlier run)"""
+        stored = set(self.filtered_collection.get(ids=list(page['ids']), include=[])['ids'])
+        if not stored:
+            return page
+        keep = [row for row, article_id in enumerate(page['ids']) if article_id not in stored]
+        return {field: [page[field][row] for row in keep] for field in ('ids', 'documents', 'metadatas', 'embeddings')}
     
     def is_company_relevant(self, text: str, keywords: list) -> bool:
-        """Check if text mentions company keywords"""
-        text_lower = text.lower()
-        return any(keyword.lower() in text_lower for keyword in keywords)
+        """Check if text mentions company keywords (whole words only)"""
+        key = tuple(keywords)
+        matcher = self._keyword_matchers.get(key)
+        if matcher is None:
+            matcher = self._keyword_matchers[key] = KeywordMatcher({"_": keywords})
+        return bool(matcher.match(text))
+    
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        """Row-normalized float32 matrix (zero rows stay zero)"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+    
+    @staticmethod
+    def _similarity(query_matrix: np.ndarray, article_matrix: np.ndarray) -> np.ndarray:
+        """queries x articles similarity on the scale the Chroma (L2) queries used
+        
+        For unit vectors 1 - ||q - a||^2 = 2*cos - 1, so the 0.40 threshold
+        keeps its meaning.
+        """
+        return 2.0 * (query_matrix @ article_matrix.T) - 1.0
     
     def get_semantic_relevance(self, article_text: str, company_queries: list, threshold: float = 0.35) -> float:
-        """Check semantic relevance using vector similarity"""
-        # Search for each semantic query
-        max_similarity = 0.0
+        """Check semantic relevance using vector similarity
         
-        for query in company_queries:
-            results = self.main_db.collection.query(
-                query_texts=[query],
-                n_results=1,
-                where_document={"$contains": article_text[:100]}  # Match by text snippet
-            )
-            
-            if results['distances'] and len(results['distances'][0]) > 0:
-                # Convert distance to similarity (lower distance = higher similarity)
-                similarity = 1 - results['distances'][0][0]
-                max_similarity = max(max_similarity, similarity)
+        Returns the best similarity over the queries, or 0.0 when it does not
+        exceed threshold.
+        """
+        if not company_queries:
+            return 0.0
+        # One-off article text stays out of the embedding cache; the fixed queries use it
+        article_matrix = self._normalize(self.main_db._generate_embeddings([article_text], use_cache=False))
+        query_matrix = self._normalize(self.main_db._generate_embeddings(list(company_queries)))
+        similarity = float(self._similarity(query_matrix, article_matrix).max())
+        return similarity if similarity > threshold else 0.0
+    
+    def _rank_page(self, query_matrix, page, top_hits, candidates):
+        """Score one page of articles against every query with a single matrix multiply
+        
+        Merges each query's page-local top-k into its running top-k list and
+        keeps the data of articles still in any list (article id -> row dict
+        instead of list scans).
+        """
+        similarity = self._similarity(query_matrix, self._normalize(page['embeddings']))
+        k = min(self.SEMANTIC_TOP_K, similarity.shape[1])
+        # Unordered top-k columns per query row
+        top_columns = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        row_of = {article_id: row for row, article_id in enumerate(page['ids'])}
+        
+        for q, columns in enumerate(top_columns):
+            merged = top_hits[q] + [(float(similarity[q, c]), page['ids'][c]) for c in columns]
+            top_hits[q] = sorted(merged, reverse=True)[:self.SEMANTIC_TOP_K]
         
-        return max_similarity
+        keep = {article_id for hits in top_hits for _, article_id in hits}
+        for article_id in list(candidates):
+            if article_id not in keep:
+                del candidates[article_id]
+        for article_id in keep:
+            if article_id not in candidates and article_id in row_of:
+                row = row_of[article_id]
+                # Copy: the keyword pass annotates the page's metadata dicts in place
+                candidates[article_id] = (page['documents'][row], dict(page['metadatas'][row]), page['embeddings'][row])
     
-    def filter_and_copy(self):
-        """Filter news using hybrid approach: keywords + semantic similarity"""
+    def filter_and_copy(self, rebuild: bool = False):
+        """Filter news using hybrid approach: keywords + semantic similarity
+        
+        Only articles ingested after the stored high-water mark are classified
+        and bulk-upserted into the filtered collection; the first run (or
+        rebuild=True) classifies the whole archive. Incremental passes start
+        NEWS_FILTER_OVERLAP_SECONDS before the mark, so an article committed
+        late with an earlier ingested_at is not skipped, and leave out
+        articles the filtered collection already holds.
+        """
         print("\n" + "=" * 60)
         print("FILTERING NEWS FOR TOP 10 NIFTY COMPANIES + INDICES")
         print("Using hybrid approach: Keywords + Semantic Analysis")
         print("=" * 60)
         
-        # Get all articles from main collection
-        all_data = self.main_db.collection.get(
-            include=['documents', 'metadatas', 'embeddings']
-        )
+        high_water = None if rebuild else self._get_high_water()
+        if high_water is not None and self.filtered_collection.count() == 0:
+            # Filtered collection was dropped since the last run
+            high_water = None
         
-        total_articles = len(all_data['ids'])
-        print(f"\nTotal articles in database: {total_articles}")
+        if high_water is None:
+            where = None
+            print("\nFull pass: classifying every article in the database")
+        else:
+            where = {"ingested_at": {"$gt": high_water - config.NEWS_FILTER_OVERLAP_SECONDS}}
+            print(f"\nIncremental pass: articles ingested after {datetime.fromtimestamp(high_water):%Y-%m-%d %H:%M:%S}"
+                  f" (with {config.NEWS_FILTER_OVERLAP_SECONDS:.0f}s overlap)")
         
         # Track all entities (stocks + indices)
         all_entities = {**TOP_5_NIFTY, **INDICES}
         filtered_count = {company: 0 for company in all_entities.keys()}
-        total_filtered = 0
-        added_ids = set()  # Track added articles to avoid duplicates
+        matches = {}  # article_id -> (document, metadata, embedding)
+        total_articles = 0
+        new_high_water = high_water or 0.0
+        
+        # Semantic queries for indirect impacts (government policies, sector news)
+        queries = [(company, query)
+                   for company, company_data in TOP_5_NIFTY.items()
+                   for query in company_data['semantic_queries']]
+        query_matrix = None
+        # Running top-k per query across pages: (similarity, article_id), plus the candidates' data
+        top_hits = [[] for _ in queries]
+        candidates = {}
         
         print("\nProcessing articles...")
         
-        # Filter and copy relevant articles
-        for i in range(total_articles):
-            article_id = all_data['ids'][i]
-            document = all_data['documents'][i]
-            metadata = all_data['metadatas'][i]
-            embedding = all_data['embeddings'][i]
+        # Method 1: Direct keyword match (high confidence), page by page
+        for page in self._new_articles(where):
+            if where is not None:
+                page = self._without_filtered(page)
+                if not page['ids']:
+                    continue
+            total_articles += len(page['ids'])
             
-            title = metadata.get('title', '')
-            full_text = title + " " + document
+            if queries:
+                if query_matrix is None:
+                    # Use custom embeddings for queries to match database dimensions (one batched, cached request)
+                    query_matrix = self._normalize(self.main_db._generate_embeddings([q for _, q in queries]))
+                self._rank_page(query_matrix, page, top_hits, candidates)
             
-            # Check each entity (stocks + indices)
-            for company, company_data in all_entities.items():
-                # Method 1: Direct keyword match (high confidence)
-                if self.is_company_relevant(full_text, company_data['keywords']):
-                    if article_id not in added_ids:
-                        metadata['company'] = company
-                        metadata['match_type'] = 'keyword'
-                        
-                        self.filtered_collection.add(
-                            ids=[article_id],
-                            documents=[document],
-                            metadatas=[metadata],
-                            embeddings=[embedding]
-                        )
-                        
-                        added_ids.add(article_id)
-                        filtered_count[company] += 1
-                        total_filtered += 1
-                        print(f"  ✓ [{company}] KEYWORD: {title[:50]}...")
-                        break
-        
-        # Method 2: Semantic search for indirect impacts
-        print("\nSearching for indirect impacts (government policies, sector news)...")
-        
-        for company, company_data in TOP_5_NIFTY.items():
-            for query in company_data['semantic_queries']:
-                # Use custom embedding for query to match database dimensions
-                query_embedding = self.main_db._generate_embedding(query)
+            for article_id, document, metadata, embedding in zip(
+                page['ids'], page['documents'], page['metadatas'], page['embeddings']
+            ):
+                new_high_water = max(new_high_water, metadata.get('ingested_at') or 0.0)
                 
-                results = self.main_db.collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=5  # Top 5 most relevant per query
-                )
+                title = metadata.get('title', '')
+                full_text = title + " " + document
                 
-                if results['ids'] and len(results['ids'][0]) > 0:
-                    for j in range(len(results['ids'][0])):
-                        article_id = results['ids'][0][j]
-                        similarity = 1 - results['distances'][0][j]
-                        
-                        # Only add if similarity is high enough and not already added
-                        if similarity > 0.40 and article_id not in added_ids:
-                            # Get the article data
-                            idx = all_data['ids'].index(article_id)
-                            document = all_data['documents'][idx]
-                            metadata = all_data['metadatas'][idx].copy()
-                            embedding = all_data['embeddings'][idx]
-                            
-                            metadata['company'] = company
-                            metadata['match_type'] = 'semantic'
-                            metadata['similarity'] = f"{similarity:.2%}"
-                            metadata['matched_query'] = query
-                            
-                            self.filtered_collection.add(
-                                ids=[article_id],
-                                documents=[document],
-                                metadatas=[metadata],
-                                embeddings=[embedding]
-                            )
-                            
-                            added_ids.add(article_id)
-                            filtered_count[company] += 1
-                            total_filtered += 1
-                            print(f"  ✓ [{company}] SEMANTIC ({similarity:.0%}): {metadata['title'][:45]}...")
+                # One pass finds every mentioned entity; the most-mentioned one owns the article
+                best = self.keyword_matcher.best_match(full_text)
+                if best:
+                    company, hits = best
+                    metadata['company'] = company
+                    metadata['match_type'] = 'keyword'
+                    metadata['keyword_hits'] = hits
+                    matches[article_id] = (document, metadata, embedding)
+                    filtered_count[company] += 1
+                    print(f"  ✓ [{company}] KEYWORD ({hits}): {title[:50]}...")
+        
+        print(f"\nNew articles to classify: {total_articles}")
+        
+        # Method 2: Semantic matches from the similarity matrices scored above
+        if candidates:
+            print("\nSearching for indirect impacts (government policies, sector news)...")
+            
+            for (company, query), hits in zip(queries, top_hits):
+                for similarity, article_id in sorted(hits, reverse=True):
+                    # Only add if similarity is high enough and not already added
+                    if similarity <= self.SEMANTIC_THRESHOLD or article_id in matches:
+                        continue
+                    document, metadata, embedding = candidates[article_id]
+                    metadata = dict(metadata)
+                    metadata['company'] = company
+                    metadata['match_type'] = 'semantic'
+                    metadata['similarity'] = f"{similarity:.2%}"
+                    metadata['matched_query'] = query
+                    matches[article_id] = (document, metadata, embedding)
+                    filtered_count[company] += 1
+                    print(f"  ✓ [{company}] SEMANTIC ({similarity:.0%}): {metadata['title'][:45]}...")
+        
+        # Bulk write, in chunks under Chroma's max batch size
+        ids = list(matches)
+        for i in range(0, len(ids), self.PAGE_SIZE):
+            chunk = ids[i:i + self.PAGE_SIZE]
+            self.filtered_collection.upsert(
+                ids=chunk,
+                documents=[matches[a][0] for a in chunk],
+                metadatas=[matches[a][1] for a in chunk],
+                embeddings=[matches[a][2] for a in chunk]
+            )
+        
+        # Advance the mark only after the filtered articles are stored
+        self._set_high_water(new_high_water)
         
         print("\n" + "=" * 60)
         print("FILTERING COMPLETE")
         print("=" * 60)
-        print(f"\nTotal filtered articles: {total_filtered}/{total_articles}")
+        print(f"\nNewly filtered articles: {len(matches)}/{total_articles}")
+        print(f"Filtered collection size: {self.filtered_collection.count()}")
         print("\nBy Company:")
         for company, count in filtered_count.items():
             print(f"  • {company}: {count}")
@@ -305,16 +428,17 @@ class CompanyNewsFilter:
         
         return results
 
-def main():
+def main(vector_db=None, rebuild=False):
     """Run the filtering"""
-    filter_system = CompanyNewsFilter()
-    filter_system.filter_and_copy()
+    filter_system = CompanyNewsFilter(main_db=vector_db)
+    filter_system.filter_and_copy(rebuild=rebuild)
     
-    print("\n✓ Filtered database created!")
+    print("\n✓ Filtered database updated!")
     print("\nYou can now search company-specific news:")
     print("  - Collection name: 'top10_nifty_news'")
     print("  - Stocks: Reliance, TCS, HDFC Bank, Infosys, ICICI Bank, Airtel, ITC, Wipro, HCL Tech, Bajaj Finance")
     print("  - Indices: NIFTY 50, SENSEX")
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(rebuild="--rebuild" in sys.argv)
@@ -0,0 +1,100 @@
+"""
+Multi-Company Keyword Matcher
+Aho-Corasick automaton compiled once from every entity's keywords, so one
+pass over an article finds all matching companies regardless of how many
+are tracked. Matches must sit on word boundaries ("ril" does not match "april").
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """Case-insensitive, word-boundary aware matcher for {entity: [keywords]}"""
+
+    def __init__(self, entity_keywords: Dict[str, Iterable[str]]):
+        self.entities = list(entity_keywords)
+        # Trie: per-node transitions, failure links and (entity index, keyword length) outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]
+
+        for index, entity in enumerate(self.entities):
+            for keyword in entity_keywords[entity]:
+                keyword = keyword.lower().strip()
+                if keyword:
+                    self._add(keyword, index)
+        self._build()
+
+    def _add(self, keyword: str, entity_index: int):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (entity_index, len(keyword)) not in self._out[node]:
+            self._out[node].append((entity_index, len(keyword)))
+
+    def _build(self):
+        """Breadth-first failure links; outputs inherit their suffix node's outputs"""
+        # Depth-1 nodes fail to the root (their link is already 0)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _spans(self, text: str) -> List[Tuple[int, int, int]]:
+        """Every word-bounded keyword occurrence as (start, end, entity index)"""
+        length = len(text)
+        spans = []
+        node = 0
+
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            if not self._out[node]:
+                continue
+
+            if i + 1 < length and text[i + 1].isalnum():
+                continue
+            for entity_index, size in self._out[node]:
+                start = i - size + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    spans.append((start, i + 1, entity_index))
+        return spans
+
+    def match(self, text: str) -> Dict[str, int]:
+        """{entity: mentions} for every entity in text, in declaration order
+
+        Overlapping keywords count once: the leftmost, longest occurrence wins
+        ("reliance jio" is one mention, not "reliance" + "jio" + "reliance jio").
+        A keyword listed under several entities counts for each of them.
+        """
+        counts = [0] * len(self.entities)
+        winner = (0, 0)
+        for start, end, entity_index in sorted(self._spans(text.lower()), key=lambda s: (s[0], -s[1])):
+            if start < winner[1] and (start, end) != winner:
+                continue
+            counts[entity_index] += 1
+            winner = (start, end)
+
+        return {self.entities[i]: c for i, c in enumerate(counts) if c}
+
+    def best_match(self, text: str):
+        """(entity, mentions) with the most mentions (earliest declared on ties), or None"""
+        counts = self.match(text)
+        if not counts:
+            return None
+        entity = max(counts, key=lambda e: (counts[e], -self.entities.index(e)))
+        return entity, counts[entity]
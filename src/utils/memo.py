@@ -0,0 +1,81 @@
+"""
+Thread-safe Memo
+Get-or-build cache shared by the prediction context cache and the API
+response cache: each key is built at most once per tag, concurrent callers
+for the same key wait for the one build in progress.
+"""
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+
+class Memo:
+    """Values keyed by any hashable, optionally tagged (e.g. with a cache generation)
+
+    An entry is only served for the tag it was built under; a different tag
+    rebuilds and replaces it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable, tag: Optional[Hashable]):
+        """(found, value) under self._lock"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == tag:
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    def get_or_build(self, key: Hashable, builder: Callable, tag: Optional[Hashable] = None):
+        """Return the value for (key, tag), calling builder() at most once.
+
+        Concurrent callers for the same key wait on a per-key lock instead of
+        building twice; failed builds are not cached.
+        """
+        with self._lock:
+            found, value = self._lookup(key, tag)
+            if found:
+                return value
+            # [lock, callers holding or waiting on it]
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        try:
+            with key_lock[0]:
+                with self._lock:
+                    found, value = self._lookup(key, tag)
+                    if found:
+                        return value
+                    self.misses += 1
+
+                value = builder()
+
+                with self._lock:
+                    self._entries[key] = (tag, value)
+                return value
+        finally:
+            # Dropped with its last user: after a failed build, waiters and new
+            # callers keep taking turns on the same lock
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0 and self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def clear(self):
+        # Build locks are left to their callers, which remove them when done
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
@@ -0,0 +1,205 @@
+"""
+In-Process Pipeline Runner
+Runs pipeline stages as a dependency graph in one interpreter: independent
+stages overlap in worker threads, heavy clients (VectorDB) are created once
+and shared, and every stage's wall time is reported. Stages that declare
+their inputs are skipped when those inputs match the last successful run.
+"""
+import hashlib
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+from src.utils.config import config
+from src.utils.db import connect
+
+# Statuses that let dependent stages run
+SUCCESS = ("ok", "unchanged")
+
+
+class Stage:
+    """One pipeline step: `func(context)` runs after every stage in `depends_on` succeeded
+
+    `inputs(context)` optionally returns a JSON-serializable description of
+    the data the stage consumes (article IDs, latest price date, ...); stages
+    without it always run.
+    """
+
+    def __init__(self, name: str, description: str, func: Callable, depends_on: Iterable[str] = (),
+                 inputs: Optional[Callable] = None):
+        self.name = name
+        self.description = description
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.inputs = inputs
+
+    def fingerprint(self, context) -> Optional[str]:
+        if self.inputs is None:
+            return None
+        payload = json.dumps(self.inputs(context), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunState:
+    """Input fingerprint of each stage's last successful run (pipeline_run_state table)"""
+
+    def __init__(self, db_path="stock_market.db"):
+        self.db_path = db_path
+        conn = connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_run_state (
+                stage TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                seconds REAL,
+                finished_at TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get(self, stage_name: str) -> Optional[str]:
+        conn = connect(self.db_path)
+        row = conn.execute("SELECT fingerprint FROM pipeline_run_state WHERE stage = ?", (stage_name,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def record(self, stage_name: str, fingerprint: str, seconds: float):
+        conn = connect(self.db_path)
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO pipeline_run_state (stage, fingerprint, seconds, finished_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, (stage_name, fingerprint, seconds))
+        conn.close()
+
+
+class PipelineContext:
+    """Clients shared by all stages of one run, created on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vector_db = None
+
+    @property
+    def vector_db(self):
+        with self._lock:
+            if self._vector_db is None:
+                from src.core.vector_db import VectorDB
+                self._vector_db = VectorDB()
+            return self._vector_db
+
+
+class Pipeline:
+    """Topologically scheduled stages with a concurrency cap"""
+
+    def __init__(self, stages: List[Stage], max_workers: int = None,
+                 on_stage_done: Optional[Callable[[Stage, str], None]] = None,
+                 run_state: Optional[RunState] = None, force: bool = False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max(1, max_workers or config.PIPELINE_MAX_WORKERS)
+        # Without a RunState every stage runs; force=True runs them but still records fingerprints
+        self.run_state = run_state
+        self.force = force
+        # Called from the scheduler thread after each stage finishes (any status)
+        self.on_stage_done = on_stage_done
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            missing = [d for d in stage.depends_on if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        # Kahn's algorithm: anything left over sits on a cycle
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline has a dependency cycle: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _run_stage(self, stage: Stage, context: PipelineContext) -> Dict:
+        start = time.perf_counter()
+        fingerprint = None
+        if self.run_state is not None and stage.inputs is not None:
+            try:
+                # Taken before running: inputs the stage itself changes must not hide new data
+                fingerprint = stage.fingerprint(context)
+            except Exception as e:
+                print(f"\n⚠ Could not fingerprint '{stage.name}' inputs, running it: {e}")
+            if fingerprint and not self.force and fingerprint == self.run_state.get(stage.name):
+                print(f"\n⏩ {stage.description} [{stage.name}]: inputs unchanged, skipping")
+                return {"stage": stage.name, "status": "unchanged", "error": None,
+                        "seconds": time.perf_counter() - start}
+
+        print(f"\n{'='*60}")
+        print(f"STEP: {stage.description} [{stage.name}]")
+        print(f"{'='*60}")
+
+        try:
+            stage.func(context)
+            status, error = "ok", None
+        except Exception as e:
+            traceback.print_exc()
+            status, error = "failed", str(e) or e.__class__.__name__
+
+        seconds = time.perf_counter() - start
+        if status == "ok" and fingerprint:
+            self.run_state.record(stage.name, fingerprint, seconds)
+        return {"stage": stage.name, "status": status, "error": error, "seconds": seconds}
+
+    def run(self, context: PipelineContext = None) -> Dict[str, Dict]:
+        """Run every stage once; returns {name: report} with status ok / unchanged / failed / skipped"""
+        context = context or PipelineContext()
+        reports = {}
+        pending = dict(self.stages)
+        running = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    statuses = [reports[d]["status"] if d in reports else None for d in stage.depends_on]
+                    if any(s in ("failed", "skipped") for s in statuses):
+                        failed = [d for d, s in zip(stage.depends_on, statuses) if s in ("failed", "skipped")]
+                        print(f"\n⏭  Skipping '{name}': upstream {', '.join(failed)} did not succeed")
+                        reports[name] = {"stage": name, "status": "skipped", "error": None, "seconds": 0.0}
+                        del pending[name]
+                    elif all(s in SUCCESS for s in statuses) and len(running) < self.max_workers:
+                        running[pool.submit(self._run_stage, stage, context)] = stage
+                        del pending[name]
+
+                if not running:
+                    # Everything left was skipped in the pass above
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    reports[stage.name] = future.result()
+                    if self.on_stage_done:
+                        self.on_stage_done(stage, reports[stage.name]["status"])
+
+        self._print_report(reports, time.perf_counter() - start)
+        return reports
+
+    def _print_report(self, reports: Dict[str, Dict], wall_time: float):
+        """Per-stage wall time in declaration order"""
+        icons = {"ok": "✅", "unchanged": "⏩", "failed": "❌", "skipped": "⏭ "}
+        print(f"\n{'='*60}")
+        print("PIPELINE STAGE TIMINGS")
+        print(f"{'='*60}")
+        for name in self.stages:
+            report = reports[name]
+            line = f"{icons[report['status']]} {name:<22} {report['seconds']:8.2f}s"
+            if report["error"]:
+                line += f"  ({report['error']})"
+            print(line)
+
+        serial = sum(r["seconds"] for r in reports.values())
+        print(f"\nWall time: {wall_time:.2f}s (sum of stages: {serial:.2f}s)")
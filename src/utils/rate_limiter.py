@@ -0,0 +1,185 @@
+"""
+Shared Rate Limiter
+Token-bucket limits (requests/minute and tokens/minute) per external provider,
+with adaptive backoff on HTTP 429 and wait-time metrics.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+from src.utils.config import config
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Detect a provider "too many requests" error (requests or google-api-core)"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) == 429:
+        return True
+    if getattr(error, 'code', None) == 429:
+        return True
+    return type(error).__name__ in ('ResourceExhausted', 'TooManyRequests')
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a Retry-After header from an HTTP error, if the provider sent one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuous-refill token bucket, by default sized to one minute of budget"""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.per_minute = float(per_minute)
+        self.capacity = float(capacity or per_minute)
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float, rate_factor: float = 1.0):
+        elapsed = now - self.updated_at
+        self.available = min(self.capacity, self.available + elapsed * self.per_minute * rate_factor / 60.0)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float, rate_factor: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60.0 / (self.per_minute * rate_factor)
+
+
+class RateLimiter:
+    """Requests/minute + tokens/minute limiter for a single provider"""
+
+    MIN_RATE_FACTOR = 0.1
+    MAX_BACKOFF_SECONDS = 60.0
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = 0, burst: float = None):
+        """burst caps back-to-back requests (default: a full minute's budget)"""
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, burst) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.rate_factor = 1.0
+        self.backoff = 1.0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.total_requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self, tokens: float = 0):
+        """Block until one request (and `tokens` tokens) fit in the budget"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                buckets = [b for b in (self.requests, self.tokens) if b]
+                for bucket in buckets:
+                    bucket.refill(now, self.rate_factor)
+
+                wait = max(0.0, self.cooldown_until - now)
+                if self.requests:
+                    wait = max(wait, self.requests.seconds_until(1, self.rate_factor))
+                if self.tokens and tokens:
+                    wait = max(wait, self.tokens.seconds_until(tokens, self.rate_factor))
+
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.available -= 1
+                    if self.tokens and tokens:
+                        self.tokens.available -= min(tokens, self.tokens.capacity)
+                    self.total_requests += 1
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+                    return waited
+
+            # Sleep outside the lock so other threads can refill/acquire
+            time.sleep(wait)
+            waited += wait
+
+    def report_success(self):
+        """Recover towards the configured rate after a successful call"""
+        with self._lock:
+            self.rate_factor = min(1.0, self.rate_factor * 1.25)
+            self.backoff = 1.0
+
+    def report_throttled(self, retry_after: float = None):
+        """Halve the effective rate and pause all callers after a 429"""
+        with self._lock:
+            self.throttled += 1
+            self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor * 0.5)
+            pause = retry_after if retry_after is not None else self.backoff
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + pause)
+            self.backoff = min(self.MAX_BACKOFF_SECONDS, self.backoff * 2)
+        print(f"   ⏳ {self.name} rate limited - backing off {pause:.1f}s (rate now {self.rate_factor:.0%})")
+
+    def call(self, func: Callable, *args, tokens: float = 0, max_retries: int = 4, **kwargs):
+        """Run `func` inside the budget, retrying with backoff on 429 responses"""
+        for attempt in range(max_retries + 1):
+            self.acquire(tokens)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                self.report_throttled(_retry_after_seconds(e))
+                continue
+            self.report_success()
+            return result
+
+    def metrics(self) -> Dict:
+        """Snapshot of request counts and time spent waiting for budget"""
+        with self._lock:
+            return {
+                'provider': self.name,
+                'requests': self.total_requests,
+                'throttled': self.throttled,
+                'total_wait_seconds': round(self.total_wait, 2),
+                'max_wait_seconds': round(self.max_wait, 2),
+                'rate_factor': round(self.rate_factor, 2)
+            }
+
+
+# Provider name -> (requests/minute, tokens/minute, request burst; None = one minute's budget)
+PROVIDER_LIMITS = {
+    "gemini": (config.GEMINI_RPM, config.GEMINI_TPM, None),
+    "jina": (config.JINA_RPM, config.JINA_TPM, None),
+    "screener": (config.SCREENER_RPM, 0, config.SCREENER_BURST),
+}
+
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Get the process-wide limiter for a provider"""
+    with _registry_lock:
+        if provider not in _limiters:
+            rpm, tpm, burst = PROVIDER_LIMITS.get(provider, (0, 0, None))
+            _limiters[provider] = RateLimiter(provider, rpm, tpm, burst)
+        return _limiters[provider]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def print_rate_limit_report():
+    """Print wait-time metrics for every provider used in this process"""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    if not limiters:
+        return
+
+    print("\nRate limiter metrics:")
+    for limiter in limiters:
+        m = limiter.metrics()
+        print(f"  • {m['provider']}: {m['requests']} requests, {m['throttled']} throttled, "
+              f"waited {m['total_wait_seconds']:.1f}s (max {m['max_wait_seconds']:.1f}s)")
@@ -0,0 +1,39 @@
+"""
+API Response Cache
+Serialized JSON responses keyed by endpoint + parameters and tagged with the
+cache generation they were built under; every writer of served data bumps
+the generation (src.utils.db.bump_cache_generation), which invalidates every
+entry at once.
+"""
+import hashlib
+import json
+from typing import Callable, Dict, Hashable, Tuple
+from src.utils.memo import Memo
+
+
+class ResponseCache:
+    """Thread-safe generation-tagged cache of (etag, JSON body)"""
+
+    def __init__(self):
+        self._memo = Memo()
+
+    @staticmethod
+    def _etag(generation: int, body: bytes) -> str:
+        return f'"{generation}-{hashlib.sha1(body).hexdigest()[:16]}"'
+
+    def get_or_build(self, key: Hashable, generation: int, builder: Callable) -> Tuple[str, bytes]:
+        """Return (etag, body) for key, rebuilding when the generation has moved on.
+
+        `builder` returns a JSON-serializable payload; errors are not cached.
+        """
+        def build():
+            body = json.dumps(builder(), default=str).encode("utf-8")
+            return self._etag(generation, body), body
+
+        return self._memo.get_or_build(key, build, tag=generation)
+
+    def clear(self):
+        self._memo.clear()
+
+    def stats(self) -> Dict:
+        return self._memo.stats()
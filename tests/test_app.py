@@ -0,0 +1,141 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("google.generativeai")
+
+import app
+from src.utils.db import connect
+
+
+def test_last_updated_comes_from_the_newest_prediction():
+    predictions = {
+        "TCS": {"created_at": "2024-01-02 03:45:00"},
+        "INFY": {"created_at": "2024-01-03 04:00:00"},
+        "ITC": {"created_at": None},
+    }
+    prices = {"TCS.NS": {"date": "2024-01-05"}}
+    expected = datetime(2024, 1, 3, 4, 0, tzinfo=timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+    assert app._last_updated(predictions, prices) == expected
+
+
+def test_last_updated_falls_back_to_the_newest_price_date():
+    prices = {"TCS.NS": {"date": "2024-01-04"}, "INFY.NS": {"date": "2024-01-05"}}
+    assert app._last_updated({}, prices) == "2024-01-05"
+    assert app._last_updated({}, {}) is None
+
+
+@pytest.fixture
+def main_conn(tmp_path):
+    db_path = str(tmp_path / "stock_market.db")
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE stock_fundamentals (symbol TEXT, date TEXT, stock_pe REAL, PRIMARY KEY (symbol, date))")
+    conn.close()
+    # Reopened once the table exists, so the symbol-prefix index migration applies
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def test_latest_fundamentals_matches_case_insensitive_prefixes(main_conn):
+    main_conn.executemany("INSERT INTO stock_fundamentals VALUES (?, ?, ?)", [
+        ("RELIANCE", "2024-01-02", 24.0), ("RELIANCE", "2024-01-03", 25.0),
+        ("HDFCBANK", "2024-01-03", 18.0), ("TCS", "2024-01-01", 30.0), ("TCSX", "2023-12-01", 1.0),
+    ])
+
+    latest = app._latest_fundamentals(main_conn, ["Reliance", "HDFC", "TCS", "Wipro"])
+    assert {name: (row["symbol"], row["date"]) for name, row in latest.items()} == {
+        "Reliance": ("RELIANCE", "2024-01-03"),
+        "HDFC": ("HDFCBANK", "2024-01-03"),
+        "TCS": ("TCS", "2024-01-01"),
+    }
+
+
+def test_latest_fundamentals_searches_the_nocase_index(main_conn):
+    statements = []
+    main_conn.set_trace_callback(statements.append)
+    app._latest_fundamentals(main_conn, ["Reliance", "TCS"])
+    main_conn.set_trace_callback(None)
+
+    plan = " ".join(row[3] for row in main_conn.execute(f"EXPLAIN QUERY PLAN {statements[-1]}"))
+    assert "USING INDEX idx_fundamentals_symbol_nocase" in plan
+
+
+def test_latest_rows_picks_the_newest_row_per_key(tmp_path):
+    conn = connect(str(tmp_path / "predictions.db"))
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE prediction_history (id INTEGER PRIMARY KEY, symbol TEXT, prediction_date TEXT, "
+                 "direction TEXT)")
+    conn.executemany("INSERT INTO prediction_history (symbol, prediction_date, direction) VALUES (?, ?, ?)", [
+        ("TCS", "2024-01-03", "UP"), ("TCS", "2024-01-02", "DOWN"),
+        # Same day twice: the later insert wins
+        ("ITC", "2024-01-03", "DOWN"), ("ITC", "2024-01-03", "UP"), ("ITC", "2024-01-01", "DOWN"),
+        ("WIPRO", "2024-01-05", "UP"),
+    ])
+
+    latest = app._latest_rows(conn, "prediction_history", "symbol", ["TCS", "ITC", "INFY"],
+                              "prediction_date DESC, id DESC")
+    conn.close()
+
+    assert {symbol: (row["prediction_date"], row["direction"]) for symbol, row in latest.items()} == {
+        "TCS": ("2024-01-03", "UP"),
+        "ITC": ("2024-01-03", "UP"),
+    }
+    assert "rn" not in latest["TCS"]
+    assert app._latest_rows(None, "prediction_history", "symbol", [], "id DESC") == {}
+
+
+def _archive_dbs(tmp_path):
+    """Four stocks with 4/3/1/0 correct DAILY predictions out of 4, plus an index that is ignored"""
+    from datetime import date, timedelta
+
+    main_db, pred_db = str(tmp_path / "stock_market.db"), str(tmp_path / "predictions.db")
+    days = [(date.today() - timedelta(days=n)).isoformat() for n in (5, 4, 3, 2)]
+    hits = {"TCS": 4, "ITC": 3, "Wipro": 1, "Infosys": 0, "NIFTY 50": 4}
+
+    conn = connect(main_db)
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, open REAL, close REAL, "
+                 "PRIMARY KEY (symbol, date))")
+    tickers = dict(app.TICKER_MAP, **{"NIFTY 50": "NIFTY.NS"})
+    conn.executemany("INSERT INTO stock_daily_prices VALUES (?, ?, 100.0, 101.0)",
+                     [(tickers[symbol], day) for symbol in hits for day in days])
+    conn.commit()
+    conn.close()
+
+    conn = connect(pred_db)
+    conn.execute("CREATE TABLE daily_predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, "
+                 "prediction_date TEXT, direction TEXT, predicted_move REAL, confidence_score INTEGER, "
+                 "UNIQUE (symbol, prediction_date))")
+    # Actual move is +1%: an UP call within 0.5% is a direction and price hit
+    conn.executemany("INSERT INTO daily_predictions (symbol, prediction_date, direction, predicted_move, "
+                     "confidence_score) VALUES (?, ?, ?, ?, ?)",
+                     [(symbol, day, "UP" if i < count else "DOWN", 1.2 if i < count else -0.8, 8 if i % 2 else 4)
+                      for symbol, count in hits.items() for i, day in enumerate(days)])
+    conn.commit()
+    conn.close()
+    return main_db, pred_db
+
+
+def test_archive_metrics_ranks_performers(tmp_path):
+    main_db, pred_db = _archive_dbs(tmp_path)
+    conn = connect(pred_db)
+    conn.row_factory = sqlite3.Row
+    conn.execute("ATTACH DATABASE ? AS market", (main_db,))
+    metrics = app._archive_metrics(conn, "daily_predictions", "DAILY", None, None)
+
+    assert metrics["overall_accuracy"] == {"sentiment_accuracy": 50.0, "price_accuracy": 50.0, "total_predictions": 16}
+    assert [(p["symbol"], p["accuracy"], p["correct"]) for p in metrics["top_performers"]] == [
+        ("TCS", 100.0, 4), ("ITC", 75.0, 3), ("Wipro", 25.0, 1)
+    ]
+    assert [p["symbol"] for p in metrics["bottom_performers"]] == ["Infosys", "Wipro", "ITC"]
+    # The 2nd and 4th day are high confidence: TCS hits both, ITC one, Wipro/Infosys none
+    assert metrics["confidence_correlation"]["high_confidence_accuracy"] == 37.5
+
+    # Once the rollup exists the same figures come from it
+    from src.analysis.outcome_tracker import OutcomeTracker
+    OutcomeTracker(app.TICKER_MAP, app.INDICES.keys(), pred_db_path=pred_db, main_db_path=main_db).update(("DAILY",))
+    assert app._archive_metrics(conn, "daily_predictions", "DAILY", None, None) == metrics
+    conn.close()
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.core.batch_runner import BatchPredictionError, BatchPredictionRunner
+
+
+class FakeAgent:
+    """predict_* stand-ins: `failures` maps (symbol, timeframe) to an exception or None result"""
+
+    def __init__(self, failures=()):
+        self.failures = dict(failures)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _predict(self, timeframe, symbol, save=False):
+        with self._lock:
+            self.calls.append((symbol, timeframe))
+        outcome = self.failures.get((symbol, timeframe), "ok")
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome is None:
+            return None
+        return {"symbol": symbol, "timeframe": timeframe}
+
+    def predict_daily(self, symbol, save=False):
+        return self._predict("DAILY", symbol, save)
+
+    def predict_weekly(self, symbol, save=False):
+        return self._predict("WEEKLY", symbol, save)
+
+
+def test_all_symbols_succeed():
+    agent = FakeAgent()
+    reports = BatchPredictionRunner(agent, max_workers=3).run(["TCS", "INFY", "ITC"], ["daily", "weekly"])
+    assert sorted(r["symbol"] for r in reports) == ["INFY", "ITC", "TCS"]
+    assert all(r["ok"] and r["errors"] == {} for r in reports)
+    assert len(agent.calls) == 6
+
+
+def test_failure_is_reported_after_every_symbol_ran():
+    agent = FakeAgent({("INFY", "DAILY"): TimeoutError("gemini timed out"), ("ITC", "WEEKLY"): None})
+
+    with pytest.raises(BatchPredictionError) as excinfo:
+        BatchPredictionRunner(agent, max_workers=2).run(["TCS", "INFY", "ITC"], ["DAILY", "WEEKLY"])
+
+    error = excinfo.value
+    assert error.failed == {
+        "INFY": {"DAILY": "gemini timed out"},
+        "ITC": {"WEEKLY": "no prediction returned"},
+    }
+    # The other timeframe of a failing symbol, and the other symbols, still ran
+    assert sorted(agent.calls) == sorted(
+        (symbol, tf) for symbol in ("TCS", "INFY", "ITC") for tf in ("DAILY", "WEEKLY")
+    )
+    reports = {r["symbol"]: r for r in error.reports}
+    assert reports["TCS"]["ok"]
+    assert reports["INFY"]["results"]["WEEKLY"] == {"symbol": "INFY", "timeframe": "WEEKLY"}
+    assert "INFY" in str(error) and "2/3 symbols failed" in str(error)
+
+
+def test_failures_can_be_returned_instead_of_raised():
+    agent = FakeAgent({("TCS", "DAILY"): RuntimeError("quota exceeded")})
+    reports = BatchPredictionRunner(agent).run(["TCS", "INFY"], raise_on_failure=False)
+    failed = [r["symbol"] for r in reports if not r["ok"]]
+    assert failed == ["TCS"]
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils.db import ConnectionPool, connect, read_cache_generation
+
+
+@pytest.fixture
+def databases(tmp_path):
+    market = tmp_path / "stock_market.db"
+    conn = connect(str(market))
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, close REAL)")
+    conn.execute("INSERT INTO stock_daily_prices VALUES ('TCS.NS', '2024-01-02', 3700.0)")
+    conn.commit()
+    conn.close()
+    return tmp_path / "predictions.db", market
+
+
+def test_pool_migrates_then_serves_read_only_connections(databases):
+    predictions, market = databases
+    pool = ConnectionPool(str(predictions), size=2, attach={"market": str(market)})
+
+    with pool.connection() as conn:
+        # Migrations ran through the pool's one writable connect
+        assert read_cache_generation(conn) == 0
+        row = conn.execute("SELECT close FROM market.stock_daily_prices").fetchone()
+        assert row["close"] == 3700.0
+        for statement in ("CREATE TABLE scratch (x)", "DELETE FROM market.stock_daily_prices"):
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute(statement)
+    pool.close()
+
+
+def test_readers_see_later_commits(databases):
+    predictions, market = databases
+    pool = ConnectionPool(str(market), size=1)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stock_daily_prices").fetchone()[0] == 1
+
+    writer = connect(str(market))
+    writer.execute("INSERT INTO stock_daily_prices VALUES ('TCS.NS', '2024-01-03', 3710.0)")
+    writer.commit()
+    writer.close()
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stock_daily_prices").fetchone()[0] == 2
+    pool.close()
+
+
+def test_connections_are_reused_up_to_the_pool_size(databases):
+    predictions, _ = databases
+    pool = ConnectionPool(str(predictions), size=2, timeout=0.05)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+
+    second = pool.acquire()
+    assert second is not first
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    metrics = pool.metrics()
+    assert metrics["open_connections"] == 2
+    assert metrics["in_use"] == 2
+    assert metrics["timeouts"] == 1
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+
+
+def test_waiting_borrower_gets_the_released_connection(databases):
+    predictions, _ = databases
+    pool = ConnectionPool(str(predictions), size=1, timeout=5)
+    held = pool.acquire()
+    borrowed = []
+
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+    waiter.start()
+    pool.release(held)
+    waiter.join(timeout=5)
+
+    assert borrowed == [held]
+    pool.release(held)
+    pool.close()
+
+
+def test_release_rolls_back_open_transactions(databases):
+    predictions, _ = databases
+    pool = ConnectionPool(str(predictions), size=1)
+    conn = pool.acquire()
+    conn.execute("BEGIN")
+    pool.release(conn)
+    assert not conn.in_transaction
+    pool.close()
+
+
+def test_closed_pool_refuses_new_connections(databases):
+    predictions, _ = databases
+    pool = ConnectionPool(str(predictions), size=2)
+    idle = pool.acquire()
+    borrowed = pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        idle.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    # Connections still out are closed when they come back
+    pool.release(borrowed)
+    with pytest.raises(sqlite3.ProgrammingError):
+        borrowed.execute("SELECT 1")
+    assert pool.metrics()["open_connections"] == 0
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.core import embedding_cache
+from src.core.embedding_cache import EmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    # Distinct last_used stamps so LRU order is deterministic
+    monkeypatch.setattr(embedding_cache, "time", FakeClock())
+    return str(tmp_path / "embedding_cache.db")
+
+
+def test_hit_for_the_same_model_and_text(cache_path):
+    cache = EmbeddingCache(cache_path, model="jina-embeddings-v3")
+    cache.put_many({"TCS results": [0.5, 0.25]})
+
+    assert cache.get_many(["TCS results", "RBI policy"]) == {"TCS results": [0.5, 0.25]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Persisted, and keyed by model
+    cache.close()
+    assert EmbeddingCache(cache_path, model="jina-embeddings-v3").get_many(["TCS results"]) == {
+        "TCS results": [0.5, 0.25]
+    }
+    assert EmbeddingCache(cache_path, model="local:other").get_many(["TCS results"]) == {}
+
+
+def test_evicts_the_least_recently_used_entry(cache_path):
+    cache = EmbeddingCache(cache_path, model="m", max_entries=2)
+    cache.put_many({"a": [1.0]})
+    cache.put_many({"b": [2.0]})
+    assert cache.get_many(["a"]) == {"a": [1.0]}
+
+    cache.put_many({"c": [3.0]})
+    assert cache.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+    assert cache.stats()["entries"] == 2
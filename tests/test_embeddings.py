@@ -0,0 +1,85 @@
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+
+from src.core import embeddings
+from src.core.embeddings import EmbeddingProvider, JinaEmbeddingProvider, LocalEmbeddingProvider, get_embedding_provider
+from src.utils.config import config
+
+
+class FakeSentenceTransformer:
+    """sentence_transformers.SentenceTransformer stand-in: 3-dim vectors from text length"""
+
+    def __init__(self, model_name, device=None, trust_remote_code=False):
+        self.model_name = model_name
+        self.device = device
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size, normalize_embeddings, convert_to_numpy, show_progress_bar):
+        return np.array([[len(t), 1.0, 0.0] for t in texts])
+
+
+@pytest.fixture
+def fresh_provider(monkeypatch):
+    monkeypatch.setattr(embeddings, "_provider", None)
+
+
+@pytest.fixture
+def sentence_transformers(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
+
+    class Incomplete(EmbeddingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_selects_jina_provider(fresh_provider, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_PROVIDER", "jina")
+    provider = get_embedding_provider()
+    assert isinstance(provider, JinaEmbeddingProvider)
+    assert provider.model_id == config.JINA_MODEL
+    assert get_embedding_provider() is provider
+
+
+def test_selects_local_provider(fresh_provider, sentence_transformers, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_PROVIDER", "local")
+    provider = get_embedding_provider()
+    assert isinstance(provider, LocalEmbeddingProvider)
+    assert provider.model_id == f"local:{config.LOCAL_EMBEDDING_MODEL}"
+    assert provider.dimension == 3
+
+
+def test_local_provider_keeps_input_order_across_batches(sentence_transformers):
+    provider = LocalEmbeddingProvider(model_name="tiny", batch_size=2, workers=3)
+    texts = ["a" * n for n in range(1, 8)]
+    assert [vector[0] for vector in provider.embed(texts)] == list(range(1, 8))
+
+
+def test_unknown_provider_is_rejected(fresh_provider, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_PROVIDER", "openai")
+    with pytest.raises(ValueError, match="Unknown EMBEDDING_PROVIDER 'openai'"):
+        get_embedding_provider()
+
+
+def test_local_provider_without_sentence_transformers_explains_the_install(fresh_provider, monkeypatch):
+    # None in sys.modules makes the import fail as if the package were absent
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    monkeypatch.setattr(config, "EMBEDDING_PROVIDER", "local")
+    with pytest.raises(ImportError, match="pip install sentence-transformers"):
+        get_embedding_provider()
+    assert embeddings._provider is None
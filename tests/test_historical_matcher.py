@@ -0,0 +1,108 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("dotenv")
+
+from src.analysis.historical_matcher import HistoricalMatcher
+from src.utils.db import connect
+
+
+@pytest.fixture
+def market_db(tmp_path):
+    db_path = str(tmp_path / "stock_market.db")
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, open REAL, close REAL, "
+                 "PRIMARY KEY (symbol, date))")
+    conn.execute("CREATE TABLE technical_indicators (symbol TEXT, date TEXT, rsi REAL, macd REAL, macd_signal REAL, "
+                 "macd_histogram REAL, bb_upper REAL, bb_middle REAL, bb_lower REAL, volume_ratio REAL, "
+                 "PRIMARY KEY (symbol, date))")
+    rng = random.Random(11)
+    today = date.today()
+    for n in range(80, -1, -1):
+        day = (today - timedelta(days=n)).isoformat()
+        open_ = None if n == 30 else 100 + rng.uniform(-3, 3)
+        conn.execute("INSERT INTO stock_daily_prices VALUES ('TCS.NS', ?, ?, ?)", (day, open_, 100 + rng.uniform(-3, 3)))
+        if n % 9 == 4:
+            continue  # no indicator row for this day
+        rsi = None if n % 13 == 0 else rng.uniform(30, 70)
+        macd, signal = (None, None) if n % 7 == 0 else (rng.uniform(-2, 2), rng.uniform(-2, 2))
+        conn.execute("INSERT INTO technical_indicators VALUES ('TCS.NS', ?, ?, ?, ?, NULL, NULL, NULL, NULL, NULL)",
+                     (day, rsi, macd, signal))
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _loop_matcher(db_path, symbol, current_indicators, lookback_days=365):
+    """The row-by-row matcher the vectorized one replaced (one next-day query per match)"""
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(f"""
+        SELECT ti.*, sdp.close, sdp.open
+        FROM technical_indicators ti
+        JOIN stock_daily_prices sdp ON ti.symbol = sdp.symbol AND ti.date = sdp.date
+        WHERE ti.symbol = ?
+        AND ti.date >= date('now', '-{lookback_days} days')
+        AND ti.date < date('now', '-1 days')
+        ORDER BY ti.date DESC
+    """, conn, params=(symbol,))
+
+    rsi_current = current_indicators.get('rsi')
+    macd_current = current_indicators.get('macd')
+    similar_days = []
+    for _, row in df.iterrows():
+        rsi_match = abs(row['rsi'] - rsi_current) <= 10 if pd.notna(row['rsi']) else False
+        macd_match = True
+        if macd_current and pd.notna(row['macd']) and pd.notna(row['macd_signal']):
+            current_signal = 'BULLISH' if macd_current > current_indicators.get('macd_signal', 0) else 'BEARISH'
+            hist_signal = 'BULLISH' if row['macd'] > row['macd_signal'] else 'BEARISH'
+            macd_match = current_signal == hist_signal
+        if rsi_match and macd_match:
+            similar_days.append(row)
+
+    returns = []
+    for day in similar_days:
+        next_day = pd.read_sql_query(
+            "SELECT open, close FROM stock_daily_prices WHERE symbol = ? AND date > ? ORDER BY date ASC LIMIT 1",
+            conn, params=(symbol, day['date'])
+        )
+        if not next_day.empty and pd.notna(next_day['open'].iloc[0]) and pd.notna(next_day['close'].iloc[0]):
+            next_open, next_close = next_day['open'].iloc[0], next_day['close'].iloc[0]
+            if next_open > 0:
+                returns.append((next_close - next_open) / next_open * 100)
+    conn.close()
+
+    up = sum(1 for r in returns if r > 0.2)
+    down = sum(1 for r in returns if r < -0.2)
+    return len(similar_days), {
+        'up_probability': up / len(returns),
+        'down_probability': down / len(returns),
+        'neutral_probability': (len(returns) - up - down) / len(returns),
+        'average_return': sum(returns) / len(returns),
+        'median_return': np.median(returns),
+        'std_deviation': np.std(returns),
+        'best_case': max(returns),
+        'worst_case': min(returns),
+        'win_rate': up / len(returns) * 100
+    }
+
+
+@pytest.mark.parametrize("current", [
+    {"rsi": 50.0, "macd": 0.8, "macd_signal": 0.1},
+    {"rsi": 38.0, "macd": -0.5, "macd_signal": 0.4},
+    {"rsi": 62.0},
+])
+def test_vectorized_threshold_match_equals_the_row_loop(market_db, current):
+    result = HistoricalMatcher(market_db, universe=False)._find_by_threshold("TCS.NS", current)
+    total_matches, outcomes = _loop_matcher(market_db, "TCS.NS", current)
+
+    assert result['total_matches'] == total_matches
+    assert result['outcomes'] == pytest.approx(outcomes)
+
+
+def test_no_match_returns_none(market_db):
+    assert HistoricalMatcher(market_db)._find_by_threshold("TCS.NS", {"rsi": 99.0}) is None
@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("dotenv")
+
+from src.analysis.indicator_state import IndicatorEngine, IndicatorState
+from src.analysis.technical_indicators import TechnicalIndicators
+from src.utils.db import connect
+
+COLUMNS = IndicatorEngine.COLUMNS
+
+
+def _bars(count=120, seed=7):
+    rng = random.Random(seed)
+    close = 1000.0
+    bars = []
+    for day in range(count):
+        # A flat stretch exercises the zero-loss RSI branch
+        if not 40 <= day < 56:
+            close *= 1 + rng.gauss(0, 0.015)
+        bars.append((f"2024-{day // 28 + 1:02d}-{day % 28 + 1:02d}", round(close, 2), rng.randint(1_000, 50_000)))
+    return bars
+
+
+def _batch(bars):
+    frame = pd.DataFrame(bars, columns=["date", "close", "volume"])
+    return TechnicalIndicators.calculate_all(frame).set_index("date")
+
+
+def _assert_row_matches(row, expected):
+    for column in COLUMNS:
+        value = expected[column]
+        if pd.isna(value):
+            assert row[column] is None, (row["date"], column)
+        else:
+            assert row[column] == pytest.approx(value, rel=1e-9, abs=1e-9), (row["date"], column)
+
+
+def test_streaming_matches_batch_for_every_bar():
+    bars = _bars()
+    expected = _batch(bars)
+    state = IndicatorState()
+    for date, close, volume in bars:
+        _assert_row_matches(state.update(date, close, volume), expected.loc[date])
+
+
+def test_state_survives_a_json_round_trip():
+    bars = _bars()
+    expected = _batch(bars)
+    state = IndicatorState()
+    for date, close, volume in bars[:70]:
+        state.update(date, close, volume)
+
+    resumed = IndicatorState.from_json(state.to_json())
+    for date, close, volume in bars[70:]:
+        _assert_row_matches(resumed.update(date, close, volume), expected.loc[date])
+
+
+def _write_prices(db_path, symbol, bars):
+    conn = connect(db_path)
+    conn.executemany(
+        "INSERT OR REPLACE INTO stock_daily_prices (symbol, date, close, volume) VALUES (?, ?, ?, ?)",
+        [(symbol, *bar) for bar in bars]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _stored(db_path, symbol):
+    conn = connect(db_path)
+    rows = conn.execute(
+        f"SELECT date, {', '.join(COLUMNS)} FROM technical_indicators WHERE symbol = ? ORDER BY date", (symbol,)
+    ).fetchall()
+    conn.close()
+    return {row[0]: dict(zip(["date", *COLUMNS], row)) for row in rows}
+
+
+@pytest.fixture
+def market_db(tmp_path):
+    db_path = str(tmp_path / "stock_market.db")
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, open REAL, high REAL, low REAL, "
+                 "close REAL, volume INTEGER, PRIMARY KEY (symbol, date))")
+    conn.execute("CREATE TABLE technical_indicators (symbol TEXT, date TEXT, rsi REAL, macd REAL, macd_signal REAL, "
+                 "macd_histogram REAL, bb_upper REAL, bb_middle REAL, bb_lower REAL, volume_ma REAL, "
+                 "volume_ratio REAL, PRIMARY KEY (symbol, date))")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _assert_stored_matches_batch(db_path, symbol, bars):
+    expected = _batch(bars)
+    stored = _stored(db_path, symbol)
+    warm = expected.dropna(how="all", subset=COLUMNS)
+    assert sorted(stored) == sorted(warm.index)
+    for date, row in stored.items():
+        _assert_row_matches(row, expected.loc[date])
+
+
+def test_engine_appends_incrementally_like_a_full_recompute(market_db):
+    bars = _bars()
+    engine = IndicatorEngine(market_db)
+
+    _write_prices(market_db, "TCS.NS", bars[:80])
+    assert engine.update_all(["TCS.NS"]) > 0
+    _write_prices(market_db, "TCS.NS", bars[80:])
+    assert engine.update_all(["TCS.NS"]) == 40
+    assert engine.update_all(["TCS.NS"]) == 0
+
+    _assert_stored_matches_batch(market_db, "TCS.NS", bars)
+
+
+def test_engine_reseeds_when_a_past_bar_is_corrected(market_db):
+    bars = _bars()
+    engine = IndicatorEngine(market_db)
+    _write_prices(market_db, "TCS.NS", bars[:100])
+    engine.update_all(["TCS.NS"])
+
+    # A corrected bar inside the carried-over state invalidates it
+    date, close, volume = bars[99]
+    bars[99] = (date, close * 1.05, volume)
+    _write_prices(market_db, "TCS.NS", bars)
+    engine.update_all(["TCS.NS"])
+
+    _assert_stored_matches_batch(market_db, "TCS.NS", bars)
+    assert _stored(market_db, "TCS.NS")[bars[-1][0]]["rsi"] is not None
+
+
+@pytest.mark.parametrize("field", [1, 2])
+def test_engine_reseeds_when_an_earlier_bar_in_the_overlap_window_changes(market_db, field):
+    bars = _bars()
+    engine = IndicatorEngine(market_db)
+    _write_prices(market_db, "TCS.NS", bars[:100])
+    engine.update_all(["TCS.NS"])
+
+    # Two days before the last bar: same count, same last close
+    bar = list(bars[97])
+    bar[field] = round(bar[field] * 1.05, 2) if field == 1 else bar[field] + 10_000
+    bars[97] = tuple(bar)
+    _write_prices(market_db, "TCS.NS", bars)
+    engine.update_all(["TCS.NS"])
+
+    _assert_stored_matches_batch(market_db, "TCS.NS", bars)
@@ -0,0 +1,46 @@
+from src.utils.keyword_matcher import KeywordMatcher
+
+
+def _matcher():
+    return KeywordMatcher({
+        "Reliance Industries": ["reliance", "ril", "jio", "reliance jio"],
+        "HDFC Bank": ["hdfc bank", "hdfc"],
+        "TCS": ["tcs", "tata consultancy"],
+    })
+
+
+def test_matches_on_word_boundaries_only():
+    matcher = _matcher()
+    assert matcher.match("Markets rallied in April") == {}
+    assert matcher.match("RIL shares rose; april gains for ril.") == {"Reliance Industries": 2}
+    assert matcher.match("tcs-led rally") == {"TCS": 1}
+    assert matcher.match("ATCS etcs") == {}
+
+
+def test_case_insensitive():
+    assert _matcher().match("Tata Consultancy Services and TCS") == {"TCS": 2}
+
+
+def test_overlapping_keywords_count_once():
+    matcher = _matcher()
+    # "reliance jio" also contains "reliance" and "jio"
+    assert matcher.match("Reliance Jio launches 5G") == {"Reliance Industries": 1}
+    assert matcher.match("HDFC Bank results") == {"HDFC Bank": 1}
+    assert matcher.match("Reliance and Jio") == {"Reliance Industries": 2}
+
+
+def test_best_match_most_mentions_then_declaration_order():
+    matcher = _matcher()
+    assert matcher.best_match("TCS beats, TCS hires, HDFC Bank lends") == ("TCS", 2)
+    assert matcher.best_match("HDFC and TCS") == ("HDFC Bank", 1)
+    assert matcher.best_match("nothing relevant") is None
+
+
+def test_shared_keyword_counts_for_every_entity():
+    matcher = KeywordMatcher({"A": ["nifty"], "B": ["nifty", "nifty bank"]})
+    assert matcher.match("nifty bank closes higher") == {"B": 1}
+    assert matcher.match("nifty closes higher") == {"A": 1, "B": 1}
+
+
+def test_empty_keywords_are_ignored():
+    assert KeywordMatcher({"A": ["", "  "]}).match("anything") == {}
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.memo import Memo
+
+
+def test_builds_once_then_hits():
+    memo = Memo()
+    calls = []
+    build = lambda: calls.append(1) or "context"
+
+    assert memo.get_or_build(("TCS", "2024-01-02"), build) == "context"
+    assert memo.get_or_build(("TCS", "2024-01-02"), build) == "context"
+    assert memo.get_or_build(("INFY", "2024-01-02"), build) == "context"
+    assert len(calls) == 2
+    assert memo.stats() == {'hits': 1, 'misses': 2, 'entries': 2, 'hit_rate': pytest.approx(1 / 3)}
+
+
+def test_concurrent_callers_share_one_build():
+    memo = Memo()
+    calls = []
+    start = threading.Barrier(8)
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return "context"
+
+    def worker():
+        start.wait()
+        results.append(memo.get_or_build("TCS", build))
+
+    results = []
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["context"] * 8
+    # Build locks do not outlive their build
+    assert memo._key_locks == {}
+
+
+def test_failed_builds_are_not_cached():
+    memo = Memo()
+
+    def broken():
+        raise RuntimeError("database locked")
+
+    with pytest.raises(RuntimeError):
+        memo.get_or_build("TCS", broken)
+    assert memo.get_or_build("TCS", lambda: "context") == "context"
+    assert memo._key_locks == {}
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_failed_build_with_waiters_keeps_one_lock():
+    memo = Memo()
+    calls = []
+    active = []
+    first_started, release_first = threading.Event(), threading.Event()
+    second_started, release_second = threading.Event(), threading.Event()
+
+    def build():
+        calls.append(1)
+        active.append(1)
+        assert len(active) == 1, "two builds ran at once"
+        try:
+            if len(calls) == 1:
+                first_started.set()
+                release_first.wait()
+                raise RuntimeError("database locked")
+            second_started.set()
+            release_second.wait()
+            return "context"
+        finally:
+            active.pop()
+
+    results = {}
+
+    def worker(name):
+        try:
+            results[name] = memo.get_or_build("TCS", build)
+        except RuntimeError as e:
+            results[name] = e
+
+    def start(name):
+        thread = threading.Thread(target=worker, args=(name,), daemon=True)
+        thread.start()
+        return thread
+
+    def users():
+        with memo._lock:
+            return memo._key_locks.get("TCS", [None, 0])[1]
+
+    threads = [start("first")]
+    first_started.wait()
+    threads += [start("waiter 1"), start("waiter 2")]
+    _wait_for(lambda: users() == 3)
+    release_first.set()
+
+    # A caller arriving while a waiter rebuilds queues on the same lock
+    second_started.wait()
+    threads.append(start("late"))
+    _wait_for(lambda: users() == 3)
+    release_second.set()
+    for t in threads:
+        t.join(timeout=2)
+
+    assert isinstance(results.pop("first"), RuntimeError)
+    assert results == {"waiter 1": "context", "waiter 2": "context", "late": "context"}
+    assert len(calls) == 2
+    assert memo._key_locks == {}
+
+
+def test_tag_change_rebuilds():
+    memo = Memo()
+    assert memo.get_or_build("latest", lambda: "gen 1", tag=1) == "gen 1"
+    assert memo.get_or_build("latest", lambda: "unused", tag=1) == "gen 1"
+    assert memo.get_or_build("latest", lambda: "gen 2", tag=2) == "gen 2"
+    assert memo.stats()["entries"] == 1
+
+
+def test_clear():
+    memo = Memo()
+    memo.get_or_build("TCS", lambda: 1)
+    memo.clear()
+    assert memo.get_or_build("TCS", lambda: 2) == 2
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("feedparser")
+pytest.importorskip("bs4")
+
+from src.collectors.news_fetcher import NewsFetcher
+from src.core.vector_db import PartialIngestError
+
+FEED_URL = "https://example.com/markets.rss"
+
+
+class FakeVectorDB:
+    """add_articles stand-in; `store` caps how many articles are stored before a partial failure"""
+
+    def __init__(self, store=None):
+        self.store = store
+
+    def add_articles(self, articles):
+        if self.store is not None and self.store < len(articles):
+            raise PartialIngestError(self.store, [a["url"] for a in articles[self.store:]], RuntimeError("timeout"))
+        return len(articles)
+
+
+def _download(entries):
+    feed = SimpleNamespace(entries=[{"title": f"Headline {n}", "description": "Body", "link": f"https://example.com/{n}"}
+                                    for n in range(entries)])
+    return {"feed_name": "economic_times_markets", "status": 200, "feed": feed, "bytes": 0,
+            "etag": '"v2"', "last_modified": "Tue, 02 Jan 2024 09:15:00 GMT", "error": None, "seconds": 0.1}
+
+
+def test_validators_are_saved_after_a_complete_ingest(tmp_path):
+    fetcher = NewsFetcher(db_path=str(tmp_path / "state.db"), vector_db=FakeVectorDB())
+    assert fetcher._process_download(FEED_URL, _download(3)) == 3
+    assert fetcher._load_feed_state()["economic_times_markets"]["etag"] == '"v2"'
+
+
+def test_partial_ingest_keeps_the_feed_unconditional(tmp_path):
+    fetcher = NewsFetcher(db_path=str(tmp_path / "state.db"), vector_db=FakeVectorDB(store=1))
+    assert fetcher._process_download(FEED_URL, _download(3)) == 1
+    # No validators: the next fetch downloads the whole feed again
+    assert "economic_times_markets" not in fetcher._load_feed_state()
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+chromadb = pytest.importorskip("chromadb")
+
+from src.core.vector_db import VectorDB
+from src.utils.config import config
+from src.utils.filter_companies import CompanyNewsFilter, TOP_5_NIFTY
+
+ARTICLE_VECTOR = [1.0, 0.0, 0.0, 0.0]
+QUERY_VECTOR = [0.0, 1.0, 0.0, 0.0]  # orthogonal: no semantic matches, keywords decide
+
+
+class QueryProvider:
+    model_id = "fake-4"
+    dimension = None
+
+    def embed(self, texts):
+        return [QUERY_VECTOR for _ in texts]
+
+    def describe(self):
+        return self.model_id
+
+
+@pytest.fixture
+def news_filter(tmp_path):
+    db = VectorDB.__new__(VectorDB)
+    db.client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    db.collection = db.client.get_or_create_collection("economic_news")
+    db.embedding_provider = QueryProvider()
+    db.embedding_cache = None
+    db._dimension = None
+    return CompanyNewsFilter(main_db=db, state_db_path=str(tmp_path / "stock_market.db"))
+
+
+def _ingest(news_filter, article_id, title, ingested_at):
+    news_filter.main_db.collection.add(
+        ids=[article_id], documents=[title], embeddings=[ARTICLE_VECTOR],
+        metadatas=[{"title": title, "source": "Test", "url": f"https://example.com/{article_id}",
+                    "published_date": "2024-01-02 09:15:00", "ingested_at": ingested_at}]
+    )
+
+
+def _filtered_ids(news_filter):
+    return sorted(news_filter.filtered_collection.get(include=[])["ids"])
+
+
+def _new_matches(counts):
+    return {company: count for company, count in counts.items() if count}
+
+
+def test_overlap_neither_drops_nor_duplicates_articles(news_filter):
+    t0 = 1_700_000_000.0
+    _ingest(news_filter, "a", "TCS wins a large deal", t0)
+    _ingest(news_filter, "b", "Monsoon arrives early", t0)
+
+    assert _new_matches(news_filter.filter_and_copy()) == {"TCS": 1}
+    assert news_filter._get_high_water() == t0
+
+    # Committed after the last run but stamped before its mark (inside the overlap), plus a newer one
+    _ingest(news_filter, "c", "Infosys raises guidance", t0 - config.NEWS_FILTER_OVERLAP_SECONDS / 2)
+    _ingest(news_filter, "d", "TCS buyback opens", t0 + 10)
+
+    # "a" is inside the overlap window too but is not classified again
+    assert _new_matches(news_filter.filter_and_copy()) == {"Infosys": 1, "TCS": 1}
+    assert _filtered_ids(news_filter) == ["a", "c", "d"]
+    assert news_filter._get_high_water() == t0 + 10
+
+    # Nothing new: no work, same collection
+    assert _new_matches(news_filter.filter_and_copy()) == {}
+    assert _filtered_ids(news_filter) == ["a", "c", "d"]
+
+
+def test_rebuild_reclassifies_everything_once(news_filter):
+    _ingest(news_filter, "a", "TCS wins a large deal", 100.0)
+    news_filter.filter_and_copy()
+    assert _new_matches(news_filter.filter_and_copy(rebuild=True)) == {"TCS": 1}
+    assert _filtered_ids(news_filter) == ["a"]
+    assert set(TOP_5_NIFTY) <= set(news_filter.filter_and_copy())
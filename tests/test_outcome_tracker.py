@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.analysis.outcome_tracker import OutcomeTracker
+from src.utils.db import connect
+
+TODAY = date.today()
+DAYS = [(TODAY - timedelta(days=n)).isoformat() for n in (3, 2, 1, 0)]
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    pred_db = str(tmp_path / "predictions.db")
+    main_db = str(tmp_path / "stock_market.db")
+
+    conn = connect(main_db)
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, open REAL, close REAL, "
+                 "PRIMARY KEY (symbol, date))")
+    conn.executemany("INSERT INTO stock_daily_prices VALUES ('TCS.NS', ?, 100.0, ?)",
+                     [(day, close) for day, close in zip(DAYS, (101.0, 99.0, 100.3, 102.0))])
+    conn.commit()
+    conn.close()
+
+    conn = connect(pred_db)
+    conn.execute("CREATE TABLE daily_predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, symbol TEXT, "
+                 "prediction_date TEXT, direction TEXT, predicted_move REAL, confidence_score INTEGER, "
+                 "UNIQUE (symbol, prediction_date))")
+    conn.executemany("INSERT INTO daily_predictions (symbol, prediction_date, direction, predicted_move, "
+                     "confidence_score) VALUES ('TCS', ?, ?, ?, 8)",
+                     [(DAYS[0], "UP", 1.2), (DAYS[1], "UP", 0.8), (DAYS[2], "DOWN", -0.5), (DAYS[3], "UP", 1.0)])
+    conn.commit()
+    conn.close()
+
+    return OutcomeTracker({"TCS": "TCS.NS"}, pred_db_path=pred_db, main_db_path=main_db)
+
+
+def _rollup(tracker):
+    conn = connect(tracker.pred_db_path)
+    rows = conn.execute("SELECT date, total, direction_hits, price_hits FROM accuracy_rollup "
+                        "WHERE timeframe = 'DAILY' ORDER BY date").fetchall()
+    conn.close()
+    return rows
+
+
+def _execute(path, sql, params=()):
+    conn = connect(path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_scores_completed_days_once_and_leaves_today_open(tracker):
+    assert tracker.update(("DAILY",)) == {"DAILY": 3}
+    assert _rollup(tracker) == [(DAYS[0], 1, 1, 1), (DAYS[1], 1, 0, 0), (DAYS[2], 1, 0, 0)]
+    assert tracker.update(("DAILY",)) == {"DAILY": 0}
+
+
+def test_replaced_prediction_is_retracted_and_rescored(tracker):
+    tracker.update(("DAILY",))
+    # INSERT OR REPLACE on (symbol, prediction_date) gives the row a new id
+    _execute(tracker.pred_db_path,
+             "INSERT OR REPLACE INTO daily_predictions (symbol, prediction_date, direction, predicted_move, "
+             "confidence_score) VALUES ('TCS', ?, 'DOWN', -1.0, 8)", (DAYS[1],))
+
+    assert tracker.update(("DAILY",)) == {"DAILY": 1}
+    assert _rollup(tracker)[1] == (DAYS[1], 1, 1, 1)
+
+
+def test_deleted_prediction_is_backed_out_of_the_rollup(tracker):
+    tracker.update(("DAILY",))
+    _execute(tracker.pred_db_path, "DELETE FROM daily_predictions WHERE prediction_date = ?", (DAYS[0],))
+
+    tracker.update(("DAILY",))
+    assert [row[0] for row in _rollup(tracker)] == [DAYS[1], DAYS[2]]
+
+
+def test_corrected_recent_bar_is_rescored(tracker):
+    tracker.update(("DAILY",))
+    _execute(tracker.main_db_path, "UPDATE stock_daily_prices SET close = 98.0 WHERE date = ?", (DAYS[2],))
+
+    assert tracker.update(("DAILY",)) == {"DAILY": 1}
+    assert _rollup(tracker)[2] == (DAYS[2], 1, 1, 0)
+
+
+def test_summarize_reads_the_rollup(tracker):
+    tracker.update(("DAILY",))
+    conn = connect(tracker.pred_db_path)
+    groups = [tuple(row) for row in OutcomeTracker.summarize(conn, "DAILY", start_date=DAYS[1])]
+    conn.close()
+    assert groups == [("TCS", "high", 2, 0, 0)]
+
+
+def test_live_scoring_agrees_with_the_rollup(tracker):
+    tracker.update(("DAILY",))
+    conn = connect(tracker.pred_db_path)
+    conn.execute("ATTACH DATABASE ? AS market", (tracker.main_db_path,))
+    # Today's prediction has a bar too; neither path scores it
+    for start_date in (None, DAYS[1]):
+        rollup = [tuple(row) for row in OutcomeTracker.summarize(conn, "DAILY", start_date=start_date)]
+        live = [tuple(row) for row in OutcomeTracker.summarize_live(conn, "DAILY", tracker.ticker_map,
+                                                                    start_date=start_date)]
+        assert live == rollup
+    conn.close()
+
+
+def test_only_logged_prediction_changes_are_rechecked(tracker):
+    tracker.update(("DAILY",))
+    _execute(tracker.pred_db_path, "UPDATE daily_predictions SET direction = 'DOWN', predicted_move = -0.4 "
+                                   "WHERE prediction_date = ?", (DAYS[0],))
+    conn = connect(tracker.pred_db_path)
+    assert conn.execute("SELECT timeframe, symbol, period FROM prediction_changes").fetchall() == [
+        ("DAILY", "TCS", DAYS[0])
+    ]
+    conn.close()
+
+    # Rescored in place (same id) and the log is consumed
+    assert tracker.update(("DAILY",)) == {"DAILY": 1}
+    assert _rollup(tracker)[0] == (DAYS[0], 1, 0, 0)
+    conn = connect(tracker.pred_db_path)
+    assert conn.execute("SELECT COUNT(*) FROM prediction_changes").fetchone()[0] == 0
+    conn.close()
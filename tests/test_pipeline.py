@@ -0,0 +1,196 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils.pipeline import Pipeline, RunState, Stage
+
+
+def _recorder():
+    events = []
+    lock = threading.Lock()
+
+    def stage(name, seconds=0.0, fail=False):
+        def run(ctx):
+            with lock:
+                events.append(("start", name))
+            time.sleep(seconds)
+            if fail:
+                raise RuntimeError(f"{name} broke")
+            with lock:
+                events.append(("end", name))
+        return run
+
+    return events, stage
+
+
+def _position(events, event):
+    return events.index(event)
+
+
+def test_dependencies_finish_before_dependents_start():
+    events, stage = _recorder()
+    pipeline = Pipeline([
+        Stage("c", "C", stage("c"), depends_on=["a", "b"]),
+        Stage("a", "A", stage("a", 0.05)),
+        Stage("b", "B", stage("b", 0.01)),
+        Stage("d", "D", stage("d"), depends_on=["c"]),
+    ], max_workers=4)
+
+    reports = pipeline.run(context=object())
+
+    assert {name: r["status"] for name, r in reports.items()} == {"a": "ok", "b": "ok", "c": "ok", "d": "ok"}
+    assert _position(events, ("end", "a")) < _position(events, ("start", "c"))
+    assert _position(events, ("end", "b")) < _position(events, ("start", "c"))
+    assert _position(events, ("end", "c")) < _position(events, ("start", "d"))
+
+
+def test_independent_stages_overlap():
+    events, stage = _recorder()
+    pipeline = Pipeline([Stage("a", "A", stage("a", 0.1)), Stage("b", "B", stage("b", 0.1))], max_workers=2)
+    pipeline.run(context=object())
+    # Both started before either finished
+    assert [kind for kind, _ in events[:2]] == ["start", "start"]
+
+
+def test_failure_skips_everything_downstream():
+    events, stage = _recorder()
+    done = []
+    pipeline = Pipeline([
+        Stage("a", "A", stage("a", fail=True)),
+        Stage("b", "B", stage("b"), depends_on=["a"]),
+        Stage("c", "C", stage("c"), depends_on=["b"]),
+        Stage("other", "Other", stage("other")),
+    ], max_workers=2, on_stage_done=lambda s, status: done.append((s.name, status)))
+
+    reports = pipeline.run(context=object())
+
+    assert reports["a"]["status"] == "failed"
+    assert reports["a"]["error"] == "a broke"
+    assert reports["b"]["status"] == "skipped"
+    assert reports["c"]["status"] == "skipped"
+    assert reports["other"]["status"] == "ok"
+    assert ("start", "b") not in events
+    # The hook only fires for stages that actually ran
+    assert sorted(done) == [("a", "failed"), ("other", "ok")]
+
+
+def test_concurrency_cap():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(ctx):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    Pipeline([Stage(str(i), str(i), work) for i in range(6)], max_workers=2).run(context=object())
+    assert max(peak) == 2
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    noop = lambda ctx: None
+    with pytest.raises(ValueError, match="unknown stage"):
+        Pipeline([Stage("a", "A", noop, depends_on=["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([
+            Stage("a", "A", noop, depends_on=["c"]),
+            Stage("b", "B", noop, depends_on=["a"]),
+            Stage("c", "C", noop, depends_on=["b"]),
+            Stage("free", "Free", noop),
+        ])
+
+
+def _counting_stage(name, inputs, calls, fail=False, **kwargs):
+    def run(ctx):
+        calls.append(name)
+        if fail:
+            raise RuntimeError("boom")
+    return Stage(name, name.upper(), run, inputs=inputs, **kwargs)
+
+
+def test_unchanged_inputs_skip_and_changed_inputs_rerun(tmp_path):
+    state = RunState(str(tmp_path / "state.db"))
+    data = {"version": 1}
+    calls = []
+    stages = lambda: [
+        _counting_stage("a", lambda ctx: dict(data), calls),
+        _counting_stage("b", lambda ctx: dict(data), calls, depends_on=["a"]),
+    ]
+
+    assert Pipeline(stages(), run_state=state).run(context=object())["a"]["status"] == "ok"
+    reports = Pipeline(stages(), run_state=state).run(context=object())
+    assert {r["status"] for r in reports.values()} == {"unchanged"}
+    assert calls == ["a", "b"]
+
+    data["version"] = 2
+    Pipeline(stages(), run_state=state).run(context=object())
+    assert calls == ["a", "b", "a", "b"]
+
+    Pipeline(stages(), run_state=state, force=True).run(context=object())
+    assert calls == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_failed_run_is_not_recorded(tmp_path):
+    state = RunState(str(tmp_path / "state.db"))
+    calls = []
+    Pipeline([_counting_stage("a", lambda ctx: 1, calls, fail=True)], run_state=state).run(context=object())
+    Pipeline([_counting_stage("a", lambda ctx: 1, calls)], run_state=state).run(context=object())
+    assert calls == ["a", "a"]
+    assert state.get("a") is not None
+
+
+def test_stages_without_inputs_or_with_broken_fingerprints_always_run(tmp_path):
+    state = RunState(str(tmp_path / "state.db"))
+    calls = []
+
+    def broken(ctx):
+        raise RuntimeError("collection unavailable")
+
+    for _ in range(2):
+        Pipeline([_counting_stage("plain", None, calls), _counting_stage("broken", broken, calls)],
+                 run_state=state).run(context=object())
+    assert sorted(calls) == ["broken", "broken", "plain", "plain"]
+
+
+def test_keyboard_interrupt_is_not_swallowed():
+    def interrupted(ctx):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        Pipeline([Stage("a", "A", interrupted)]).run(context=object())
+
+
+def test_partially_failed_prediction_run_is_retried(tmp_path):
+    from src.core.batch_runner import BatchPredictionRunner
+
+    class FlakyAgent:
+        """INFY's first daily prediction hits a quota error"""
+
+        def __init__(self):
+            self.calls = []
+
+        def predict_daily(self, symbol, save=False):
+            self.calls.append(symbol)
+            if symbol == "INFY" and self.calls.count("INFY") == 1:
+                raise RuntimeError("429 quota exceeded")
+            return {"symbol": symbol}
+
+    agent = FlakyAgent()
+    state = RunState(str(tmp_path / "state.db"))
+    # Same inputs both times, as with two refreshes on one day without new data
+    stage = lambda: Stage("predictions", "Predictions",
+                          lambda ctx: BatchPredictionRunner(agent).run(["TCS", "INFY"]),
+                          inputs=lambda ctx: {"date": "2024-01-02", "prices": [1, 2]})
+
+    assert Pipeline([stage()], run_state=state).run(context=object())["predictions"]["status"] == "failed"
+    assert state.get("predictions") is None
+    assert Pipeline([stage()], run_state=state).run(context=object())["predictions"]["status"] == "ok"
+    assert agent.calls.count("INFY") == 2
+    assert Pipeline([stage()], run_state=state).run(context=object())["predictions"]["status"] == "unchanged"
@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+pytest.importorskip("dotenv")
+
+from src.collectors import price_fetcher
+from src.collectors.price_fetcher import PriceFetcher
+from src.utils.db import connect
+
+SYMBOLS = ["TCS.NS", "INFY.NS"]
+TODAY = date.today()
+
+
+class FakeYahoo:
+    """yf.download stand-in over an in-memory market: {symbol: {date: (open, high, low, close, volume)}}"""
+
+    def __init__(self):
+        self.market = {symbol: {} for symbol in SYMBOLS}
+        self.requests = []
+
+    def add_bars(self, symbol, days, base=100.0):
+        for n in days:
+            day = TODAY - timedelta(days=n)
+            self.market[symbol][day.isoformat()] = (base + n, base + n + 2, base + n - 2, base + n + 1, 1000 + n)
+
+    def download(self, symbols, start=None, end=None, group_by=None, **kwargs):
+        self.requests.append((tuple(symbols), start, end))
+        frames = {}
+        for symbol in symbols:
+            bars = {d: bar for d, bar in self.market[symbol].items() if (start or "") <= d < (end or "9999")}
+            frames[symbol] = pd.DataFrame(
+                list(bars.values()), index=pd.DatetimeIndex(list(bars), name="Date"),
+                columns=["Open", "High", "Low", "Close", "Volume"]
+            ).sort_index()
+        return pd.concat(frames, axis=1)
+
+
+@pytest.fixture
+def yahoo(monkeypatch, tmp_path):
+    # bump_cache_generation writes predictions.db in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(price_fetcher, "STOCKS", SYMBOLS)
+    fake = FakeYahoo()
+    monkeypatch.setattr(price_fetcher.yf, "download", fake.download)
+    return fake
+
+
+def _stored(db_path):
+    conn = connect(db_path)
+    rows = conn.execute("SELECT symbol, date, open, close, volume FROM stock_daily_prices ORDER BY symbol, date").fetchall()
+    conn.close()
+    return rows
+
+
+def test_historical_prices_are_one_download_and_a_bulk_upsert(yahoo, tmp_path):
+    db_path = str(tmp_path / "stock_market.db")
+    yahoo.add_bars("TCS.NS", range(10, 0, -1))
+    yahoo.add_bars("INFY.NS", range(10, 0, -1), base=1500.0)
+    fetcher = PriceFetcher(db_path)
+
+    fetcher.fetch_historical_prices(days=30)
+    assert len(yahoo.requests) == 1
+    first = _stored(db_path)
+    assert len(first) == 20
+    assert first[0] == ("INFY.NS", (TODAY - timedelta(days=10)).isoformat(), 1510.0, 1511.0, 1010)
+
+    # Re-running replaces rows in place
+    fetcher.fetch_historical_prices(days=30)
+    assert _stored(db_path) == first
+
+
+def test_single_ticker_download_is_reshaped(yahoo, monkeypatch):
+    yahoo.add_bars("TCS.NS", [2, 1])
+    # yfinance returns flat columns for a single ticker
+    monkeypatch.setattr(price_fetcher.yf, "download",
+                        lambda symbols, **kwargs: FakeYahoo.download(yahoo, symbols, **kwargs)["TCS.NS"])
+
+    prices = PriceFetcher.__new__(PriceFetcher)._download_prices(["TCS.NS"])
+    assert list(prices.columns) == ["symbol", "date", "open", "high", "low", "close", "volume"]
+    assert prices["symbol"].tolist() == ["TCS.NS", "TCS.NS"]
+    assert prices["close"].tolist() == [103.0, 102.0]
+
+
+def test_sync_overlap_is_idempotent(yahoo, tmp_path):
+    db_path = str(tmp_path / "stock_market.db")
+    yahoo.add_bars("TCS.NS", range(20, 2, -1))
+    yahoo.add_bars("INFY.NS", range(20, 5, -1), base=1500.0)
+    fetcher = PriceFetcher(db_path)
+
+    fetcher.sync_prices(overlap_days=5, initial_days=30)
+    synced = _stored(db_path)
+    assert len(synced) == 18 + 15
+
+    # Nothing new: the overlap re-downloads stored bars and leaves the table unchanged
+    yahoo.requests.clear()
+    fetcher.sync_prices(overlap_days=5, initial_days=30)
+    assert _stored(db_path) == synced
+    starts = {symbols: start for symbols, start, _ in yahoo.requests}
+    assert starts == {("TCS.NS",): (TODAY - timedelta(days=8)).isoformat(),
+                      ("INFY.NS",): (TODAY - timedelta(days=11)).isoformat()}
+
+    # New bars are appended and a revised bar inside the overlap is corrected, without duplicates
+    yahoo.add_bars("TCS.NS", [2, 1])
+    revised = (TODAY - timedelta(days=4)).isoformat()
+    yahoo.market["TCS.NS"][revised] = (99.0, 99.0, 99.0, 99.0, 7)
+    fetcher.sync_prices(overlap_days=5, initial_days=30)
+
+    rows = _stored(db_path)
+    assert len(rows) == len(synced) + 2
+    assert len({(symbol, day) for symbol, day, *_ in rows}) == len(rows)
+    assert ("TCS.NS", revised, 99.0, 99.0, 7) in rows
+
+    conn = connect(db_path)
+    assert dict(conn.execute("SELECT symbol, last_date FROM price_sync_state").fetchall()) == {
+        "TCS.NS": (TODAY - timedelta(days=1)).isoformat(),
+        "INFY.NS": (TODAY - timedelta(days=6)).isoformat(),
+    }
+    conn.close()
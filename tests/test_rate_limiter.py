@@ -0,0 +1,130 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic()"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.code = 429
+        if retry_after is not None:
+            self.response = type("Response", (), {"status_code": 429, "headers": {"Retry-After": str(retry_after)}})()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def test_requests_per_minute_budget(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+    for _ in range(60):
+        assert limiter.acquire() == 0.0
+    # Bucket empty: the next request waits one refill interval (1s at 60/min)
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.metrics()['requests'] == 61
+
+
+def test_tokens_per_minute_budget(clock):
+    limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=600)
+    limiter.acquire(tokens=600)
+    assert limiter.acquire(tokens=300) == pytest.approx(30.0)
+
+
+def test_throttle_backs_off_exponentially_and_halves_rate(clock):
+    limiter = RateLimiter("test", requests_per_minute=600)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) <= 3:
+            raise RateLimited()
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    # Pauses of 1s, 2s, 4s between the four attempts
+    assert [b - a for a, b in zip(calls, calls[1:])] == pytest.approx([1.0, 2.0, 4.0])
+    assert limiter.throttled == 3
+    # Halved three times, then one success recovers by 25%
+    assert limiter.rate_factor == pytest.approx(0.125 * 1.25)
+    assert limiter.backoff == 1.0
+
+
+def test_retry_after_header_overrides_backoff(clock):
+    limiter = RateLimiter("test", requests_per_minute=600)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise RateLimited(retry_after=7)
+        return "ok"
+
+    limiter.call(flaky)
+    assert calls[1] - calls[0] == pytest.approx(7.0)
+
+
+def test_gives_up_after_max_retries_and_passes_other_errors(clock):
+    limiter = RateLimiter("test", requests_per_minute=600)
+
+    def always_limited():
+        raise RateLimited()
+
+    with pytest.raises(RateLimited):
+        limiter.call(always_limited, max_retries=2)
+    assert limiter.throttled == 2
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert limiter.throttled == 2
+
+
+def test_rate_factor_has_a_floor(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+    for _ in range(10):
+        limiter.report_throttled(retry_after=0)
+    assert limiter.rate_factor == RateLimiter.MIN_RATE_FACTOR
+    assert limiter.backoff <= RateLimiter.MAX_BACKOFF_SECONDS
+
+
+def test_burst_caps_back_to_back_requests(clock):
+    limiter = RateLimiter("test", requests_per_minute=60, burst=1)
+    assert limiter.acquire() == 0.0
+    # Cold start spends the single burst token; then one request per second
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.acquire() == pytest.approx(1.0)
+    # An idle minute refills only up to the burst
+    clock.now += 60
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(1.0)
+
+
+def test_screener_limiter_spaces_requests_from_a_cold_start(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    limiter = rate_limiter.get_rate_limiter("screener")
+    assert limiter.requests.capacity == 1
+    limiter.acquire()
+    assert limiter.acquire() > 0
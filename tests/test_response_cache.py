@@ -0,0 +1,27 @@
+import json
+
+from src.utils.response_cache import ResponseCache
+
+
+def test_serves_cached_body_until_generation_changes():
+    cache = ResponseCache()
+    payload = {"predictions": [1, 2]}
+
+    etag, body = cache.get_or_build("latest", 3, lambda: payload)
+    assert json.loads(body) == payload
+    assert etag.startswith('"3-') and etag.endswith('"')
+
+    payload["predictions"].append(3)
+    assert cache.get_or_build("latest", 3, lambda: payload) == (etag, body)
+
+    new_etag, new_body = cache.get_or_build("latest", 4, lambda: payload)
+    assert new_etag != etag
+    assert json.loads(new_body) == {"predictions": [1, 2, 3]}
+    assert cache.stats()["hits"] == 1
+
+
+def test_same_body_in_a_new_generation_gets_a_new_etag():
+    cache = ResponseCache()
+    first, _ = cache.get_or_build("accuracy_latest", 1, lambda: {"accuracy": 55.0})
+    second, _ = cache.get_or_build("accuracy_latest", 2, lambda: {"accuracy": 55.0})
+    assert first != second
@@ -0,0 +1,66 @@
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("dotenv")
+
+from src.analysis import scenario_index
+from src.analysis.scenario_index import ScenarioIndex, get_scenario_index
+from src.utils.config import config
+from src.utils.db import connect
+
+
+@pytest.fixture
+def market_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCENARIO_INDEX_DIR", str(tmp_path / "scenario_index"))
+    monkeypatch.setattr(scenario_index, "_indexes", {})
+
+    db_path = str(tmp_path / "stock_market.db")
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE stock_daily_prices (symbol TEXT, date TEXT, open REAL, close REAL, "
+                 "PRIMARY KEY (symbol, date))")
+    conn.execute("CREATE TABLE technical_indicators (symbol TEXT, date TEXT, rsi REAL, macd_histogram REAL, "
+                 "bb_upper REAL, bb_lower REAL, volume_ratio REAL, PRIMARY KEY (symbol, date))")
+    conn.execute("CREATE TABLE market_context (date TEXT PRIMARY KEY, nifty_trend TEXT, volatility_regime TEXT)")
+    rng = random.Random(3)
+    for day in range(1, 29):
+        date = f"2024-02-{day:02d}"
+        close = 100 + rng.uniform(-5, 5)
+        conn.execute("INSERT INTO stock_daily_prices VALUES ('TCS.NS', ?, ?, ?)", (date, close - rng.uniform(-1, 1), close))
+        conn.execute("INSERT INTO technical_indicators VALUES ('TCS.NS', ?, ?, ?, ?, ?, ?)",
+                     (date, rng.uniform(20, 80), rng.uniform(-1, 1), close + 3, close - 3, rng.uniform(0.5, 2)))
+        conn.execute("INSERT INTO market_context VALUES (?, ?, ?)",
+                     (date, rng.choice(["BULL", "BEAR", "SIDEWAYS"]), rng.choice(["LOW", "HIGH"])))
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_saved_index_round_trips_its_feature_space(market_db, tmp_path):
+    index = ScenarioIndex.build(market_db, "TCS.NS")
+    path = str(tmp_path / "tcs.npz")
+    index.save(path)
+
+    loaded = ScenarioIndex.load(path)
+    assert loaded.features == ScenarioIndex.FEATURES
+    np.testing.assert_array_equal(loaded.mean, index.mean)
+    np.testing.assert_array_equal(loaded.std, index.std)
+    assert loaded.is_current(index.signature)
+
+
+def test_index_saved_with_other_features_is_rebuilt(market_db):
+    # Same indicator rows (same signature), saved by a version with fewer features
+    stale = ScenarioIndex.build(market_db, "TCS.NS")
+    stale.features = stale.features[:4]
+    stale.matrix, stale.mean, stale.std = stale.matrix[:, :4], stale.mean[:4], stale.std[:4]
+    os.makedirs(config.SCENARIO_INDEX_DIR)
+    path = os.path.join(config.SCENARIO_INDEX_DIR, "TCS.NS.npz")
+    stale.save(path)
+
+    index = get_scenario_index(market_db, "TCS.NS")
+    assert index.features == ScenarioIndex.FEATURES
+    assert index.matrix.shape[1] == len(ScenarioIndex.FEATURES)
+    assert ScenarioIndex.load(path).features == ScenarioIndex.FEATURES
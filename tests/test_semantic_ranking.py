@@ -0,0 +1,84 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("chromadb")
+
+from src.utils.filter_companies import CompanyNewsFilter
+
+
+def _unit(rng, rows, dim=16):
+    vectors = rng.normal(size=(rows, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _bare_filter():
+    # _rank_page / get_semantic_relevance only need the class constants and main_db
+    return CompanyNewsFilter.__new__(CompanyNewsFilter)
+
+
+def test_rank_page_matches_chroma_l2_top_k_across_pages():
+    rng = np.random.default_rng(0)
+    queries = _unit(rng, 3)
+    articles = _unit(rng, 40)
+    ids = [f"a{i}" for i in range(len(articles))]
+
+    news_filter = _bare_filter()
+    query_matrix = news_filter._normalize(queries)
+    top_hits = [[] for _ in queries]
+    candidates = {}
+    for start in range(0, len(ids), 15):
+        page = {
+            'ids': ids[start:start + 15],
+            'documents': [f"doc {i}" for i in ids[start:start + 15]],
+            'metadatas': [{'title': i} for i in ids[start:start + 15]],
+            'embeddings': articles[start:start + 15].tolist(),
+        }
+        news_filter._rank_page(query_matrix, page, top_hits, candidates)
+
+    # Old path: Chroma's squared-L2 distance, similarity = 1 - distance
+    k = CompanyNewsFilter.SEMANTIC_TOP_K
+    for q, hits in enumerate(top_hits):
+        distances = ((articles - queries[q]) ** 2).sum(axis=1)
+        expected = np.argsort(distances)[:k]
+        assert [article_id for _, article_id in hits] == [ids[i] for i in expected]
+        np.testing.assert_allclose([s for s, _ in hits], 1 - distances[expected], atol=1e-5)
+
+    assert set(candidates) == {article_id for hits in top_hits for _, article_id in hits}
+
+
+def test_rank_page_short_page_keeps_every_article():
+    rng = np.random.default_rng(1)
+    news_filter = _bare_filter()
+    top_hits = [[]]
+    candidates = {}
+    page = {'ids': ['x', 'y'], 'documents': ['', ''], 'metadatas': [{}, {}],
+            'embeddings': _unit(rng, 2).tolist()}
+    news_filter._rank_page(news_filter._normalize(_unit(rng, 1)), page, top_hits, candidates)
+    assert sorted(a for _, a in top_hits[0]) == ['x', 'y']
+
+
+class _FakeVectorDB:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def _generate_embeddings(self, texts, use_cache=True):
+        self.calls.append((list(texts), use_cache))
+        return [self.vectors[t] for t in texts]
+
+
+def test_semantic_relevance_applies_threshold_and_skips_cache_for_article():
+    news_filter = _bare_filter()
+    news_filter.main_db = _FakeVectorDB({
+        "article": [1.0, 0.0],
+        "close": [1.0, 0.1],
+        "far": [0.0, 1.0],
+    })
+
+    similarity = news_filter.get_semantic_relevance("article", ["close", "far"], threshold=0.35)
+    assert similarity == pytest.approx(2 * (1 / np.sqrt(1.01)) - 1, abs=1e-6)
+    assert (["article"], False) in news_filter.main_db.calls
+    assert (["close", "far"], True) in news_filter.main_db.calls
+
+    assert news_filter.get_semantic_relevance("article", ["far"], threshold=0.35) == 0.0
+    assert news_filter.get_semantic_relevance("article", [], threshold=0.35) == 0.0
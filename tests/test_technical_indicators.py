@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src.analysis.technical_indicators import TechnicalIndicators
+
+
+def _frame(count=70, seed=5):
+    rng = random.Random(seed)
+    close = 500.0
+    rows = []
+    for day in range(count):
+        # A flat stretch exercises the zero-loss RSI branch; day 50 trades no volume
+        if not 30 <= day < 46:
+            close *= 1 + rng.gauss(0, 0.02)
+        rows.append((f"day {day}", round(close, 2), 0 if day == 50 else rng.randint(1_000, 9_000)))
+    return pd.DataFrame(rows, columns=["date", "close", "volume"])
+
+
+def _same(series_value, scalar_value):
+    if scalar_value is None:
+        return pd.isna(series_value)
+    return series_value == pytest.approx(scalar_value, rel=1e-12, abs=1e-12)
+
+
+def test_series_last_row_matches_the_latest_only_methods_for_every_prefix():
+    frame = _frame()
+    series = TechnicalIndicators.calculate_all(frame)
+    ti = TechnicalIndicators
+
+    for end in range(1, len(frame) + 1):
+        prices = frame["close"].iloc[:end].astype(float)
+        volumes = frame["volume"].iloc[:end].astype(float)
+        row = series.iloc[end - 1]
+        expected = {
+            "rsi": ti.calculate_rsi(prices),
+            **dict(zip(["macd", "macd_signal", "macd_histogram"], ti.calculate_macd(prices))),
+            **dict(zip(["bb_upper", "bb_middle", "bb_lower"], ti.calculate_bollinger_bands(prices))),
+            **dict(zip(["volume_ma", "volume_ratio"], ti.calculate_volume_indicators(volumes))),
+        }
+        for column, value in expected.items():
+            assert _same(row[column], value), (end, column, row[column], value)
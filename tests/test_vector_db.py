@@ -0,0 +1,106 @@
+import hashlib
+import uuid
+
+import pytest
+
+pytest.importorskip("dotenv")
+chromadb = pytest.importorskip("chromadb")
+
+from src.core.vector_db import PartialIngestError, VectorDB
+
+
+class FakeProvider:
+    """Deterministic 8-dim vectors; `fail_on` texts make their whole batch raise"""
+
+    model_id = "fake-8"
+    dimension = None
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        if self.fail_on & set(texts):
+            raise RuntimeError("embedding API unavailable")
+        return [[b / 255 for b in hashlib.sha256(t.encode()).digest()[:8]] for t in texts]
+
+    def describe(self):
+        return self.model_id
+
+
+def _bare_db(provider, embedding_cache=None):
+    # Skips __init__: no persistent client or configured provider
+    db = VectorDB.__new__(VectorDB)
+    db.embedding_provider = provider
+    db.embedding_cache = embedding_cache
+    db.collection = chromadb.EphemeralClient().get_or_create_collection(f"test_{uuid.uuid4().hex}")
+    db._dimension = None
+    return db
+
+
+def _article(n):
+    return {"title": f"Headline {n}", "description": f"Body {n}", "url": f"https://example.com/{n}",
+            "source": "Test", "published_date": "2024-01-02 09:15:00"}
+
+
+def test_add_articles_skips_existing_and_repeated_urls():
+    db = _bare_db(FakeProvider())
+    assert db.add_articles([_article(1), _article(2), _article(1)]) == 2
+    assert db.add_articles([_article(2), _article(3)]) == 1
+    assert db.collection.count() == 3
+
+
+def test_failed_later_batch_stores_earlier_batches_and_raises():
+    provider = FakeProvider(fail_on={"Headline 3\n\nBody 3"})
+    db = _bare_db(provider)
+    articles = [_article(n) for n in range(5)]
+
+    with pytest.raises(PartialIngestError) as excinfo:
+        db.add_articles(articles, batch_size=2)
+
+    # Batches [0, 1], [2, 3 (fails)]: 0 and 1 are stored, 2-4 are reported
+    assert excinfo.value.added == 2
+    assert excinfo.value.failed_ids == [db._generate_id(a["url"]) for a in articles[2:]]
+    assert sorted(db.collection.get(include=[])["ids"]) == sorted(db._generate_id(a["url"]) for a in articles[:2])
+
+    # A retry embeds only what is missing
+    provider.fail_on.clear()
+    assert db.add_articles(articles, batch_size=2) == 3
+
+
+def test_failed_first_batch_raises_the_provider_error():
+    db = _bare_db(FakeProvider(fail_on={"Headline 0\n\nBody 0"}))
+    with pytest.raises(RuntimeError, match="embedding API unavailable"):
+        db.add_articles([_article(0), _article(1)])
+    assert db.collection.count() == 0
+
+
+def test_search_many_matches_one_search_per_query():
+    provider = FakeProvider()
+    db = _bare_db(provider)
+    db.add_articles([_article(n) for n in range(12)])
+    queries = ["TCS quarterly results", "RBI policy", "crude oil prices"]
+    counts = [3, 5, 1]
+
+    provider.batches.clear()
+    batched = db.search_many(queries, counts)
+    assert provider.batches == [queries]
+
+    assert batched == [db.search(query, count) for query, count in zip(queries, counts)]
+    assert [len(hits) for hits in batched] == counts
+    assert db.search_many([]) == []
+
+
+def test_query_embeddings_are_served_from_the_cache(tmp_path):
+    from src.core.embedding_cache import EmbeddingCache
+
+    provider = FakeProvider()
+    db = _bare_db(provider, EmbeddingCache(str(tmp_path / "cache.db"), model=provider.model_id))
+    first = db._generate_embeddings(["RBI policy", "TCS results"])
+    second = db._generate_embeddings(["TCS results", "RBI policy", "crude oil"])
+
+    # Only the new text reaches the provider; float32 storage round-trips closely
+    assert provider.batches == [["RBI policy", "TCS results"], ["crude oil"]]
+    for cached, fresh in zip(second[:2], first[::-1]):
+        assert cached == pytest.approx(fresh, rel=1e-6)